@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.db import models
 from martor.widgets import AdminMartorWidget
-from taskmanager_app.models import ToDoItem, MainCategoryItem
+from taskmanager_app.models import ArchivedItem, ToDoItem, MainCategoryItem
 
 
 class YourModelAdmin(admin.ModelAdmin):
@@ -12,3 +12,4 @@ class YourModelAdmin(admin.ModelAdmin):
 
 admin.site.register(ToDoItem, YourModelAdmin)
 admin.site.register(MainCategoryItem)
+admin.site.register(ArchivedItem)
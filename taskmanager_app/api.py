@@ -0,0 +1,319 @@
+import json
+
+from django.db import transaction
+from django.forms.models import model_to_dict
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+from django.views.generic import View
+from taggit.models import Tag
+from taggit.utils import edit_string_for_tags
+
+from .dependency_graph import update_all_dependent_dates
+from .forms import MainCategoryItemEditForm, ToDoItemForm
+from .models import MainCategoryItem, ToDoItem
+from .views import (
+    completed_state_filter,
+    dates_state_filter,
+    filter_item_lists_by_query,
+    has_dependency_cycle,
+    main_category_is_valid,
+)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+MAX_BATCH_OPERATIONS = 1000
+
+ITEM_FIELDS = ("id", "created_date", "modified_date", *ToDoItemForm.Meta.fields)
+CATEGORY_FIELDS = (
+    "id",
+    "created_date",
+    "name",
+    *MainCategoryItemEditForm.Meta.fields,
+)
+
+# Fields holding tags, serialized as lists of tag names
+ITEM_TAG_FIELDS = ("tags",)
+# Tag fields read from the denormalized tag names instead of the tag relation: {tag field: column}
+DENORMALIZED_TAG_FIELDS = {"tags": "tag_names"}
+CATEGORY_TAG_FIELDS = ("main_category", "sub_categories", "excluded_tags")
+
+
+class ApiError(Exception):
+    def __init__(self, errors, status: int = 400):
+        super().__init__(errors)
+        self.errors = errors
+        self.status = status
+
+
+def get_requested_fields(request, all_fields: tuple) -> tuple:
+    """Returns the fields selected with ?fields=a,b,c (sparse fieldset), default all fields"""
+
+    if not (requested := request.GET.get("fields")):
+        return all_fields
+
+    fields = tuple(field for field in requested.split(",") if field)
+    if unknown_fields := set(fields) - set(all_fields):
+        raise ApiError(
+            {"fields": [f"Unknown fields: {', '.join(sorted(unknown_fields))}"]}
+        )
+    return ("id", *(field for field in fields if field != "id"))
+
+
+def serialize(obj, fields: tuple, tag_fields: tuple) -> dict:
+    data = {}
+    for field in fields:
+        if field in tag_fields and isinstance(obj, ToDoItem):
+            data[field] = obj.tag_name_list
+        elif field in tag_fields:
+            data[field] = [tag.name for tag in getattr(obj, field).all()]
+        else:
+            value = getattr(obj, field)
+            data[field] = value.isoformat() if hasattr(value, "isoformat") else value
+    return data
+
+
+def parse_json_body(request):
+    if request.content_type != "application/json":
+        raise ApiError({"content_type": ["Content type must be application/json"]}, 415)
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError as error:
+        raise ApiError({"body": [f"Invalid JSON: {error}"]}) from error
+    if not isinstance(data, dict):
+        raise ApiError({"body": ["Expected a JSON object"]})
+    return data
+
+
+def get_form_data(
+    model, instance, data: dict, form_fields: tuple, tag_fields: tuple
+) -> dict:
+    """Returns form data of an instance (or the model defaults) updated with the given data"""
+
+    form_data = model_to_dict(
+        instance or model(),
+        fields=[field for field in form_fields if field not in tag_fields],
+    )
+    if instance:
+        for field in tag_fields:
+            if field in form_fields:
+                form_data[field] = [tag.name for tag in getattr(instance, field).all()]
+    form_data.update({key: value for key, value in data.items() if key in form_fields})
+
+    # Tag fields of the forms are parsed from a tag string
+    for field in tag_fields:
+        if isinstance(form_data.get(field), list):
+            form_data[field] = edit_string_for_tags(
+                [Tag(name=name) for name in form_data[field]]
+            )
+    return form_data
+
+
+def save_item(data: dict, instance: ToDoItem = None) -> ToDoItem:
+    form = ToDoItemForm(
+        data=get_form_data(
+            ToDoItem, instance, data, ToDoItemForm.Meta.fields, ITEM_TAG_FIELDS
+        ),
+        instance=instance,
+    )
+    if not form.is_valid():
+        raise ApiError(form.errors)
+
+    # Check dependency chain (a newly created item cannot break it)
+    if instance and has_dependency_cycle(form, instance.pk):
+        raise ApiError(form.errors)
+
+    return form.save()
+
+
+def save_category(data: dict, instance: MainCategoryItem = None) -> MainCategoryItem:
+    form = MainCategoryItemEditForm(
+        data=get_form_data(
+            MainCategoryItem,
+            instance,
+            data,
+            MainCategoryItemEditForm.Meta.fields,
+            CATEGORY_TAG_FIELDS,
+        ),
+        instance=instance,
+    )
+    if not form.is_valid() or not main_category_is_valid(
+        form, instance_pk=instance.pk if instance else None
+    ):
+        raise ApiError(form.errors)
+    return form.save()
+
+
+# Resources of the API: model, fields, tag fields, save function
+RESOURCES = {
+    "item": (ToDoItem, ITEM_FIELDS, ITEM_TAG_FIELDS, save_item),
+    "category": (MainCategoryItem, CATEGORY_FIELDS, CATEGORY_TAG_FIELDS, save_category),
+}
+
+
+def get_resource_queryset(resource: str, fields: tuple):
+    """Returns a queryset loading only the selected fields and prefetching the selected tags
+    - Tags of items are loaded from their denormalized tag names
+    """
+
+    model, _, tag_fields, _ = RESOURCES[resource]
+    queryset = model.objects.all()
+    if resource == "item":
+        fields = [DENORMALIZED_TAG_FIELDS.get(field, field) for field in fields]
+
+    concrete_fields = {field.name for field in model._meta.concrete_fields}
+    return queryset.only(
+        *(field for field in fields if field in concrete_fields)
+    ).prefetch_related(*(field for field in fields if field in tag_fields))
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class ApiView(View):
+    """Base view converting API errors to JSON responses
+    - Writes require a JSON body, which browsers cannot send cross-site without CORS, hence, no CSRF token
+    """
+
+    resource = None
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse({"errors": error.errors}, status=error.status)
+
+    def http_method_not_allowed(self, request, *args, **kwargs):
+        return JsonResponse(
+            {"errors": {"method": [f"{request.method} not allowed"]}}, status=405
+        )
+
+
+class ApiListView(ApiView):
+    def get(self, request):
+        _, all_fields, tag_fields, _ = RESOURCES[self.resource]
+        fields = get_requested_fields(request, all_fields)
+        queryset = get_resource_queryset(self.resource, fields)
+
+        if self.resource == "item":
+            if query := request.GET.get("query"):
+                queryset = filter_item_lists_by_query(query, queryset)
+            queryset = completed_state_filter(
+                request.GET.get("completed_state"), queryset
+            )
+            queryset = dates_state_filter(request.GET.get("dates_state"), queryset)
+
+        # Cursor pagination on the primary key
+        try:
+            limit = min(
+                max(int(request.GET.get("limit", DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE
+            )
+            cursor = int(request.GET.get("cursor", 0))
+        except ValueError as error:
+            raise ApiError(
+                {"pagination": ["limit and cursor must be integers"]}
+            ) from error
+
+        page = list(queryset.filter(pk__gt=cursor).order_by("pk")[: limit + 1])
+        next_cursor = page[limit - 1].pk if len(page) > limit else None
+
+        return JsonResponse(
+            {
+                "results": [serialize(obj, fields, tag_fields) for obj in page[:limit]],
+                "next_cursor": next_cursor,
+            }
+        )
+
+    def post(self, request):
+        _, all_fields, tag_fields, save = RESOURCES[self.resource]
+        with transaction.atomic():
+            obj = save(parse_json_body(request))
+            update_all_dependent_dates()
+
+        obj = get_resource_queryset(self.resource, all_fields).get(pk=obj.pk)
+        return JsonResponse(serialize(obj, all_fields, tag_fields), status=201)
+
+
+class ApiDetailView(ApiView):
+    def get(self, request, pk):
+        _, all_fields, tag_fields, _ = RESOURCES[self.resource]
+        fields = get_requested_fields(request, all_fields)
+        obj = get_object_or_404(get_resource_queryset(self.resource, fields), pk=pk)
+        return JsonResponse(serialize(obj, fields, tag_fields))
+
+    def patch(self, request, pk):
+        model, all_fields, tag_fields, save = RESOURCES[self.resource]
+        with transaction.atomic():
+            save(parse_json_body(request), instance=get_object_or_404(model, pk=pk))
+            update_all_dependent_dates()
+
+        obj = get_resource_queryset(self.resource, all_fields).get(pk=pk)
+        return JsonResponse(serialize(obj, all_fields, tag_fields))
+
+    put = patch
+
+    def delete(self, request, pk):
+        model = RESOURCES[self.resource][0]
+        with transaction.atomic():
+            get_object_or_404(model, pk=pk).delete()
+            update_all_dependent_dates()
+        return HttpResponse(status=204)
+
+
+class ApiBatchView(ApiView):
+    """Applies many operations in one transaction, either all or none of them
+    - Input: {"operations": [{"op": "create|update|delete", "resource": "item|category", "id": ..., "data": {...}}]}
+    """
+
+    def post(self, request):
+        operations = parse_json_body(request).get("operations")
+        if not isinstance(operations, list) or len(operations) > MAX_BATCH_OPERATIONS:
+            raise ApiError(
+                {
+                    "operations": [
+                        f"Expected a list of at most {MAX_BATCH_OPERATIONS} operations"
+                    ]
+                }
+            )
+
+        results = []
+        with transaction.atomic():
+            for index, operation in enumerate(operations):
+                try:
+                    results.append(self.apply(operation))
+                except ApiError as error:
+                    raise ApiError(
+                        {"index": index, "errors": error.errors}, error.status
+                    ) from error
+
+            # Dependent dates are updated once for the whole batch
+            update_all_dependent_dates()
+
+        return JsonResponse({"results": results})
+
+    @staticmethod
+    def apply(operation: dict) -> dict:
+        if not isinstance(operation, dict):
+            raise ApiError({"operation": ["Expected an object"]})
+        if (resource := operation.get("resource")) not in RESOURCES:
+            raise ApiError({"resource": [f"Must be one of: {', '.join(RESOURCES)}"]})
+        model, _, _, save = RESOURCES[resource]
+        if (op := operation.get("op")) not in ("create", "update", "delete"):
+            raise ApiError({"op": ["Must be one of: create, update, delete"]})
+        data = operation.get("data") or {}
+        if not isinstance(data, dict):
+            raise ApiError({"data": ["Expected an object"]})
+
+        if op == "create":
+            return {"id": save(data).pk}
+
+        pk = operation.get("id")
+        if not isinstance(pk, int) or isinstance(pk, bool):
+            raise ApiError({"id": ["Expected an integer"]})
+        instance = model.objects.filter(pk=pk).first()
+        if instance is None:
+            raise ApiError({"id": [f"{resource} {pk} does not exist"]}, 404)
+        if op == "update":
+            return {"id": save(data, instance=instance).pk}
+
+        instance.delete()
+        return {"id": pk}
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class TodoAppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "taskmanager_app"
+
+    def ready(self):
+        # Connect the signal receivers (item changes, database connections)
+        from . import signals  # noqa: F401
+        from .profiling import install_template_timing
+
+        # Time the template rendering of profiled requests
+        install_template_timing()
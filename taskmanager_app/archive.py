@@ -0,0 +1,121 @@
+"""Archive of completed items
+- Items completed more than ARCHIVE_AFTER_DAYS ago are moved to ArchivedItem in batches, hence, the item table and
+  its indexes only hold active work
+- Items other items still depend on (and the items those depend on) stay, as well as recurring series, upcoming
+  occurrences and items showing their description on a main category
+- Archived items keep their id, tag names and all other values, and are searched on demand (include_archive)
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .dependency_graph import get_dependency_graph
+from .models import RECURRENCE_NONE, ArchivedItem, MainCategoryItem, ToDoItem
+
+# Columns of ArchivedItem, all other columns of an item are kept in ArchivedItem.data
+ARCHIVED_COLUMNS = (
+    "id",
+    "title",
+    "description",
+    "tag_names",
+    "created_date",
+    "completed_date",
+)
+
+# Maximum number of archived items returned by a search
+ARCHIVE_SEARCH_LIMIT = 200
+
+
+def get_archivable_item_ids(cutoff, today) -> set:
+    """Returns the ids of the items completed before the cutoff which can be archived"""
+
+    candidates = set(
+        ToDoItem.objects.filter(completed=True, recurrence_rule=RECURRENCE_NONE)
+        # Items completed before completed dates were recorded: last modification
+        .filter(
+            Q(completed_date__lt=cutoff)
+            | Q(completed_date__isnull=True, modified_date__lt=cutoff)
+        )
+        .exclude(recurrence_date__gte=today)
+        .exclude(
+            pk__in=MainCategoryItem.objects.filter(
+                text_field_from_item__isnull=False
+            ).values("text_field_from_item")
+        )
+        .values_list("pk", flat=True)
+    )
+
+    child_ids = {}
+    for (parent_id, _), edges in get_dependency_graph().items():
+        child_ids.setdefault(parent_id, set()).update(
+            child_id for child_id, _, _ in edges
+        )
+
+    # Items depended on by items staying active stay as well, repeated up the dependency chains
+    while blocked := {
+        item_id
+        for item_id in candidates
+        if item_id in child_ids and not child_ids[item_id] <= candidates
+    }:
+        candidates -= blocked
+    return candidates
+
+
+def archive_items(item_ids) -> int:
+    """Moves items to the archive in one transaction, returns the number of archived items
+    - Deleting the items removes their tag links and records their removal in the change feed
+    """
+
+    columns = [field.attname for field in ToDoItem._meta.concrete_fields]
+    with transaction.atomic():
+        rows = list(ToDoItem.objects.filter(pk__in=item_ids).values(*columns))
+        ArchivedItem.objects.bulk_create(
+            [
+                ArchivedItem(
+                    **{column: row[column] for column in ARCHIVED_COLUMNS},
+                    data={
+                        column: row[column]
+                        for column in columns
+                        if column not in ARCHIVED_COLUMNS
+                    },
+                )
+                for row in rows
+            ]
+        )
+        ToDoItem.objects.filter(pk__in=[row["id"] for row in rows]).delete()
+    return len(rows)
+
+
+def archive_completed_items(days: int = None, batch_size: int = 500, now=None) -> int:
+    """Archives all items completed more than the given number of days ago in batches
+    - Returns the number of archived items
+    """
+
+    now = now or timezone.now()
+    if days is None:
+        days = settings.ARCHIVE_AFTER_DAYS
+
+    item_ids = sorted(
+        get_archivable_item_ids(now - timedelta(days=days), timezone.localdate(now))
+    )
+    archived_count = 0
+    for start in range(0, len(item_ids), batch_size):
+        archived_count += archive_items(item_ids[start : start + batch_size])
+    return archived_count
+
+
+def search_archived_items(query: str):
+    """Returns the archived items containing all words of the query in title, description or tags"""
+
+    results = ArchivedItem.objects.all()
+    for word in query.split() if query else []:
+        results = results.filter(
+            Q(title__icontains=word)
+            | Q(description__icontains=word)
+            | Q(tag_names__icontains=word)
+        )
+    return results[:ARCHIVE_SEARCH_LIMIT]
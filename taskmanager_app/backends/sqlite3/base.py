@@ -0,0 +1,31 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ("DEFERRED", "EXCLUSIVE", "IMMEDIATE")
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite backend starting transactions with OPTIONS["transaction_mode"] (e.g. BEGIN IMMEDIATE)
+    - Django 5.0 starts transactions with a plain BEGIN, the option was added to django.db.backends.sqlite3 in 5.1,
+      hence, this backend can be replaced by it when upgrading
+    """
+
+    transaction_mode = None
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        # Not an argument of sqlite3.connect()
+        transaction_mode = kwargs.pop("transaction_mode", None)
+        if transaction_mode and transaction_mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"settings.DATABASES[{self.alias!r}]['OPTIONS']['transaction_mode'] is improperly configured to "
+                f"{transaction_mode!r}. Use one of {', '.join(TRANSACTION_MODES)} or None."
+            )
+        self.transaction_mode = transaction_mode.upper() if transaction_mode else None
+        return kwargs
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f"BEGIN {self.transaction_mode}")
@@ -0,0 +1,18 @@
+from django.core.cache.backends.locmem import LocMemCache
+
+from .metrics import record_cache_lookup
+
+_missing = object()
+
+
+class MeteredLocMemCache(LocMemCache):
+    """Local-memory cache counting its hits and misses in the metrics (cache label: LOCATION)"""
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self.cache_name = name
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        record_cache_lookup(self.cache_name, value is not _missing)
+        return default if value is _missing else value
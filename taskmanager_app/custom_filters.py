@@ -1,4 +1,11 @@
+import json
+
 from django import template
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Max
+from django.urls import reverse
+
+from taskmanager_app.models import ItemChange
 
 register = template.Library()
 
@@ -7,3 +14,21 @@ register = template.Library()
 @register.filter
 def get_key(dictionary, key):
     return dictionary.get(key, None)
+
+
+@register.simple_tag(takes_context=True)
+def change_feed_config(context):
+    """Returns the JSON config of the change feed of a page: the last change id at rendering and the feed URLs
+    - Event streams are only offered when served by ASGI
+    """
+
+    last_id = ItemChange.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+    is_asgi = isinstance(context.get("request"), ASGIRequest)
+    return json.dumps(
+        {
+            "last_id": last_id,
+            "events_url": reverse("item_change_events") if is_asgi else None,
+            "poll_url": reverse("item_changes_poll"),
+            "row_url": reverse("item-row", args=[0]),
+        }
+    )
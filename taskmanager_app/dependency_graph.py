@@ -0,0 +1,424 @@
+"""In-memory graph of the date dependencies, used to preview the effect of changed dates before saving and to
+schedule the dependency chains (critical path)
+- The graph is cached per process and rebuilt when an item changed since (last id of the change feed)
+- A preview walks the dates depending on the edited item only and writes nothing
+- The schedule is recomputed only when the edges of the graph or the dates of its roots changed
+- update_all_dependent_dates writes the dates of all dependency chains (e.g. on the date rollover)
+"""
+
+import time
+from collections import deque
+from datetime import date, timedelta
+
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .metrics import (
+    DEPENDENCY_CHAIN_LENGTH,
+    DEPENDENCY_LINKS,
+    DEPENDENCY_PROPAGATION_DURATION,
+    DEPENDENCY_UPDATED_ITEMS,
+    record_cache_lookup,
+)
+from .models import (
+    DATE_FIELDS,
+    DEPENDENT_ON,
+    ITEM_UPDATED,
+    USE_TODAYS_DATE,
+    ItemChange,
+    ToDoItem,
+)
+from .utils import compute_critical_path, topological_sort
+
+# Date written by update_all_dependent_dates if the date depended on is not set
+MISSING_PARENT_DATE = date(1, 1, 1)
+
+# (change feed id the graph was built at, {(parent id, parent field): [(child id, child field, shift), ...]},
+#  signature of the edges)
+_graph = (None, {}, None)
+
+# ((signature of the edges, dates of the roots), {(item id, field): {...}})
+_schedule = (None, {})
+
+
+def load_dependency_graph() -> tuple:
+    """Returns the children of all dates other dates depend on and a signature of the edges
+    - Costs one query if no item changed
+    """
+
+    global _graph
+
+    version = ItemChange.objects.aggregate(last_id=Max("id"))["last_id"]
+    if _graph[0] is not None and _graph[0] == version:
+        record_cache_lookup("dependency_graph", True)
+        return _graph[1], _graph[2]
+
+    record_cache_lookup("dependency_graph", False)
+    children = {}
+    dependent_items = ToDoItem.objects.filter(
+        Q(date_start_earliest_depend=DEPENDENT_ON)
+        | Q(date_start_latest_depend=DEPENDENT_ON)
+        | Q(date_due_depend=DEPENDENT_ON)
+    ).values(
+        "id",
+        *(
+            f"{field}_depend{suffix}"
+            for field in DATE_FIELDS
+            for suffix in ("", "_id", "_type", "_shift")
+        ),
+    )
+    for item in dependent_items.iterator(chunk_size=2000):
+        for field in DATE_FIELDS:
+            if item[f"{field}_depend"] == DEPENDENT_ON:
+                children.setdefault(
+                    (item[f"{field}_depend_id"], item[f"{field}_depend_type"]), []
+                ).append((item["id"], field, item[f"{field}_depend_shift"]))
+
+    signature = hash(
+        frozenset(
+            (parent, *child) for parent, edges in children.items() for child in edges
+        )
+    )
+
+    # Replaced as a whole, hence, concurrent requests never see a partial graph
+    _graph = (version, children, signature)
+    return children, signature
+
+
+def get_dependency_graph() -> dict:
+    """Returns the children of all dates other dates depend on, costs one query if no item changed"""
+    return load_dependency_graph()[0]
+
+
+def shift_date(parent_date: date, shift: int) -> date:
+    if parent_date is None:
+        return MISSING_PARENT_DATE
+    return parent_date + timedelta(days=shift or 0)
+
+
+def get_draft_dates(draft: dict, item_id: int, today: date) -> dict:
+    """Returns the dates of the edited item resolved from its draft dependencies"""
+
+    dates = {field: draft.get(field) for field in DATE_FIELDS}
+    parents = {}
+    for field in DATE_FIELDS:
+        if draft.get(f"{field}_depend") == USE_TODAYS_DATE:
+            dates[field] = today
+        elif draft.get(f"{field}_depend") == DEPENDENT_ON:
+            parents[field] = (
+                draft.get(f"{field}_depend_id"),
+                draft.get(f"{field}_depend_type"),
+            )
+
+    # Dates of other items are loaded, dates of the item itself are resolved in order of dependency
+    parent_ids = {
+        parent_id for parent_id, _ in parents.values() if parent_id != item_id
+    }
+    parent_dates = {
+        item["id"]: item
+        for item in ToDoItem.objects.filter(pk__in=parent_ids).values(
+            "id", *DATE_FIELDS
+        )
+    }
+    # Dates depending on each other within the item (rejected on save) keep their draft values
+    for _ in DATE_FIELDS:
+        for field, (parent_id, parent_field) in list(parents.items()):
+            if parent_id != item_id:
+                parent_date = parent_dates.get(parent_id, {}).get(parent_field)
+            elif parent_field not in parents:
+                parent_date = dates.get(parent_field)
+            else:
+                continue
+            dates[field] = shift_date(parent_date, draft.get(f"{field}_depend_shift"))
+            del parents[field]
+
+    return dates
+
+
+def preview_dependent_dates(item_id: int, draft: dict, today: date) -> dict:
+    """Propagates the draft dates of an item to all dates depending on them, without writing
+    - Returns the resolved dates of the item and the changed dates of the dependent items
+    """
+
+    item_dates = get_draft_dates(draft, item_id, today)
+    if item_id is None:
+        return {"item": item_dates, "changes": []}
+
+    # A date depends on one date only, hence, breadth-first order resolves a parent before its children
+    children = get_dependency_graph()
+    order = []
+    visited = set()
+    queue = deque((item_id, field) for field in DATE_FIELDS)
+    while queue:
+        node = queue.popleft()
+        for child_id, child_field, shift in children.get(node, ()):
+            # Dependencies within the edited item are taken from the draft
+            if child_id != item_id and (child_id, child_field) not in visited:
+                visited.add((child_id, child_field))
+                order.append((node, child_id, child_field, shift))
+                queue.append((child_id, child_field))
+
+    saved_dates = {
+        item["id"]: item
+        for item in ToDoItem.objects.filter(
+            pk__in={child_id for _, child_id, _, _ in order}
+        ).values("id", "title", *DATE_FIELDS)
+    }
+    new_dates = {(item_id, field): item_dates[field] for field in DATE_FIELDS}
+    changes = []
+    for (parent_id, parent_field), child_id, child_field, shift in order:
+        if (saved := saved_dates.get(child_id)) is None:
+            continue
+        new_date = shift_date(new_dates.get((parent_id, parent_field)), shift)
+        new_dates[(child_id, child_field)] = new_date
+        if new_date != saved[child_field]:
+            changes.append(
+                {
+                    "id": child_id,
+                    "title": saved["title"],
+                    "field": child_field,
+                    "old": saved[child_field],
+                    "new": new_date,
+                }
+            )
+
+    return {"item": item_dates, "changes": changes}
+
+
+def get_schedule() -> dict:
+    """Returns earliest and latest date, slack and criticality of every date in a dependency chain
+    - {(item id, field): {"earliest", "latest", "slack", "critical", "root"}}, see compute_critical_path
+    - Costs two queries if neither the edges nor the dates of the roots changed
+    """
+
+    global _schedule
+
+    children, signature = load_dependency_graph()
+    child_nodes = {
+        (child_id, child_field)
+        for edges in children.values()
+        for child_id, child_field, _ in edges
+    }
+    roots = [node for node in children if node not in child_nodes]
+    items = {
+        item["id"]: item
+        for item in ToDoItem.objects.filter(
+            pk__in={root_id for root_id, _ in roots}
+        ).values("id", *DATE_FIELDS)
+    }
+    root_dates = {
+        (root_id, root_field): items.get(root_id, {}).get(root_field)
+        for root_id, root_field in roots
+    }
+
+    key = (signature, frozenset(root_dates.items()))
+    if _schedule[0] == key:
+        record_cache_lookup("schedule", True)
+        return _schedule[1]
+
+    record_cache_lookup("schedule", False)
+    schedule = compute_critical_path(
+        {
+            parent: [
+                ((child_id, child_field), shift)
+                for child_id, child_field, shift in edges
+            ]
+            for parent, edges in children.items()
+        },
+        root_dates,
+    )
+    _schedule = (key, schedule)
+    return schedule
+
+
+def get_item_schedule(schedule: dict) -> dict:
+    """Returns the least slack (days) of the dates of each item in dependency chains and whether one is critical
+    - {item id: (slack, critical)}, items without a scheduled date are missing
+    """
+
+    item_schedule = {}
+    for (item_id, _), entry in schedule.items():
+        if entry["slack"] is None:
+            continue
+        slack, critical = item_schedule.get(item_id, (entry["slack"], False))
+        item_schedule[item_id] = (
+            min(slack, entry["slack"]),
+            critical or entry["critical"],
+        )
+    return item_schedule
+
+
+def get_critical_paths(schedule: dict) -> list:
+    """Returns the critical dates of each chain in order of dependency: [[(item id, field), ...], ...]
+    - Only chains of more than one date
+    """
+
+    paths = {}
+    for node, entry in schedule.items():
+        if entry["critical"]:
+            paths.setdefault(entry["root"], []).append(node)
+    return [path for path in paths.values() if len(path) > 1]
+
+
+def get_date_dependency_chain(
+    return_error_msg: bool = False, form=None, item_id: int = None
+):
+    """Function to create chain of items with dates dependencies"""
+
+    dependent_items = ToDoItem.objects.filter(
+        Q(date_start_earliest_depend__in=[USE_TODAYS_DATE, DEPENDENT_ON])
+        | Q(date_start_latest_depend__in=[USE_TODAYS_DATE, DEPENDENT_ON])
+        | Q(date_due_depend__in=[USE_TODAYS_DATE, DEPENDENT_ON])
+    )
+
+    # Collect items data
+    dependency_data = {USE_TODAYS_DATE: {}, DEPENDENT_ON: []}
+    for item in dependent_items:
+        for field in (
+            "date_start_earliest_depend",
+            "date_start_latest_depend",
+            "date_due_depend",
+        ):
+            if getattr(item, field) == USE_TODAYS_DATE:
+                if item.id not in dependency_data[USE_TODAYS_DATE]:
+                    dependency_data[USE_TODAYS_DATE].update({item.id: []})
+                dependency_data[USE_TODAYS_DATE][item.id].append(
+                    field.replace("_depend", "")
+                )
+            elif getattr(item, field) == DEPENDENT_ON:
+                dependency_data[DEPENDENT_ON].append(
+                    {
+                        "id": item.id,
+                        "field": field.replace("_depend", ""),
+                        "from_field": getattr(item, f"{field}_type"),
+                        "from_id": getattr(item, f"{field}_id"),
+                        "shift_by": getattr(item, f"{field}_shift"),
+                    }
+                )
+
+    # If function called from edit item; add the selected form data instead of the saved
+    if return_error_msg and item_id and form and form.changed_data:
+        # Remove current version of item from dependent_items
+        dependent_items = [item for item in dependent_items if item.id != item_id]
+
+        # Add new version of item
+        item = form.cleaned_data
+
+        for field in (
+            "date_start_earliest_depend",
+            "date_start_latest_depend",
+            "date_due_depend",
+        ):
+            if item[field] == USE_TODAYS_DATE:
+                if item_id not in dependency_data[USE_TODAYS_DATE]:
+                    dependency_data[USE_TODAYS_DATE].update({item_id: []})
+                dependency_data[USE_TODAYS_DATE][item_id].append(
+                    field.replace("_depend", "")
+                )
+            elif item[field] == DEPENDENT_ON:
+                dependency_data[DEPENDENT_ON].append(
+                    {
+                        "id": item_id,
+                        "field": field.replace("_depend", ""),
+                        "from_field": item[f"{field}_type"],
+                        "from_id": item[f"{field}_id"],
+                        "shift_by": item[f"{field}_shift"],
+                    }
+                )
+
+    # Create unique id-field strings -> dependency_strings = [[child, parent], ...]:
+    dependency_strings = [
+        (
+            [
+                str(row["id"]) + "@" + row["field"],
+                str(row["from_id"]) + "@" + row["from_field"],
+            ]
+        )
+        for row in dependency_data[DEPENDENT_ON]
+    ]
+
+    # Make a topological sort of dependencies and check chain for recursive dependencies
+    sorted_strings, error_flag, form = topological_sort(
+        dependencies=dependency_strings,
+        return_error_msg=return_error_msg,
+        form=form,
+        item_id=item_id,
+    )
+
+    if error_flag:
+        return None, error_flag, form
+
+    # Sort dependency chain
+    sorted_positions = {node: index for index, node in enumerate(sorted_strings)}
+    dependency_data[DEPENDENT_ON] = sorted(
+        dependency_data[DEPENDENT_ON],
+        key=lambda d: sorted_positions[str(d["id"]) + "@" + d["field"]],
+    )
+
+    return dependency_data, False, form
+
+
+def update_all_dependent_dates(today: date = None) -> int:
+    """Function updates all dates dependent on other dates
+    - The dependency chain is resolved in memory and only changed items are written in one bulk pass
+    - Returns the number of updated items
+    """
+
+    start = time.perf_counter()
+    today = today or timezone.now().date()
+    dependency_chain, _, _ = get_date_dependency_chain()
+
+    # Load the current dates of all dependent items and the items they depend on
+    item_ids = set(dependency_chain[USE_TODAYS_DATE])
+    for row in dependency_chain[DEPENDENT_ON]:
+        item_ids.update((row["id"], row["from_id"]))
+    item_dates = {
+        item["id"]: item
+        for item in ToDoItem.objects.filter(pk__in=item_ids).values("id", *DATE_FIELDS)
+    }
+    changed_ids = set()
+
+    def set_item_date(item_id: int, field: str, new_date: date):
+        # Not loaded if deleted after the dependency chain was built
+        if (dates := item_dates.get(item_id)) and dates[field] != new_date:
+            dates[field] = new_date
+            changed_ids.add(item_id)
+
+    # Update all date dependencies
+    for item_id, fields in dependency_chain[USE_TODAYS_DATE].items():
+        for field in fields:
+            set_item_date(item_id, field, today)
+
+    # The chain is sorted in order of dependency, hence, a parent date is always updated before its children
+    chain_lengths = {}
+    for row in dependency_chain[DEPENDENT_ON]:
+        chain_lengths[(row["id"], row["field"])] = (
+            chain_lengths.get((row["from_id"], row["from_field"]), 0) + 1
+        )
+
+        # Item does not exist OR field in item is not set
+        if (from_item := item_dates.get(row["from_id"])) and (
+            from_date := from_item[row["from_field"]]
+        ):
+            new_date = from_date + timedelta(days=row["shift_by"])
+        else:
+            new_date = MISSING_PARENT_DATE
+
+        set_item_date(row["id"], row["field"], new_date)
+
+    modified_date = timezone.now()
+    ToDoItem.objects.bulk_update(
+        [
+            ToDoItem(**item_dates[item_id], modified_date=modified_date)
+            for item_id in changed_ids
+        ],
+        [*DATE_FIELDS, "modified_date"],
+        batch_size=500,
+    )
+    ItemChange.objects.record(changed_ids, ITEM_UPDATED)
+
+    DEPENDENCY_CHAIN_LENGTH.set(max(chain_lengths.values(), default=0))
+    DEPENDENCY_LINKS.set(len(dependency_chain[DEPENDENT_ON]))
+    DEPENDENCY_UPDATED_ITEMS.observe(len(changed_ids))
+    DEPENDENCY_PROPAGATION_DURATION.observe(time.perf_counter() - start)
+    return len(changed_ids)
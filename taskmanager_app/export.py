@@ -0,0 +1,195 @@
+"""Streaming CSV and XLSX exports
+- Rows are encoded while they are read from the database, hence, memory does not grow with the number of rows
+- XLSX files are written as a zip stream with inline strings (no shared string table to keep in memory and no
+  temporary file), without depending on a spreadsheet library
+"""
+
+import csv
+import re
+import zipfile
+from datetime import date
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+
+CSV = "csv"
+XLSX = "xlsx"
+
+EXPORT_CONTENT_TYPES = {
+    CSV: "text/csv; charset=utf-8",
+    XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# Rows encoded before the buffered output is sent
+FLUSH_ROWS = 500
+
+# Day 0 of the date serial numbers of spreadsheets (incl. the 1900 leap year bug of Excel)
+SPREADSHEET_EPOCH = date(1899, 12, 30)
+# Cell styles of styles.xml: default, date, header
+DATE_STYLE = 1
+HEADER_STYLE = 2
+
+# Characters not allowed in XML
+INVALID_XML_CHARACTERS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+XLSX_STATIC_FILES = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        "</Types>"
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        "</Relationships>"
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/>'
+        "</Relationships>"
+    ),
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+        '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+        "</styleSheet>"
+    ),
+}
+
+
+class StreamBuffer:
+    """Write-only file collecting the written data until it is taken
+    - Not seekable (no tell), hence, zipfile writes entries with trailing data descriptors
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data) -> int:
+        self.chunks.append(data.encode() if isinstance(data, str) else data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def stream_csv(header: list, rows):
+    """Yields the encoded CSV lines (with a byte order mark, so spreadsheets detect UTF-8) in chunks"""
+
+    buffer = StreamBuffer()
+    buffer.write("\ufeff")
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(
+            [value.isoformat() if isinstance(value, date) else value for value in row]
+        )
+        if count % FLUSH_ROWS == 0:
+            yield buffer.take()
+    yield buffer.take()
+
+
+def xlsx_cell(value, style: int = 0) -> str:
+    style_attribute = f' s="{style}"' if style else ""
+    if value is None or value == "":
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f"<c{style_attribute}><v>{value!r}</v></c>"
+    # Dates before 1900 (e.g. of broken dependencies) have no serial number
+    if isinstance(value, date) and value.year >= 1900:
+        return f'<c s="{DATE_STYLE}"><v>{(value - SPREADSHEET_EPOCH).days}</v></c>'
+    text = escape(INVALID_XML_CHARACTERS.sub("", str(value)))
+    return f'<c t="inlineStr"{style_attribute}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def stream_xlsx(header: list, rows, sheet_name: str = "Sheet1"):
+    """Yields a workbook with one sheet holding the header (bold) and the rows in chunks"""
+
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as workbook:
+        for name, content in XLSX_STATIC_FILES.items():
+            workbook.writestr(name, content)
+        workbook.writestr(
+            "xl/workbook.xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(sheet_name)}" sheetId="1" r:id="rId1"/></sheets>'
+            "</workbook>",
+        )
+        yield buffer.take()
+
+        with workbook.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b'<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" '
+                b'activePane="bottomLeft" state="frozen"/></sheetView></sheetViews><sheetData>'
+            )
+            sheet.write(
+                (
+                    "<row>"
+                    + "".join(xlsx_cell(value, HEADER_STYLE) for value in header)
+                    + "</row>"
+                ).encode()
+            )
+            for count, row in enumerate(rows, 1):
+                sheet.write(
+                    (
+                        "<row>" + "".join(xlsx_cell(value) for value in row) + "</row>"
+                    ).encode()
+                )
+                if count % FLUSH_ROWS == 0:
+                    yield buffer.take()
+            sheet.write(b"</sheetData></worksheet>")
+    yield buffer.take()
+
+
+def export_response(
+    export_format: str, header: list, rows, filename: str
+) -> StreamingHttpResponse:
+    """Returns a download streaming the rows in the given format (CSV or XLSX), the sheet is named as the file"""
+
+    if export_format == XLSX:
+        content = stream_xlsx(header, rows, sheet_name=filename)
+    else:
+        content = stream_csv(header, rows)
+    response = StreamingHttpResponse(
+        content, content_type=EXPORT_CONTENT_TYPES[export_format]
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{filename}.{export_format}"'
+    )
+    return response
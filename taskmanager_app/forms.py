@@ -35,6 +35,9 @@ class ToDoItemForm(ModelForm):
             "date_start_earliest_depend_shift",
             "date_start_latest_depend_shift",
             "date_due_depend_shift",
+            "recurrence_rule",
+            "recurrence_interval",
+            "recurrence_end",
         ]
         widgets = {
             "title": forms.TextInput(attrs={"placeholder": "Title..."}),
@@ -42,6 +45,7 @@ class ToDoItemForm(ModelForm):
             "date_start_earliest": DateInput(),
             "date_start_latest": DateInput(),
             "date_due": DateInput(),
+            "recurrence_end": DateInput(),
             "date_start_earliest_depend_id": forms.TextInput(
                 attrs={"placeholder": "item-id"}
             ),
@@ -52,6 +56,16 @@ class ToDoItemForm(ModelForm):
         }
 
 
+class DependencyPreviewForm(ModelForm):
+    """Date fields of the item form, validated on their own for the preview of dependent dates"""
+
+    class Meta:
+        model = ToDoItem
+        fields = [
+            field for field in ToDoItemForm.Meta.fields if field.startswith("date_")
+        ]
+
+
 class MainCategoryItemEditForm(ModelForm):
     class Meta:
         model = MainCategoryItem
@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from taskmanager_app.archive import archive_completed_items
+
+
+class Command(BaseCommand):
+    help = "Moves items completed more than ARCHIVE_AFTER_DAYS ago to the archive"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.ARCHIVE_AFTER_DAYS,
+            help="Archive items completed more than this many days ago",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of items moved per transaction",
+        )
+
+    def handle(self, *args, **options):
+        start_time = time.perf_counter()
+        archived_count = archive_completed_items(
+            days=options["days"], batch_size=options["batch_size"]
+        )
+        self.stdout.write(
+            f"Archived {archived_count} items in {time.perf_counter() - start_time:.2f}s"
+        )
@@ -0,0 +1,157 @@
+import statistics
+import time
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory
+from django.utils import timezone
+from taggit.models import Tag
+
+from taskmanager_app.models import (
+    MainCategoryItem,
+    ToDoItem,
+    TodoItem_tag,
+    join_tag_names,
+)
+from taskmanager_app.views import MainCategoryItemShowAll
+
+TEMPLATE_NAME = "taskmanager_app/maincategoryitem_show_all.html"
+BENCHMARK_PREFIX = "benchmark"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the render time of the main category overview with the uncached and the cached template "
+        "loader (benchmark items are created in a transaction, which is rolled back)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--items",
+            type=int,
+            default=5000,
+            help="Number of items to render",
+        )
+        parser.add_argument(
+            "--categories",
+            type=int,
+            default=5,
+            help="Number of main categories the items are spread over",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of renders per configuration (the median is reported)",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            create_benchmark_items(options["items"], options["categories"])
+            request = RequestFactory().get("/main_category_all/")
+            view = MainCategoryItemShowAll()
+            view.setup(request)
+            context = async_to_sync(view.get_context_data)()
+
+            fragments = caches["fragments"]
+            results = {}
+            for label, cached_loader, warm_fragments in (
+                ("Uncached loader", False, False),
+                ("Cached loader", True, False),
+                ("Cached loader, warm fragment cache", True, True),
+            ):
+                template = get_engine(cached_loader).get_template(TEMPLATE_NAME)
+                durations = []
+                for _ in range(options["repeat"]):
+                    if not warm_fragments:
+                        fragments.clear()
+                    start = time.perf_counter()
+                    template.render(context, request)
+                    durations.append(time.perf_counter() - start)
+                results[label] = durations
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"Render time of {TEMPLATE_NAME} with {options['items']} items "
+            f"(median of {options['repeat']}, min in brackets):"
+        )
+        for label, durations in results.items():
+            self.stdout.write(
+                f"  {label}: {statistics.median(durations) * 1000:.1f}ms "
+                f"({min(durations) * 1000:.1f}ms)"
+            )
+
+
+def get_engine(cached_loader: bool) -> DjangoTemplates:
+    """Returns a new template engine with the project options, with or without the cached loader"""
+
+    config = settings.TEMPLATES[0]
+    options = {**config["OPTIONS"]}
+    options["loaders"] = (
+        [("django.template.loaders.cached.Loader", settings.TEMPLATE_LOADERS)]
+        if cached_loader
+        else settings.TEMPLATE_LOADERS
+    )
+    return DjangoTemplates(
+        {
+            "NAME": f"{BENCHMARK_PREFIX}-{'cached' if cached_loader else 'uncached'}",
+            "DIRS": config["DIRS"],
+            "APP_DIRS": False,
+            "OPTIONS": options,
+        }
+    )
+
+
+def create_benchmark_items(item_count: int, category_count: int):
+    """Creates items spread over main categories and their sub categories with bulk inserts"""
+
+    today = timezone.now().date()
+    category_tags = [
+        Tag.objects.create(name=f"{BENCHMARK_PREFIX}-category-{index}")
+        for index in range(category_count)
+    ]
+    sub_category_tags = [
+        Tag.objects.create(name=f"{BENCHMARK_PREFIX}-sub-{index}")
+        for index in range(category_count * 2)
+    ]
+    for index, tag in enumerate(category_tags):
+        main_category = MainCategoryItem.objects.create(color=f"#{index * 40:02x}8080")
+        main_category.main_category.add(tag)
+        main_category.sub_categories.add(*sub_category_tags[index * 2 : index * 2 + 2])
+
+    item_tags = [
+        (
+            category_tags[index % category_count],
+            sub_category_tags[index % category_count * 2 + index // category_count % 2],
+        )
+        for index in range(item_count)
+    ]
+    items = ToDoItem.objects.bulk_create(
+        [
+            ToDoItem(
+                title=f"{BENCHMARK_PREFIX} item {index}",
+                description=f"Description of **item {index}** with a [link](https://example.com/{index})",
+                date_due=today + timedelta(days=index % 60),
+                tag_names=join_tag_names([tag.name for tag in tags]),
+            )
+            for index, tags in enumerate(item_tags)
+        ],
+        batch_size=1000,
+    )
+
+    content_type = ContentType.objects.get_for_model(ToDoItem)
+    TodoItem_tag.objects.bulk_create(
+        [
+            TodoItem_tag(content_type=content_type, object_id=item.pk, tag_id=tag.pk)
+            for item, tags in zip(items, item_tags)
+            for tag in tags
+        ],
+        batch_size=1000,
+    )
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from taskmanager_app.recurrence import generate_recurring_items
+
+
+class Command(BaseCommand):
+    help = "Creates the upcoming occurrences of all recurring items"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--horizon-days",
+            type=int,
+            default=settings.RECURRENCE_HORIZON_DAYS,
+            help="Number of days ahead to create occurrences for",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Number of recurring items processed per batch",
+        )
+
+    def handle(self, *args, **options):
+        start_time = time.perf_counter()
+        created_count, skipped_count = generate_recurring_items(
+            horizon_days=options["horizon_days"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(
+            f"Created {created_count} occurrences in {time.perf_counter() - start_time:.2f}s"
+        )
+        if skipped_count:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Skipped {skipped_count} occurrences conflicting with existing items (e.g. same title)"
+                )
+            )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from taskmanager_app.ordering import (
+    ORDERABLE_MODELS,
+    needs_rebalance,
+    rebalance_priorities,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Gives items and main categories distinct sorting priorities for drag and drop, renumbers a group if rows "
+        "share a priority or gaps got too small (MIN_PRIORITY_GAP)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Renumber all groups, also those with large enough gaps",
+        )
+
+    def handle(self, *args, **options):
+        for resource in ORDERABLE_MODELS:
+            if options["force"] or needs_rebalance(resource):
+                priorities = rebalance_priorities(resource)
+                self.stdout.write(
+                    f"Renumbered the priorities of {len(priorities)} {resource} rows"
+                )
+            else:
+                self.stdout.write(f"The priorities of {resource} rows are distinct")
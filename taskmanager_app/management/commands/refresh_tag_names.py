@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from taskmanager_app.models import MainCategoryItem, ToDoItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrites the denormalized tag names of all items and the names of all main categories from their tags "
+        "(after adding the columns or after tag links were written without signals)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Number of items refreshed per batch",
+        )
+
+    def handle(self, *args, **options):
+        item_ids = list(ToDoItem.objects.order_by("pk").values_list("pk", flat=True))
+        batch_size = options["batch_size"]
+        for start in range(0, len(item_ids), batch_size):
+            ToDoItem.objects.filter(
+                pk__in=item_ids[start : start + batch_size]
+            ).refresh_tag_names()
+        self.stdout.write(f"Refreshed the tag names of {len(item_ids)} items")
+
+        category_count = len(MainCategoryItem.objects.all().refresh_names())
+        self.stdout.write(f"Refreshed the names of {category_count} main categories")
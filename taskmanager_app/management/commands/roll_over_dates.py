@@ -0,0 +1,49 @@
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from taskmanager_app.rollover import get_dates_stale_since, roll_over_dates
+
+
+class Command(BaseCommand):
+    help = (
+        'Sets all "today\'s date" fields and the dates depending on them to today. '
+        "Run once per day (e.g. by cron) or keep running with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and roll over dates every day just after midnight",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Roll over dates even if already done today",
+        )
+
+    def handle(self, *args, **options):
+        self.roll_over(force=options["force"])
+
+        while options["loop"]:
+            now = timezone.now()
+            next_midnight = datetime.combine(
+                now.date() + timedelta(days=1), datetime.min.time(), tzinfo=now.tzinfo
+            )
+            time.sleep((next_midnight - now).total_seconds() + 1)
+            self.roll_over()
+
+    def roll_over(self, force: bool = False):
+        today = timezone.now().date()
+        stale_since = get_dates_stale_since(today)
+        if stale_since is None and not force:
+            self.stdout.write(f"Dates already rolled over to {today}")
+            return
+
+        updated_count = roll_over_dates(today)
+        self.stdout.write(
+            f"Rolled over dates to {today}: {updated_count} items updated"
+        )
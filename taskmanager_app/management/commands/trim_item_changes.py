@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from taskmanager_app.models import ItemChange
+
+
+class Command(BaseCommand):
+    help = "Deletes item changes of the change feed older than CHANGE_LOG_MAX_AGE_DAYS"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-age-days",
+            type=int,
+            default=None,
+            help="Keep changes of this many days (default: CHANGE_LOG_MAX_AGE_DAYS)",
+        )
+
+    def handle(self, *args, **options):
+        deleted_count = ItemChange.objects.trim(max_age_days=options["max_age_days"])
+        self.stdout.write(f"Deleted {deleted_count} item changes")
@@ -0,0 +1,280 @@
+"""In-process metrics exposed in the Prometheus text format (see the metrics view)
+- Every thread records into its own shard, hence, recording takes no lock (only its first sample registers the shard)
+- A scrape sums the shards, shards of finished threads are merged into the totals once and dropped
+- Metrics are per process, every worker process has to be scraped
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# View label of requests not matching any URL pattern and method label of uncommon methods
+UNMATCHED_VIEW = "unmatched"
+OTHER_METHOD = "other"
+KNOWN_METHODS = ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS")
+
+_registry = []
+_local = threading.local()
+# Shards of all threads that recorded a sample: [(thread, shard)]
+_shards = []
+# Samples of finished threads
+_retired = {}
+_gauges = {}
+# Only taken to register a shard and to scrape, never while recording
+_scrape_lock = threading.Lock()
+
+# Metrics of the current request, None outside of requests
+_request_metrics = ContextVar("request_metrics", default=None)
+
+
+def _get_shard() -> dict:
+    try:
+        return _local.shard
+    except AttributeError:
+        shard = _local.shard = {}
+        with _scrape_lock:
+            _shards.append((threading.current_thread(), shard))
+        return shard
+
+
+def _merge(totals: dict, shard: dict):
+    for key, value in shard.items():
+        if isinstance(value, list):
+            if (total := totals.get(key)) is None:
+                totals[key] = list(value)
+            else:
+                for index, count in enumerate(value):
+                    total[index] += count
+        else:
+            totals[key] = totals.get(key, 0) + value
+
+
+def _collect() -> dict:
+    """Returns the sum of all shards"""
+
+    with _scrape_lock:
+        live_shards = []
+        for thread, shard in _shards:
+            if thread.is_alive():
+                live_shards.append((thread, shard))
+            else:
+                _merge(_retired, shard)
+        _shards[:] = live_shards
+
+        totals = {}
+        _merge(totals, _retired)
+        for _thread, shard in live_shards:
+            # dict.copy() is atomic, the owner thread may record concurrently
+            _merge(totals, shard.copy())
+    totals.update(_gauges)
+    return totals
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name: str, help_text: str, label_names: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        _registry.append(self)
+
+    def format_labels(self, labels: tuple, extra: str = "") -> str:
+        pairs = [
+            f'{name}="{escape_label_value(value)}"'
+            for name, value in zip(self.label_names, labels)
+        ]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def format_samples(self, labels: tuple, value) -> list:
+        return [f"{self.name}{self.format_labels(labels)} {format_value(value)}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        shard = _get_shard()
+        key = (self, labels)
+        shard[key] = shard.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        _gauges[(self, labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: tuple = (), buckets=()):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        """Counts the value in its bucket
+        - Samples: [count per bucket ..., count above the last bucket, sum]
+        """
+
+        shard = _get_shard()
+        key = (self, labels)
+        if (samples := shard.get(key)) is None:
+            samples = shard[key] = [0] * (len(self.buckets) + 2)
+        samples[bisect_left(self.buckets, value)] += 1
+        samples[-1] += value
+
+    def format_samples(self, labels: tuple, value) -> list:
+        lines = []
+        cumulative_count = 0
+        for bucket, count in zip((*self.buckets, "+Inf"), value[:-1]):
+            cumulative_count += count
+            le = f'le="{format_value(bucket)}"'
+            lines.append(
+                f"{self.name}_bucket{self.format_labels(labels, le)} {cumulative_count}"
+            )
+        lines.append(
+            f"{self.name}_sum{self.format_labels(labels)} {format_value(value[-1])}"
+        )
+        lines.append(
+            f"{self.name}_count{self.format_labels(labels)} {cumulative_count}"
+        )
+        return lines
+
+
+def escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_value(value) -> str:
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+def render_metrics() -> str:
+    """Returns all metrics in the Prometheus text exposition format"""
+
+    totals = _collect()
+    samples_by_metric = {metric: [] for metric in _registry}
+    for (metric, labels), value in totals.items():
+        samples_by_metric[metric].append((labels, value))
+
+    lines = []
+    for metric, samples in samples_by_metric.items():
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for labels, value in sorted(samples, key=lambda sample: sample[0]):
+            lines.extend(metric.format_samples(labels, value))
+    return "\n".join(lines) + "\n"
+
+
+# Requests
+REQUEST_DURATION = Histogram(
+    "taskmanager_request_duration_seconds",
+    "Request latency by URL name",
+    ("view", "method"),
+    LATENCY_BUCKETS,
+)
+REQUESTS = Counter(
+    "taskmanager_requests_total",
+    "Requests by URL name and status code",
+    ("view", "method", "status"),
+)
+REQUEST_QUERIES = Histogram(
+    "taskmanager_request_queries",
+    "Database queries per request by URL name",
+    ("view",),
+    COUNT_BUCKETS,
+)
+QUERIES = Counter(
+    "taskmanager_db_queries_total",
+    "Database queries of requests by URL name",
+    ("view",),
+)
+
+# Caches, the hit ratio is hits / (hits + misses)
+CACHE_REQUESTS = Counter(
+    "taskmanager_cache_requests_total",
+    "Cache lookups by cache and result (hit or miss)",
+    ("cache", "result"),
+)
+
+# Dependency engine (update_all_dependent_dates and topological_sort)
+DEPENDENCY_CHAIN_LENGTH = Gauge(
+    "taskmanager_dependency_chain_length",
+    "Longest chain of date dependencies in the last propagation run",
+)
+DEPENDENCY_LINKS = Gauge(
+    "taskmanager_dependency_links",
+    "Date dependencies resolved in the last propagation run",
+)
+DEPENDENCY_UPDATED_ITEMS = Histogram(
+    "taskmanager_dependency_updated_items",
+    "Items updated per propagation run",
+    (),
+    COUNT_BUCKETS,
+)
+DEPENDENCY_PROPAGATION_DURATION = Histogram(
+    "taskmanager_dependency_propagation_duration_seconds",
+    "Duration of propagation runs",
+    (),
+    LATENCY_BUCKETS,
+)
+DEPENDENCY_CYCLE_REJECTIONS = Counter(
+    "taskmanager_dependency_cycle_rejections_total",
+    "Dependencies rejected because of a cycle (topological_sort and the item form check)",
+)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+class RequestMetrics:
+    __slots__ = ("query_count", "start")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.query_count = 0
+
+
+def start_request_metrics():
+    """Starts measuring the current request, returns the token to end it"""
+    return _request_metrics.set(RequestMetrics())
+
+
+def end_request_metrics(token, request, response):
+    """Records latency, status and query count of the request by its URL name"""
+
+    request_metrics = _request_metrics.get()
+    _request_metrics.reset(token)
+    duration = time.perf_counter() - request_metrics.start
+
+    resolver_match = getattr(request, "resolver_match", None)
+    view = resolver_match.view_name if resolver_match else UNMATCHED_VIEW
+    method = request.method if request.method in KNOWN_METHODS else OTHER_METHOD
+
+    REQUEST_DURATION.observe(duration, view, method)
+    REQUESTS.inc(view, method, str(response.status_code))
+    REQUEST_QUERIES.observe(request_metrics.query_count, view)
+    if request_metrics.query_count:
+        QUERIES.inc(view, amount=request_metrics.query_count)
+    return response
+
+
+def count_query(execute, sql, params, many, context):
+    """Database execute wrapper counting the queries of the current request"""
+
+    if (request_metrics := _request_metrics.get()) is not None:
+        request_metrics.query_count += 1
+    return execute(sql, params, many, context)
@@ -0,0 +1,111 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .metrics import end_request_metrics, start_request_metrics
+from .profiling import end_profile, start_profile
+from .routers import end_request, get_request_state, is_read_from_replica, start_request
+
+REPLICA_STICKY_COOKIE = "read_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+
+class ReplicaRoutingMiddleware:
+    """Routes the reads of views marked with read_from_replica to the replica
+    - After a writing request (any unsafe method), the reads of the client stick to the primary for
+      REPLICA_STICKY_SECONDS (cookie), so users see their own edits while the replica catches up
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = start_request()
+        try:
+            return self.set_sticky_cookie(request, self.get_response(request))
+        finally:
+            end_request(token)
+
+    async def __acall__(self, request):
+        token = start_request()
+        try:
+            return self.set_sticky_cookie(request, await self.get_response(request))
+        finally:
+            end_request(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        get_request_state()["replica"] = (
+            request.method in SAFE_METHODS
+            and REPLICA_STICKY_COOKIE not in request.COOKIES
+            and is_read_from_replica(view_func)
+        )
+
+    @staticmethod
+    def set_sticky_cookie(request, response):
+        if request.method not in SAFE_METHODS:
+            response.set_cookie(
+                REPLICA_STICKY_COOKIE,
+                "1",
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+class ProfilingMiddleware:
+    """Profiles a sample of the requests (PROFILING_SAMPLE_RATE), see profiling"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if (token := start_profile()) is None:
+            return self.get_response(request)
+        return end_profile(token, request, self.get_response(request))
+
+    async def __acall__(self, request):
+        if (token := start_profile()) is None:
+            return await self.get_response(request)
+        return end_profile(token, request, await self.get_response(request))
+
+
+class MetricsMiddleware:
+    """Records latency, status and query count of every request by URL name (METRICS_ENABLED), see metrics"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = start_request_metrics()
+        return end_request_metrics(token, request, self.get_response(request))
+
+    async def __acall__(self, request):
+        token = start_request_metrics()
+        return end_request_metrics(token, request, await self.get_response(request))
@@ -0,0 +1,117 @@
+# Generated by Django 5.0.6 on 2026-10-19 11:24
+
+import colorfield.fields
+import django.db.models.deletion
+import django.db.models.functions.text
+import martor.models
+import taggit_selectize.managers
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MainCategoryItem_excluded',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.IntegerField(db_index=True, verbose_name='object ID')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(app_label)s_%(class)s_tagged_items', to='contenttypes.contenttype', verbose_name='content type')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(app_label)s_%(class)s_items', to='taggit.tag')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MainCategoryItem_main',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.IntegerField(db_index=True, verbose_name='object ID')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(app_label)s_%(class)s_tagged_items', to='contenttypes.contenttype', verbose_name='content type')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(app_label)s_%(class)s_items', to='taggit.tag')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MainCategoryItem_sub',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.IntegerField(db_index=True, verbose_name='object ID')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(app_label)s_%(class)s_tagged_items', to='contenttypes.contenttype', verbose_name='content type')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(app_label)s_%(class)s_items', to='taggit.tag')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='TodoItem_tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.IntegerField(db_index=True, verbose_name='object ID')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(app_label)s_%(class)s_tagged_items', to='contenttypes.contenttype', verbose_name='content type')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(app_label)s_%(class)s_items', to='taggit.tag')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MainCategoryItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('text_field_from_item', models.IntegerField(blank=True, default=None, help_text='Item ID to show description text', null=True)),
+                ('color', colorfield.fields.ColorField(default='#FFFFFF', image_field=None, max_length=25, samples=None)),
+                ('sorting_priority', models.FloatField(blank=True, default=0)),
+                ('excluded_tags', taggit_selectize.managers.TaggableManager(blank=True, help_text='A comma-separated list of tags.', through='taskmanager_app.MainCategoryItem_excluded', to='taggit.Tag', verbose_name='Tags')),
+                ('main_category', taggit_selectize.managers.TaggableManager(help_text='A comma-separated list of tags.', through='taskmanager_app.MainCategoryItem_main', to='taggit.Tag', verbose_name='Tags')),
+                ('sub_categories', taggit_selectize.managers.TaggableManager(blank=True, help_text='A comma-separated list of tags.', through='taskmanager_app.MainCategoryItem_sub', to='taggit.Tag', verbose_name='Tags')),
+            ],
+            options={
+                'ordering': ['-sorting_priority', django.db.models.functions.text.Lower('main_category__name'), 'id'],
+                'indexes': [models.Index(fields=['created_date'], name='taskmanager_created_a87dd8_idx'), models.Index(fields=['text_field_from_item'], name='taskmanager_text_fi_736836_idx'), models.Index(fields=['color'], name='taskmanager_color_b06601_idx'), models.Index(fields=['sorting_priority'], name='taskmanager_sorting_a5712d_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ToDoItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('title', models.CharField(default=None, max_length=200, unique=True)),
+                ('description', martor.models.MartorField(blank=True)),
+                ('completed', models.BooleanField(blank=True, default=False)),
+                ('date_start_earliest', models.DateField(blank=True, null=True)),
+                ('date_start_latest', models.DateField(blank=True, null=True)),
+                ('date_due', models.DateField(blank=True, null=True)),
+                ('date_start_earliest_depend', models.CharField(choices=[('do_not_overrule', 'Do not overrule'), ('use_todays_date', "Use today's date"), ('dependent_on', 'Dependent on…')], default='do_not_overrule', max_length=100)),
+                ('date_start_latest_depend', models.CharField(choices=[('do_not_overrule', 'Do not overrule'), ('use_todays_date', "Use today's date"), ('dependent_on', 'Dependent on…')], default='do_not_overrule', max_length=100)),
+                ('date_due_depend', models.CharField(choices=[('do_not_overrule', 'Do not overrule'), ('use_todays_date', "Use today's date"), ('dependent_on', 'Dependent on…')], default='do_not_overrule', max_length=100)),
+                ('date_start_earliest_depend_id', models.IntegerField(blank=True, default=None, help_text='Item ID (see url of items)', null=True)),
+                ('date_start_latest_depend_id', models.IntegerField(blank=True, default=None, help_text='Item ID (see url of items)', null=True)),
+                ('date_due_depend_id', models.IntegerField(blank=True, default=None, help_text='Item ID (see url of items)', null=True)),
+                ('date_start_earliest_depend_type', models.CharField(choices=[('date_start_earliest', 'Start earliest'), ('date_start_latest', 'Start latest'), ('date_due', 'Due date')], default='date_due', max_length=100, null=True)),
+                ('date_start_latest_depend_type', models.CharField(choices=[('date_start_earliest', 'Start earliest'), ('date_start_latest', 'Start latest'), ('date_due', 'Due date')], default='date_due', max_length=100, null=True)),
+                ('date_due_depend_type', models.CharField(choices=[('date_start_earliest', 'Start earliest'), ('date_start_latest', 'Start latest'), ('date_due', 'Due date')], default='date_due', max_length=100, null=True)),
+                ('date_start_earliest_depend_shift', models.IntegerField(blank=True, default=0)),
+                ('date_start_latest_depend_shift', models.IntegerField(blank=True, default=0)),
+                ('date_due_depend_shift', models.IntegerField(blank=True, default=0)),
+                ('sorting_priority', models.FloatField(blank=True, default=0)),
+                ('tags', taggit_selectize.managers.TaggableManager(blank=True, help_text='A comma-separated list of tags.', through='taskmanager_app.TodoItem_tag', to='taggit.Tag', verbose_name='Tags')),
+            ],
+            options={
+                'ordering': ['date_start_earliest', 'date_start_latest', 'date_due', '-sorting_priority', django.db.models.functions.text.Lower('title'), 'id'],
+                'indexes': [models.Index(fields=['title'], name='taskmanager_title_bdb0c1_idx'), models.Index(fields=['description'], name='taskmanager_descrip_ed64ff_idx'), models.Index(fields=['completed'], name='taskmanager_complet_a7c6a4_idx'), models.Index(fields=['date_start_earliest'], name='taskmanager_date_st_2aeb04_idx'), models.Index(fields=['date_start_latest'], name='taskmanager_date_st_39c9ec_idx'), models.Index(fields=['date_due'], name='taskmanager_date_du_548f8f_idx'), models.Index(fields=['date_start_earliest_depend'], name='taskmanager_date_st_ab68da_idx'), models.Index(fields=['date_start_latest_depend'], name='taskmanager_date_st_05384e_idx'), models.Index(fields=['date_due_depend'], name='taskmanager_date_du_e6e97b_idx'), models.Index(fields=['sorting_priority'], name='taskmanager_sorting_6205a6_idx')],
+            },
+        ),
+    ]
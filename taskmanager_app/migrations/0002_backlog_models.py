@@ -0,0 +1,199 @@
+# Generated by Django 5.0.6 on 2026-10-19 11:25
+
+import django.core.serializers.json
+import django.db.models.deletion
+import martor.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        ('taskmanager_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', martor.models.MartorField(blank=True)),
+                ('tag_names', models.TextField(blank=True, default='')),
+                ('created_date', models.DateTimeField()),
+                ('completed_date', models.DateTimeField(blank=True, null=True)),
+                ('archived_date', models.DateTimeField(auto_now_add=True)),
+                ('data', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+            ],
+            options={
+                'ordering': ['-completed_date', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ItemChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('c', 'Created'), ('u', 'Updated'), ('d', 'Deleted')], max_length=1)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ItemRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_id', models.BigIntegerField()),
+                ('number', models.PositiveIntegerField()),
+                ('snapshot_number', models.PositiveIntegerField()),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.BinaryField()),
+                ('checksum', models.CharField(max_length=32)),
+                ('data', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+            ],
+            options={
+                'ordering': ['item_id', '-number'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ScheduledTaskRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=100, unique=True)),
+                ('last_run_date', models.DateField()),
+                ('last_run_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterModelOptions(
+            name='maincategoryitem',
+            options={'ordering': ['-sorting_priority', 'slug', 'id']},
+        ),
+        migrations.RemoveIndex(
+            model_name='todoitem',
+            name='taskmanager_complet_a7c6a4_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='todoitem',
+            name='taskmanager_date_st_2aeb04_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='todoitem',
+            name='taskmanager_date_st_39c9ec_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='todoitem',
+            name='taskmanager_date_du_548f8f_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='todoitem',
+            name='taskmanager_sorting_6205a6_idx',
+        ),
+        migrations.AddField(
+            model_name='maincategoryitem',
+            name='name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='maincategoryitem',
+            name='slug',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='todoitem',
+            name='completed_date',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='todoitem',
+            name='modified_date',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='todoitem',
+            name='recurrence_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='todoitem',
+            name='recurrence_end',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='todoitem',
+            name='recurrence_interval',
+            field=models.PositiveIntegerField(blank=True, default=1, help_text='Repeat every n days/weeks/months'),
+        ),
+        migrations.AddField(
+            model_name='todoitem',
+            name='recurrence_rule',
+            field=models.CharField(choices=[('none', 'Does not repeat'), ('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly'), ('custom', 'Custom (days)')], default='none', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='todoitem',
+            name='recurrence_series',
+            field=models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='taskmanager_app.todoitem'),
+        ),
+        migrations.AddField(
+            model_name='todoitem',
+            name='recurrence_start',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='todoitem',
+            name='tag_names',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='todoitem',
+            index=models.Index(fields=['completed', 'id'], name='taskmanager_complet_b03315_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todoitem',
+            index=models.Index(fields=['completed_date'], name='taskmanager_complet_ebb6f6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todoitem',
+            index=models.Index(fields=['date_start_earliest', 'id'], name='taskmanager_date_st_06c5f1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todoitem',
+            index=models.Index(fields=['date_start_latest', 'id'], name='taskmanager_date_st_ab8df5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todoitem',
+            index=models.Index(fields=['date_due', 'id'], name='taskmanager_date_du_d64af7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todoitem',
+            index=models.Index(fields=['sorting_priority', 'id'], name='taskmanager_sorting_f03fff_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todoitem',
+            index=models.Index(fields=['modified_date'], name='taskmanager_modifie_8a2345_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todoitem',
+            index=models.Index(fields=['recurrence_rule'], name='taskmanager_recurre_7d7189_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='todoitem',
+            constraint=models.UniqueConstraint(fields=('recurrence_series', 'recurrence_date'), name='unique_recurrence_occurrence'),
+        ),
+        migrations.AddIndex(
+            model_name='archiveditem',
+            index=models.Index(fields=['title'], name='taskmanager_title_becbb5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archiveditem',
+            index=models.Index(fields=['completed_date'], name='taskmanager_complet_b71092_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemchange',
+            index=models.Index(fields=['created_date'], name='taskmanager_created_69118d_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='itemrevision',
+            constraint=models.UniqueConstraint(fields=('item_id', 'number'), name='unique_item_revision'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+import logging
+
+from django.db import DatabaseError, migrations, transaction
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL only: trigram (pg_trgm) GIN indexes on UPPER(column), used by icontains lookups, and a generated tsvector
+# column of the description with a GIN index, used for full-text search (see search_indexes)
+TRIGRAM_INDEXES = {
+    "todoitem_title_trgm": ("taskmanager_app_todoitem", "title"),
+    "taggit_tag_name_trgm": ("taggit_tag", "name"),
+    "todoitem_tag_names_trgm": ("taskmanager_app_todoitem", "tag_names"),
+}
+SEARCH_VECTOR_COLUMN = "description_search"
+SEARCH_VECTOR_INDEX = "todoitem_description_search"
+
+
+def create_search_indexes(apps, schema_editor):
+    """Trigram indexes are skipped if the pg_trgm extension cannot be installed"""
+
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+
+    quote_name = connection.ops.quote_name
+    try:
+        with transaction.atomic(using=connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError as error:
+        logger.warning("Trigram indexes not created: %s", error)
+    else:
+        for index_name, (table, column) in TRIGRAM_INDEXES.items():
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {quote_name(index_name)} ON {quote_name(table)} "
+                f"USING gin ((UPPER({quote_name(column)}::text)) gin_trgm_ops)"
+            )
+
+    schema_editor.execute(
+        f"ALTER TABLE {quote_name('taskmanager_app_todoitem')} "
+        f"ADD COLUMN IF NOT EXISTS {quote_name(SEARCH_VECTOR_COLUMN)} tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector('simple', COALESCE({quote_name('description')}, ''))) STORED"
+    )
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {quote_name(SEARCH_VECTOR_INDEX)} "
+        f"ON {quote_name('taskmanager_app_todoitem')} USING gin ({quote_name(SEARCH_VECTOR_COLUMN)})"
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    """The pg_trgm extension is kept, other objects may use it"""
+
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+
+    quote_name = connection.ops.quote_name
+    for index_name in [*TRIGRAM_INDEXES, SEARCH_VECTOR_INDEX]:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {quote_name(index_name)}")
+    schema_editor.execute(
+        f"ALTER TABLE {quote_name('taskmanager_app_todoitem')} "
+        f"DROP COLUMN IF EXISTS {quote_name(SEARCH_VECTOR_COLUMN)}"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "taggit",
+            "0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx",
+        ),
+        ("taskmanager_app", "0002_backlog_models"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
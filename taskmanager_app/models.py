@@ -1,13 +1,24 @@
-from django.db import models
+import hashlib
+import json
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, router, transaction
 from django.db.models import Subquery, OuterRef
 from django.db.models.functions import Lower
 from django.urls import reverse
+from django.utils import timezone
 
 from colorfield.fields import ColorField
 from martor.models import MartorField
 from taggit_selectize.managers import TaggableManager
 from taggit.models import GenericTaggedItemBase, TaggedItemBase
 
+from .utils import apply_delta, encode_delta
+
 DO_NOT_OVERRULE = "do_not_overrule"
 USE_TODAYS_DATE = "use_todays_date"
 DEPENDENT_ON = "dependent_on"
@@ -18,11 +29,30 @@ DATE_OVERRULE_CHOICES = (
     (DEPENDENT_ON, "Dependent on…"),
 )
 
+RECURRENCE_NONE = "none"
+RECURRENCE_DAILY = "daily"
+RECURRENCE_WEEKLY = "weekly"
+RECURRENCE_MONTHLY = "monthly"
+RECURRENCE_CUSTOM = "custom"
+
+RECURRENCE_CHOICES = (
+    (RECURRENCE_NONE, "Does not repeat"),
+    (RECURRENCE_DAILY, "Daily"),
+    (RECURRENCE_WEEKLY, "Weekly"),
+    (RECURRENCE_MONTHLY, "Monthly"),
+    (RECURRENCE_CUSTOM, "Custom (days)"),
+)
+
 DATE_TYPE_CHOICES = (
     ("date_start_earliest", "Start earliest"),
     ("date_start_latest", "Start latest"),
     ("date_due", "Due date"),
 )
+DATE_FIELDS = tuple(field for field, _ in DATE_TYPE_CHOICES)
+
+# Separator of the denormalized tag names of an item, also written before the first and after the last name,
+# hence, a name is matched exactly by containing it enclosed in separators
+TAG_NAMES_SEPARATOR = "\n"
 
 
 class TodoItem_tag(GenericTaggedItemBase, TaggedItemBase):
@@ -41,14 +71,75 @@ class MainCategoryItem_excluded(GenericTaggedItemBase, TaggedItemBase):
     pass
 
 
+def join_tag_names(names) -> str:
+    """Returns the denormalized tag names of an item (sorted, enclosed in separators, empty without tags)"""
+    if not names:
+        return ""
+    return (
+        TAG_NAMES_SEPARATOR
+        + TAG_NAMES_SEPARATOR.join(sorted(names))
+        + TAG_NAMES_SEPARATOR
+    )
+
+
+def split_tag_names(tag_names: str) -> list:
+    """Returns the names of denormalized tag names"""
+    if not tag_names:
+        return []
+    return tag_names.strip(TAG_NAMES_SEPARATOR).split(TAG_NAMES_SEPARATOR)
+
+
+class ToDoItemQuerySet(models.QuerySet):
+    def with_tag_name(self, name: str, ignore_case: bool = False):
+        """Items tagged with the name, without joining the generic tag relation
+        - contains is case-insensitive on SQLite (LIKE), compare with tag_name_list for exact matches
+        """
+        lookup = "tag_names__icontains" if ignore_case else "tag_names__contains"
+        return self.filter(
+            **{lookup: f"{TAG_NAMES_SEPARATOR}{name}{TAG_NAMES_SEPARATOR}"}
+        )
+
+    def refresh_tag_names(self) -> dict:
+        """Rewrites the denormalized tag names of the items from their tag links and sets their modified date
+        - Costs two queries plus one update per batch of 500 items
+        - Returns {item id: tag names}
+        """
+
+        item_ids = list(self.values_list("pk", flat=True))
+        names = {item_id: [] for item_id in item_ids}
+        for item_id, name in TodoItem_tag.objects.filter(
+            content_type=ContentType.objects.get_for_model(self.model),
+            object_id__in=item_ids,
+        ).values_list("object_id", "tag__name"):
+            names[item_id].append(name)
+
+        now = timezone.now()
+        items = [
+            self.model(
+                pk=item_id, tag_names=join_tag_names(item_names), modified_date=now
+            )
+            for item_id, item_names in names.items()
+        ]
+        self.model.objects.bulk_update(
+            items, ["tag_names", "modified_date"], batch_size=500
+        )
+        return {item.pk: item.tag_names for item in items}
+
+
 class ToDoItem(models.Model):
     # Fields cannot be empty
     created_date = models.DateTimeField(auto_now_add=True)
+    modified_date = models.DateTimeField(auto_now=True)
     title = models.CharField(max_length=200, unique=True, blank=False, default=None)
 
     description = MartorField(blank=True)
     tags = TaggableManager(through=TodoItem_tag, blank=True)
+    # Denormalized names of the tags, maintained by the signals (see refresh_tag_names), hence, filtering and
+    # rendering items does not join the generic tag relation
+    tag_names = models.TextField(blank=True, default="", editable=False)
     completed = models.BooleanField(default=False, blank=True)
+    # Set by the signals when the item is completed, items are archived by it
+    completed_date = models.DateTimeField(null=True, blank=True, editable=False)
 
     date_start_earliest = models.DateField(null=True, blank=True)
     date_start_latest = models.DateField(null=True, blank=True)
@@ -120,12 +211,62 @@ class ToDoItem(models.Model):
 
     sorting_priority = models.FloatField(default=0, blank=True)
 
+    recurrence_rule = models.CharField(
+        max_length=100,
+        blank=False,
+        choices=RECURRENCE_CHOICES,
+        default=RECURRENCE_NONE,
+    )
+    recurrence_interval = models.PositiveIntegerField(
+        help_text="Repeat every n days/weeks/months",
+        default=1,
+        blank=True,
+    )
+    recurrence_end = models.DateField(null=True, blank=True)
+    # Date the occurrences of a series are counted from, fixed when the recurrence starts, as the dates of the
+    # series move with rollovers and dependencies
+    recurrence_start = models.DateField(null=True, blank=True, editable=False)
+
+    # Set on occurrences generated from a recurring item (the series)
+    recurrence_series = models.ForeignKey(
+        "self",
+        null=True,
+        blank=True,
+        default=None,
+        on_delete=models.SET_NULL,
+        related_name="occurrences",
+    )
+    recurrence_date = models.DateField(null=True, blank=True)
+
+    objects = ToDoItemQuerySet.as_manager()
+
+    @property
+    def tag_name_list(self) -> list:
+        return split_tag_names(self.tag_names)
+
     def get_absolute_url(self):
         return reverse("item-edit", args=[self.id])
 
     def __str__(self):
         return f"{self.title}"  # used among other places in the admin interface
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        item = super().from_db(db, field_names, values)
+        # Base of the description delta of the next revision (see ItemRevisionQuerySet.record)
+        if "description" in field_names:
+            item._revision_description = item.description
+        return item
+
+    def save(self, *args, **kwargs):
+        # The revision is written in the transaction of the save, the update of the item row serializes
+        # concurrent saves of the same item
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            ItemRevision.objects.using(using).record(self)
+        self._revision_description = self.description
+
     class Meta:
         ordering = [
             "date_start_earliest",
@@ -138,27 +279,86 @@ class ToDoItem(models.Model):
         indexes = [
             models.Index(fields=["title"]),
             models.Index(fields=["description"]),
-            models.Index(fields=["completed"]),
-            models.Index(fields=["date_start_earliest"]),
-            models.Index(fields=["date_start_latest"]),
-            models.Index(fields=["date_due"]),
+            # (column, id): sorting of the table view with the id as tiebreaker, see TABLE_SORT_COLUMNS
+            models.Index(fields=["completed", "id"]),
+            models.Index(fields=["completed_date"]),
+            models.Index(fields=["date_start_earliest", "id"]),
+            models.Index(fields=["date_start_latest", "id"]),
+            models.Index(fields=["date_due", "id"]),
             models.Index(fields=["date_start_earliest_depend"]),
             models.Index(fields=["date_start_latest_depend"]),
             models.Index(fields=["date_due_depend"]),
-            models.Index(fields=["sorting_priority"]),
+            models.Index(fields=["sorting_priority", "id"]),
+            models.Index(fields=["modified_date"]),
+            models.Index(fields=["recurrence_rule"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["recurrence_series", "recurrence_date"],
+                name="unique_recurrence_occurrence",
+            ),
         ]
 
 
+# Columns of an item kept in the data of its revisions (title and description are columns of the revisions)
+REVISION_FIELDS = tuple(
+    field.attname
+    for field in ToDoItem._meta.concrete_fields
+    if field.editable and field.name not in ("id", "title", "description")
+)
+
+
+def copy_tag_links(id_map: dict):
+    """Copies all tag links with one bulk insert
+    - Input: id_map = {original item id: [new item id, ...] or new item id, ...}
+    """
+
+    content_type = ContentType.objects.get_for_model(ToDoItem)
+    new_tag_links = []
+    for object_id, tag_id in TodoItem_tag.objects.filter(
+        content_type=content_type, object_id__in=id_map
+    ).values_list("object_id", "tag_id"):
+        new_ids = id_map[object_id]
+        for new_id in new_ids if isinstance(new_ids, list) else [new_ids]:
+            new_tag_links.append(
+                TodoItem_tag(content_type=content_type, object_id=new_id, tag_id=tag_id)
+            )
+
+    TodoItem_tag.objects.bulk_create(new_tag_links, batch_size=1000)
+
+
 class MainCategoryItemQuerySet(models.QuerySet):
     def annotate_first_tag(self):
         return self.annotate(
             first_tag=Subquery(
                 self.model.main_category.through.objects.filter(
-                    main_category=OuterRef("pk")
-                ).values("taggit_tag__name")[:1]
+                    object_id=OuterRef("pk")
+                )
+                .order_by("id")
+                .values("tag__name")[:1]
             )
         )
 
+    def refresh_names(self) -> dict:
+        """Rewrites name and slug of the categories from their first main tag (see annotate_first_tag)
+        - Costs one query plus one update per batch of 500 categories
+        - Returns {category id: name}
+        """
+
+        categories = [
+            self.model(pk=pk, name=first_tag or "", slug=get_category_slug(first_tag))
+            for pk, first_tag in self.annotate_first_tag().values_list(
+                "pk", "first_tag"
+            )
+        ]
+        self.model.objects.bulk_update(categories, ["name", "slug"], batch_size=500)
+        return {category.pk: category.name for category in categories}
+
+
+def get_category_slug(name: str):
+    """Returns the URL key of a main category (lowercased name, None without main tag)"""
+    return name.lower() if name else None
+
 
 class MainCategoryItem(models.Model):
     created_date = models.DateTimeField(auto_now_add=True)
@@ -181,23 +381,27 @@ class MainCategoryItem(models.Model):
     color = ColorField(default="#FFFFFF")
     sorting_priority = models.FloatField(default=0, blank=True)
 
+    # Denormalized name of the main tag and its URL key, maintained by the signals (see refresh_names), hence,
+    # category pages are looked up and names displayed without joining the generic tag relation
+    name = models.CharField(max_length=100, blank=True, default="", editable=False)
+    slug = models.CharField(
+        max_length=100, unique=True, null=True, blank=True, editable=False
+    )
+
     def get_absolute_url(self):
-        return reverse(
-            "main_category-show", args=[self.main_category.first().name.lower()]
-        )
+        return reverse("main_category-show", args=[self.slug])
 
     def __str__(self):
-        first_tag_name = self.main_category.all().first()
-        return f'Main tag: {first_tag_name.name if first_tag_name else "No Tags"} - Sorting: {self.sorting_priority}'
+        return f'Main tag: {self.name or "No Tags"} - Sorting: {self.sorting_priority}'
 
     # Use the custom queryset manager
     objects = MainCategoryItemQuerySet.as_manager()
 
     class Meta:
-        # Ordering based on the first tag's name
+        # Ordering based on the main tag's name (slug: lowercased name)
         ordering = [
             "-sorting_priority",
-            Lower("main_category__name"),  # Order by the first tag's name
+            "slug",
             "id",
         ]
         indexes = [
@@ -206,3 +410,221 @@ class MainCategoryItem(models.Model):
             models.Index(fields=["color"]),
             models.Index(fields=["sorting_priority"]),
         ]
+
+
+class ArchivedItem(models.Model):
+    """Completed item moved out of ToDoItem by archive_completed_items, searched on demand
+    - Keeps the id of the item, hence, references to it (e.g. dependencies within archived chains) stay valid
+    - Searched and displayed values are columns, all other values of the item are kept in data
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=200)
+    description = MartorField(blank=True)
+    tag_names = models.TextField(blank=True, default="")
+    created_date = models.DateTimeField()
+    completed_date = models.DateTimeField(null=True, blank=True)
+    archived_date = models.DateTimeField(auto_now_add=True)
+    # Other columns of the item by attribute name (dates, dependencies, recurrence, ...)
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+
+    @property
+    def tag_name_list(self) -> list:
+        return split_tag_names(self.tag_names)
+
+    def __str__(self):
+        return f"{self.title} (archived)"
+
+    class Meta:
+        ordering = ["-completed_date", "id"]
+        indexes = [
+            models.Index(fields=["title"]),
+            models.Index(fields=["completed_date"]),
+        ]
+
+
+def get_description_checksum(description: str) -> str:
+    return hashlib.md5(description.encode(), usedforsecurity=False).hexdigest()
+
+
+def compress_revision_content(content) -> bytes:
+    return zlib.compress(json.dumps(content).encode())
+
+
+def decompress_revision_content(content):
+    return json.loads(zlib.decompress(content))
+
+
+class ItemRevisionQuerySet(models.QuerySet):
+    def record(self, item):
+        """Appends a revision of the saved item, unless title, description and the other columns are unchanged
+        - Costs one query for the last revision plus the insert
+        - The description is stored as a delta to the previous revision if the item was loaded with the
+          description of that revision (see ToDoItem.from_db), else (and every REVISION_SNAPSHOT_INTERVAL
+          revisions) as a snapshot
+        """
+
+        description = item.description or ""
+        checksum = get_description_checksum(description)
+        # Round trip, hence, dates compare equal to the stored JSON
+        data = json.loads(
+            json.dumps(
+                {attname: getattr(item, attname) for attname in REVISION_FIELDS},
+                cls=DjangoJSONEncoder,
+            )
+        )
+        last = (
+            self.filter(item_id=item.pk)
+            .order_by("-number")
+            .values("number", "snapshot_number", "title", "checksum", "data")
+            .first()
+        )
+        if last and (last["title"], last["checksum"], last["data"]) == (
+            item.title,
+            checksum,
+            data,
+        ):
+            return None
+
+        number = last["number"] + 1 if last else 1
+        base = getattr(item, "_revision_description", None)
+        if (
+            last is None
+            or base is None
+            or get_description_checksum(base) != last["checksum"]
+            or number - last["snapshot_number"] >= settings.REVISION_SNAPSHOT_INTERVAL
+        ):
+            snapshot_number, content = number, description
+        else:
+            snapshot_number = last["snapshot_number"]
+            content = encode_delta(base, description)
+
+        return self.create(
+            item_id=item.pk,
+            number=number,
+            snapshot_number=snapshot_number,
+            title=item.title,
+            description=compress_revision_content(content),
+            checksum=checksum,
+            data=data,
+        )
+
+
+class ItemRevision(models.Model):
+    """Version of an item, appended by every save changing it (see ItemRevisionQuerySet.record)
+    - item_id is no foreign key, as revisions of deleted and archived items are kept
+    - description holds the zlib-compressed JSON of the full description (snapshot) or of the line delta to the
+      previous revision (see encode_delta), a version is rebuilt from its snapshot on (get_full_description)
+    """
+
+    item_id = models.BigIntegerField()
+    number = models.PositiveIntegerField()
+    # Number of the revision holding the snapshot the deltas up to this revision apply to
+    snapshot_number = models.PositiveIntegerField()
+    created_date = models.DateTimeField(auto_now_add=True)
+    title = models.CharField(max_length=200)
+    description = models.BinaryField()
+    # Checksum of the full description, tells whether a description is the base of the next delta
+    checksum = models.CharField(max_length=32)
+    # Other columns of the item by attribute name (see REVISION_FIELDS)
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+
+    objects = ItemRevisionQuerySet.as_manager()
+
+    @property
+    def is_snapshot(self) -> bool:
+        return self.number == self.snapshot_number
+
+    def get_full_description(self) -> str:
+        """Rebuilds the description from the snapshot and the deltas since
+        - Costs one query reading at most REVISION_SNAPSHOT_INTERVAL revisions
+        """
+
+        description = ""
+        for content in (
+            ItemRevision.objects.filter(
+                item_id=self.item_id,
+                number__gte=self.snapshot_number,
+                number__lte=self.number,
+            )
+            .order_by("number")
+            .values_list("description", flat=True)
+        ):
+            content = decompress_revision_content(content)
+            description = (
+                content
+                if isinstance(content, str)
+                else apply_delta(description, content)
+            )
+        return description
+
+    def __str__(self):
+        return f"{self.title} (revision {self.number})"
+
+    class Meta:
+        ordering = ["item_id", "-number"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["item_id", "number"], name="unique_item_revision"
+            ),
+        ]
+
+
+class ScheduledTaskRun(models.Model):
+    """Last run of a periodic task (e.g. the daily date rollover)"""
+
+    task = models.CharField(max_length=100, unique=True)
+    last_run_date = models.DateField()
+    last_run_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.task}: {self.last_run_date}"
+
+
+ITEM_CREATED = "c"
+ITEM_UPDATED = "u"
+ITEM_DELETED = "d"
+
+ITEM_CHANGE_CHOICES = (
+    (ITEM_CREATED, "Created"),
+    (ITEM_UPDATED, "Updated"),
+    (ITEM_DELETED, "Deleted"),
+)
+
+
+class ItemChangeQuerySet(models.QuerySet):
+    def record(self, item_ids, action: str):
+        """Appends one change per item with a single insert"""
+        self.bulk_create(
+            [self.model(item_id=item_id, action=action) for item_id in item_ids],
+            batch_size=500,
+        )
+
+    def trim(self, max_age_days: int = None) -> int:
+        """Deletes changes older than the max. age (default: CHANGE_LOG_MAX_AGE_DAYS), returns their number"""
+        if max_age_days is None:
+            max_age_days = settings.CHANGE_LOG_MAX_AGE_DAYS
+        deleted_count, _ = self.filter(
+            created_date__lt=timezone.now() - timedelta(days=max_age_days)
+        ).delete()
+        return deleted_count
+
+
+class ItemChange(models.Model):
+    """Append-only log of item changes, read by the change feed and trimmed by age
+    - item_id is no foreign key, as changes of deleted items are kept
+    """
+
+    item_id = models.BigIntegerField()
+    action = models.CharField(max_length=1, choices=ITEM_CHANGE_CHOICES)
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    objects = ItemChangeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_date"]),
+        ]
+
+    def __str__(self):
+        return f"{self.id}: {self.get_action_display()} item {self.item_id}"
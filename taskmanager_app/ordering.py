@@ -0,0 +1,200 @@
+"""Fractional priorities for drag-and-drop ordering of items and main categories (sorting_priority, highest first)
+- A moved row gets a priority between the priorities of its new neighbours, hence, a move updates one row
+- A move between neighbours without a float in between (equal priorities or an exhausted gap) renumbers only the
+  rows between the priorities of the neighbours, at most MAX_WINDOW_ROWS
+- The rebalance_priorities command (e.g. daily by cron) gives all rows distinct priorities once and renumbers a
+  group again when rows share a priority or gaps fall below MIN_PRIORITY_GAP
+- Renumbering keeps the order of the rows, hence, only the moved row is recorded in the change feed
+"""
+
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from .models import ITEM_UPDATED, ItemChange, MainCategoryItem, ToDoItem
+
+# Distance of renumbered priorities and of a row moved to either end of the list
+PRIORITY_STEP = 1.0
+
+# Smallest gap between priorities (relative to priorities above 1) before the group is renumbered, halving a gap
+# of PRIORITY_STEP about 30 times
+MIN_PRIORITY_GAP = 1e-9
+
+# Rows a move renumbers at most, moves into larger runs of equal priorities wait for rebalance_priorities
+MAX_WINDOW_ROWS = 500
+
+# Orderable models: {resource: (model, order of rows with equal priorities)}, as in the lists reordered by drag
+# and drop (main category pages and the main category list)
+ORDERABLE_MODELS = {
+    "item": (ToDoItem, ("title", "id")),
+    "category": (MainCategoryItem, ("slug", "id")),
+}
+
+
+class PriorityGapExhausted(Exception):
+    """A move needs more rows renumbered than MAX_WINDOW_ROWS (see rebalance_priorities)"""
+
+
+def is_too_close(higher: float, lower: float) -> bool:
+    return higher - lower < MIN_PRIORITY_GAP * max(1, abs(higher))
+
+
+def get_priority_between(above: float = None, below: float = None):
+    """Returns a priority sorting between the neighbours (None at the ends of the list)
+    - None if there is no float in between
+    """
+
+    if above is None:
+        return below + PRIORITY_STEP
+    if below is None:
+        return above - PRIORITY_STEP
+    priority = above / 2 + below / 2
+    return priority if below < priority < above else None
+
+
+def move_row(resource: str, pk: int, above_pk: int = None, below_pk: int = None):
+    """Moves a row between its new neighbours, the rows above and below it after the drop
+    - Costs one query for the priorities plus one update in the common case
+    - Returns the new priority and whether other rows were renumbered (see renumber_window)
+    - Raises DoesNotExist for unknown rows (incl. neighbours) and PriorityGapExhausted
+    """
+
+    model, _ = ORDERABLE_MODELS[resource]
+    priorities = dict(
+        model.objects.filter(pk__in={pk, above_pk, below_pk} - {None}).values_list(
+            "pk", "sorting_priority"
+        )
+    )
+    for row_pk in (pk, above_pk, below_pk):
+        if row_pk is not None and row_pk not in priorities:
+            raise model.DoesNotExist(f"{resource} {row_pk} does not exist")
+
+    above = priorities.get(above_pk)
+    below = priorities.get(below_pk)
+    if above is None and below is None:
+        return priorities[pk], False
+
+    with transaction.atomic():
+        renumbered = (priority := get_priority_between(above, below)) is None
+        if renumbered:
+            priority = renumber_window(resource, pk, above_pk, below_pk, above, below)
+
+        if model is ToDoItem:
+            model.objects.filter(pk=pk).update(
+                sorting_priority=priority, modified_date=timezone.now()
+            )
+            ItemChange.objects.record([pk], ITEM_UPDATED)
+        else:
+            model.objects.filter(pk=pk).update(sorting_priority=priority)
+    return priority, renumbered
+
+
+def renumber_window(
+    resource: str, pk: int, above_pk: int, below_pk: int, above: float, below: float
+) -> float:
+    """Makes room for the row between its neighbours by renumbering the rows with priorities between theirs
+    - The window (incl. the row) is spread evenly between the priorities of the closest rows outside of it
+    - Costs one query for these priorities, one for the window and one update per batch of 500 rows
+    - Returns the new priority of the row, which is written by the caller
+    """
+
+    model, tiebreak = ORDERABLE_MODELS[resource]
+    highest, lowest = max(above, below), min(above, below)
+    others = model.objects.exclude(pk=pk)
+    bounds = others.aggregate(
+        higher=Min("sorting_priority", filter=Q(sorting_priority__gt=highest)),
+        lower=Max("sorting_priority", filter=Q(sorting_priority__lt=lowest)),
+    )
+    window = list(
+        others.filter(sorting_priority__range=(lowest, highest))
+        .order_by("-sorting_priority", *tiebreak)
+        .values_list("pk", flat=True)[: MAX_WINDOW_ROWS + 1]
+    )
+    if len(window) >= MAX_WINDOW_ROWS:
+        raise PriorityGapExhausted(
+            f"At least {MAX_WINDOW_ROWS} {resource} rows share the priorities between the neighbours"
+        )
+    if above_pk in window:
+        window.insert(window.index(above_pk) + 1, pk)
+    elif below_pk in window:
+        window.insert(window.index(below_pk), pk)
+    else:
+        window.append(pk)
+
+    higher, lower = bounds["higher"], bounds["lower"]
+    if higher is None and lower is None:
+        higher = (len(window) + 1) * PRIORITY_STEP
+        lower = 0
+    elif higher is None:
+        higher = lower + (len(window) + 1) * PRIORITY_STEP
+    elif lower is None:
+        lower = higher - (len(window) + 1) * PRIORITY_STEP
+    step = (higher - lower) / (len(window) + 1)
+    if is_too_close(higher, higher - step):
+        raise PriorityGapExhausted(
+            f"No room for {len(window)} {resource} rows between the neighbours"
+        )
+
+    priorities = {
+        row_pk: higher - (index + 1) * step for index, row_pk in enumerate(window)
+    }
+    update_priorities(
+        model,
+        {row_pk: value for row_pk, value in priorities.items() if row_pk != pk},
+    )
+    return priorities[pk]
+
+
+def update_priorities(model, priorities: dict):
+    """Writes the {id: priority} of renumbered rows, one update per batch of 500 rows
+    - Items also get a new modified_date, which keys their cached fragments
+    """
+
+    fields = {}
+    if model is ToDoItem:
+        fields["modified_date"] = timezone.now()
+    model.objects.bulk_update(
+        [
+            model(pk=pk, sorting_priority=priority, **fields)
+            for pk, priority in priorities.items()
+        ],
+        ["sorting_priority", *fields],
+        batch_size=500,
+    )
+
+
+def needs_rebalance(resource: str) -> bool:
+    """Whether rows of the group share a priority or are closer than MIN_PRIORITY_GAP (one query)"""
+
+    model, _ = ORDERABLE_MODELS[resource]
+    previous = None
+    for priority in (
+        model.objects.order_by("-sorting_priority")
+        .values_list("sorting_priority", flat=True)
+        .iterator(chunk_size=2000)
+    ):
+        if previous is not None and is_too_close(previous, priority):
+            return True
+        previous = priority
+    return False
+
+
+def rebalance_priorities(resource: str) -> dict:
+    """Renumbers the priorities of the group in their current order in steps of PRIORITY_STEP (lowest: one step)
+    - Only changed rows are updated (one update per batch of 500), returns {id: priority} of all rows
+    """
+
+    model, tiebreak = ORDERABLE_MODELS[resource]
+    rows = dict(
+        model.objects.order_by("-sorting_priority", *tiebreak).values_list(
+            "pk", "sorting_priority"
+        )
+    )
+    priorities = {
+        pk: (len(rows) - index) * PRIORITY_STEP for index, pk in enumerate(rows)
+    }
+    update_priorities(
+        model,
+        {pk: priority for pk, priority in priorities.items() if rows[pk] != priority},
+    )
+    return priorities
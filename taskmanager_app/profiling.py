@@ -0,0 +1,141 @@
+"""Per-request profiling
+- Query count and SQL time (all databases), template render time and Python time of sampled requests
+- Slow requests are logged as JSON incl. the top queries by count and by time
+"""
+
+import functools
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Profile of the current request, None if the request is not sampled
+_current_profile = ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.query_count = 0
+        # SQL (with placeholders, i.e. grouping the same query with different parameters): [count, time]
+        self.queries = {}
+
+    def add_query(self, sql: str, duration: float):
+        self.sql_time += duration
+        self.query_count += 1
+        stats = self.queries.setdefault(sql, [0, 0.0])
+        stats[0] += 1
+        stats[1] += duration
+
+    def get_timings(self) -> dict:
+        """Returns the timings in milliseconds"""
+        total_time = time.perf_counter() - self.start
+        return {
+            "total_ms": round(total_time * 1000, 2),
+            "sql_ms": round(self.sql_time * 1000, 2),
+            "python_ms": round((total_time - self.sql_time) * 1000, 2),
+            "template_ms": round(self.template_time * 1000, 2),
+        }
+
+    def get_top_queries(self, sort_index: int, count: int) -> list:
+        top_queries = sorted(
+            self.queries.items(), key=lambda query: query[1][sort_index], reverse=True
+        )[:count]
+        return [
+            {"sql": sql, "count": query_count, "time_ms": round(query_time * 1000, 2)}
+            for sql, (query_count, query_time) in top_queries
+        ]
+
+
+def start_profile():
+    """Starts profiling the current request if it is sampled, returns the token to end it"""
+    if random.random() >= settings.PROFILING_SAMPLE_RATE:
+        return None
+    return _current_profile.set(RequestProfile())
+
+
+def end_profile(token, request, response):
+    """Ends profiling, logs slow requests and adds the Server-Timing header"""
+
+    profile = _current_profile.get()
+    _current_profile.reset(token)
+    timings = profile.get_timings()
+
+    if timings["total_ms"] >= settings.PROFILING_SLOW_REQUEST_MS:
+        resolver_match = getattr(request, "resolver_match", None)
+        logger.warning(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.path,
+                    "view": resolver_match.view_name if resolver_match else None,
+                    "status": response.status_code,
+                    **timings,
+                    "query_count": profile.query_count,
+                    "top_queries_by_count": profile.get_top_queries(
+                        0, settings.PROFILING_TOP_QUERIES
+                    ),
+                    "top_queries_by_time": profile.get_top_queries(
+                        1, settings.PROFILING_TOP_QUERIES
+                    ),
+                }
+            )
+        )
+
+    if settings.PROFILING_SERVER_TIMING:
+        response["Server-Timing"] = ", ".join(
+            [
+                f'sql;dur={timings["sql_ms"]};desc="{profile.query_count} queries"',
+                f'tpl;dur={timings["template_ms"]};desc="Templates"',
+                f'app;dur={timings["python_ms"]};desc="Python"',
+                f'total;dur={timings["total_ms"]}',
+            ]
+        )
+    return response
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper timing the queries of profiled requests"""
+
+    if (profile := _current_profile.get()) is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_query(sql, time.perf_counter() - start)
+
+
+def install_template_timing():
+    """Wraps the render of the Django template backend to time the rendering of profiled requests
+    - Includes are rendered within the top-level template, hence, they are not counted twice
+    """
+
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, "profiled", False):
+        return
+
+    original_render = Template.render
+
+    @functools.wraps(original_render)
+    def render(self, context=None, request=None):
+        if (profile := _current_profile.get()) is None:
+            return original_render(self, context, request)
+
+        start = time.perf_counter()
+        try:
+            return original_render(self, context, request)
+        finally:
+            profile.template_time += time.perf_counter() - start
+
+    render.profiled = True
+    Template.render = render
@@ -0,0 +1,254 @@
+import calendar
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+
+from .models import (
+    DATE_FIELDS,
+    DO_NOT_OVERRULE,
+    ITEM_CREATED,
+    RECURRENCE_CUSTOM,
+    RECURRENCE_DAILY,
+    RECURRENCE_MONTHLY,
+    RECURRENCE_NONE,
+    RECURRENCE_WEEKLY,
+    ItemChange,
+    ToDoItem,
+    copy_tag_links,
+)
+
+RECURRENCE_STEP_DAYS = {
+    RECURRENCE_DAILY: 1,
+    RECURRENCE_WEEKLY: 7,
+    RECURRENCE_CUSTOM: 1,
+}
+
+
+def add_months(d: date, months: int) -> date:
+    """Adds months to a date, clamping the day to the end of the resulting month"""
+    month_index = d.month - 1 + months
+    year = d.year + month_index // 12
+    month = month_index % 12 + 1
+    return date(year, month, min(d.day, calendar.monthrange(year, month)[1]))
+
+
+def get_series_date(series) -> date:
+    """Returns the current main date of a series (due date, else a start date, else its creation date)"""
+    for field in ("date_due", "date_start_earliest", "date_start_latest"):
+        if series_date := getattr(series, field):
+            return series_date
+    return series.created_date.date() if series.created_date else timezone.now().date()
+
+
+def get_series_anchor(series) -> date:
+    """Returns the date the recurrence of a series is counted from (recurrence_start)
+    - Series saved before recurrence_start was set are counted from their current main date
+    """
+    return series.recurrence_start or get_series_date(series)
+
+
+def get_occurrence_dates(series, start_date: date, end_date: date):
+    """Yields the occurrence dates of a series within [start_date, end_date]
+    - The series item itself is the first occurrence, hence, it is never yielded
+    """
+
+    anchor = get_series_anchor(series)
+    interval = max(series.recurrence_interval or 1, 1)
+    if series.recurrence_end:
+        end_date = min(end_date, series.recurrence_end)
+
+    if series.recurrence_rule == RECURRENCE_MONTHLY:
+        # Skip directly to the first month within the window
+        months_to_start = (start_date.year - anchor.year) * 12 + (
+            start_date.month - anchor.month
+        )
+        count = max(months_to_start // interval, 1)
+        while (occurrence := add_months(anchor, count * interval)) <= end_date:
+            if occurrence >= start_date:
+                yield occurrence
+            count += 1
+        return
+
+    step = timedelta(days=RECURRENCE_STEP_DAYS[series.recurrence_rule] * interval)
+
+    # Skip directly to the first occurrence within the window
+    count = max(-(-(start_date - anchor).days // step.days), 1)
+    occurrence = anchor + count * step
+    while occurrence <= end_date:
+        yield occurrence
+        occurrence += step
+
+
+def get_occurrence_columns() -> list:
+    """Returns the model fields inserted for an occurrence (all but the primary key)"""
+    return [field for field in ToDoItem._meta.concrete_fields if not field.primary_key]
+
+
+def get_occurrence_rows(series, occurrence_dates: list, columns: list):
+    """Yields the database rows of the occurrences of a series
+    - Values are copied from the series and prepared for the database once per series
+    - Only title, dates and occurrence date are set per occurrence
+    - The title of the series is cut to fit the date suffix of the occurrence into the title field
+    """
+
+    now = timezone.now()
+    values = {field.attname: getattr(series, field.attname) for field in columns}
+    values.update(
+        {
+            "created_date": now,
+            "completed": False,
+            "completed_date": None,
+            "recurrence_rule": RECURRENCE_NONE,
+            "recurrence_end": None,
+            "recurrence_start": None,
+            "recurrence_series_id": series.id,
+        }
+    )
+
+    # Occurrences have fixed dates, hence, no date dependencies
+    for field in DATE_FIELDS:
+        values[f"{field}_depend"] = DO_NOT_OVERRULE
+        values[f"{field}_depend_id"] = None
+
+    base_row = [
+        field.get_db_prep_save(
+            now if getattr(field, "auto_now", False) else values[field.attname],
+            connection,
+        )
+        for field in columns
+    ]
+    positions = {field.attname: index for index, field in enumerate(columns)}
+    # Dates of an occurrence keep their distance to the main date of the series
+    series_date = get_series_date(series)
+    date_offsets = {
+        field: getattr(series, field) - series_date
+        for field in DATE_FIELDS
+        if getattr(series, field)
+    }
+    max_length = ToDoItem._meta.get_field("title").max_length
+
+    for occurrence_date in occurrence_dates:
+        row = base_row.copy()
+        suffix = f" ({occurrence_date.isoformat()})"
+        row[positions["title"]] = series.title[: max_length - len(suffix)] + suffix
+        row[positions["recurrence_date"]] = connection.ops.adapt_datefield_value(
+            occurrence_date
+        )
+        for field, offset in date_offsets.items():
+            row[positions[field]] = connection.ops.adapt_datefield_value(
+                occurrence_date + offset
+            )
+        yield row
+
+
+def generate_recurring_items(
+    horizon_days: int = None, batch_size: int = 200, today: date = None
+) -> tuple:
+    """Materializes all missing occurrences of recurring items up to the horizon
+    - Series are processed in batches, each costing a fixed number of queries
+    - Returns the numbers of created and skipped occurrences, an occurrence is skipped if it conflicts with an
+      existing item (e.g. an item with the same title)
+    """
+
+    today = today or timezone.now().date()
+    if horizon_days is None:
+        horizon_days = settings.RECURRENCE_HORIZON_DAYS
+    end_date = today + timedelta(days=horizon_days)
+
+    series_items = (
+        ToDoItem.objects.exclude(recurrence_rule=RECURRENCE_NONE)
+        .filter(recurrence_series__isnull=True)
+        .order_by("id")
+    )
+
+    created_count = skipped_count = 0
+    batch = []
+    for series in series_items.iterator(chunk_size=batch_size):
+        batch.append(series)
+        if len(batch) >= batch_size:
+            created, skipped = _generate_batch(batch, today, end_date)
+            created_count += created
+            skipped_count += skipped
+            batch = []
+    if batch:
+        created, skipped = _generate_batch(batch, today, end_date)
+        created_count += created
+        skipped_count += skipped
+
+    return created_count, skipped_count
+
+
+def _generate_batch(batch: list, start_date: date, end_date: date) -> tuple:
+    series_ids = [series.id for series in batch]
+    columns = get_occurrence_columns()
+
+    # Existing occurrences are looked up through the (series, date) unique index
+    existing = set(
+        ToDoItem.objects.filter(
+            recurrence_series_id__in=series_ids,
+            recurrence_date__range=(start_date, end_date),
+        ).values_list("recurrence_series_id", "recurrence_date")
+    )
+
+    rows = []
+    for series in batch:
+        occurrence_dates = [
+            occurrence_date
+            for occurrence_date in get_occurrence_dates(series, start_date, end_date)
+            if (series.id, occurrence_date) not in existing
+        ]
+        if occurrence_dates:
+            rows.extend(get_occurrence_rows(series, occurrence_dates, columns))
+    if not rows:
+        return 0, 0
+
+    # Rows are inserted with one prepared statement, as building model instances is the bottleneck
+    # for hundreds of thousands of occurrences. Conflicting occurrences (e.g. created concurrently
+    # or with a taken title) are skipped and counted.
+    ops = connection.ops
+    insert_sql = "{} {} ({}) VALUES ({}){}".format(
+        ops.insert_statement(on_conflict=OnConflict.IGNORE),
+        ops.quote_name(ToDoItem._meta.db_table),
+        ", ".join(ops.quote_name(field.column) for field in columns),
+        ", ".join(["%s"] * len(columns)),
+        ops.on_conflict_suffix_sql(columns, OnConflict.IGNORE, None, None),
+    )
+
+    with transaction.atomic():
+        last_id = ToDoItem.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+        with connection.cursor() as cursor:
+            cursor.executemany(insert_sql, rows)
+
+        id_map = {series_id: [] for series_id in series_ids}
+        occurrence_ids = []
+        for occurrence_id, series_id in ToDoItem.objects.filter(
+            id__gt=last_id, recurrence_series_id__in=series_ids
+        ).values_list("id", "recurrence_series_id"):
+            id_map[series_id].append(occurrence_id)
+            occurrence_ids.append(occurrence_id)
+
+        copy_tag_links(id_map)
+
+        # Changes are recorded by one prepared statement instead of a model instance per occurrence
+        change_fields = [
+            ItemChange._meta.get_field(name)
+            for name in ("item_id", "action", "created_date")
+        ]
+        created_date = change_fields[2].get_db_prep_save(timezone.now(), connection)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO {} ({}) VALUES (%s, %s, %s)".format(
+                    ops.quote_name(ItemChange._meta.db_table),
+                    ", ".join(ops.quote_name(field.column) for field in change_fields),
+                ),
+                [
+                    (occurrence_id, ITEM_CREATED, created_date)
+                    for occurrence_id in occurrence_ids
+                ],
+            )
+
+    return len(occurrence_ids), len(rows) - len(occurrence_ids)
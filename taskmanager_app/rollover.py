@@ -0,0 +1,79 @@
+"""Daily tasks run on the first request of a day or by their management commands
+- The date rollover sets all "today's date" fields and the dates depending on them to today
+"""
+
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.utils import timezone
+
+from .dependency_graph import update_all_dependent_dates
+from .metrics import record_cache_lookup
+from .models import ScheduledTaskRun
+from .routers import read_from_primary
+
+DATE_ROLLOVER_TASK = "date_rollover"
+
+# Date of the last rollover known to this process (avoids a query per request)
+_last_rollover_date = None
+
+
+def get_dates_stale_since(today: date = None):
+    """Returns the date of the last date rollover if dates have not been rolled over today, else None"""
+
+    today = today or timezone.now().date()
+    last_run_date = (
+        ScheduledTaskRun.objects.filter(task=DATE_ROLLOVER_TASK)
+        .values_list("last_run_date", flat=True)
+        .first()
+    )
+    if last_run_date is not None and last_run_date >= today:
+        return None
+
+    return last_run_date or date.min
+
+
+def roll_over_dates(today: date = None) -> int:
+    """Sets all "today's date" fields and their dependents to today and records the rollover"""
+
+    global _last_rollover_date
+
+    today = today or timezone.now().date()
+    with transaction.atomic():
+        updated_count = update_all_dependent_dates(today=today)
+        ScheduledTaskRun.objects.update_or_create(
+            task=DATE_ROLLOVER_TASK, defaults={"last_run_date": today}
+        )
+
+    _last_rollover_date = today
+    return updated_count
+
+
+def roll_over_dates_if_stale():
+    """Catches up on a missed date rollover
+    - Costs no queries once the rollover of today is known to this process
+    - Always reads from the primary, as a lagging replica would repeat the rollover
+    """
+
+    global _last_rollover_date
+
+    today = timezone.now().date()
+    record_cache_lookup(DATE_ROLLOVER_TASK, _last_rollover_date == today)
+    if _last_rollover_date == today:
+        return
+
+    with read_from_primary():
+        if get_dates_stale_since(today) is not None:
+            roll_over_dates(today)
+        else:
+            _last_rollover_date = today
+
+
+async def aroll_over_dates_if_stale():
+    """Async version of roll_over_dates_if_stale, only using a thread if the rollover is not known to this process"""
+
+    if _last_rollover_date != timezone.now().date():
+        await sync_to_async(roll_over_dates_if_stale)()
+    else:
+        record_cache_lookup(DATE_ROLLOVER_TASK, True)
@@ -0,0 +1,83 @@
+"""Read-replica routing
+- Reads of views marked with read_from_replica go to the replica, all other queries and all writes go to the primary
+- The routing state of a request is set by ReplicaRoutingMiddleware
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = "replica"
+
+# Routing state of the current request: {"replica": reads may use the replica}
+# (a dict, as changes must be visible across the contexts copied for sync/async switches)
+_request_state = ContextVar("replica_routing_state", default=None)
+
+
+def read_from_replica(view):
+    """Marks a view (function or class) whose reads may be served by the replica"""
+    view.read_from_replica = True
+    return view
+
+
+def is_read_from_replica(view_func) -> bool:
+    view_class = getattr(view_func, "view_class", None)
+    return getattr(view_func, "read_from_replica", False) or getattr(
+        view_class, "read_from_replica", False
+    )
+
+
+def start_request():
+    """Sets a fresh routing state for the current request, returns the token to reset it"""
+    return _request_state.set({"replica": False})
+
+
+def get_request_state():
+    return _request_state.get()
+
+
+def end_request(token):
+    _request_state.reset(token)
+
+
+@contextmanager
+def read_from_primary():
+    """Routes the reads of the current request to the primary within the block
+    - For reads deciding on writes (e.g. the date rollover), which must not see a lagging replica
+    """
+    state = _request_state.get()
+    replica = state and state["replica"]
+    if replica:
+        state["replica"] = False
+    try:
+        yield
+    finally:
+        if replica:
+            state["replica"] = True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        # Reads within a transaction of the primary see its uncommitted writes
+        if (
+            state
+            and state["replica"]
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both databases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema by replication
+        if db == REPLICA_DB_ALIAS:
+            return False
+        return None
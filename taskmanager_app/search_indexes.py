@@ -0,0 +1,91 @@
+"""PostgreSQL search indexes, created by the migration 0003_search_indexes
+- Trigram (pg_trgm) GIN indexes on UPPER(title), UPPER(tag name) and UPPER(denormalized tag names of the items),
+  used by icontains lookups
+- A generated tsvector column of the description with a GIN index, used for full-text search
+"""
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+
+from .metrics import record_cache_lookup
+from .models import ToDoItem
+
+TRIGRAM = "trigram"
+FULL_TEXT = "full_text"
+
+# The simple configuration does not stem words, hence, prefix queries match the start of any word
+SEARCH_CONFIG = "simple"
+SEARCH_VECTOR_COLUMN = "description_search"
+SEARCH_VECTOR_INDEX = "todoitem_description_search"
+
+# Trigram indexes on ToDoItem.title, Tag.name and ToDoItem.tag_names
+TRIGRAM_INDEXES = (
+    "todoitem_title_trgm",
+    "taggit_tag_name_trgm",
+    "todoitem_tag_names_trgm",
+)
+
+# Search features available per database alias (checked once per process)
+_search_features = {}
+
+
+def get_search_features(using: str = "default") -> set:
+    """Returns the search features available in a database: TRIGRAM and/or FULL_TEXT (empty if not PostgreSQL)"""
+
+    if using in _search_features:
+        record_cache_lookup("search_features", True)
+        return _search_features[using]
+
+    record_cache_lookup("search_features", False)
+    features = set()
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes WHERE indexname = ANY(%s)",
+                [[*TRIGRAM_INDEXES, SEARCH_VECTOR_INDEX]],
+            )
+            index_names = {row[0] for row in cursor.fetchall()}
+        if index_names.issuperset(TRIGRAM_INDEXES):
+            features.add(TRIGRAM)
+        if SEARCH_VECTOR_INDEX in index_names:
+            features.add(FULL_TEXT)
+
+    _search_features[using] = features
+    return features
+
+
+async def aget_search_features(using: str = "default") -> set:
+    """Async version of get_search_features, only using a thread if the features are not known yet"""
+
+    if using in _search_features:
+        record_cache_lookup("search_features", True)
+        return _search_features[using]
+    return await sync_to_async(get_search_features)(using)
+
+
+def to_prefix_tsquery(word: str) -> str:
+    """Returns a tsquery matching words starting with the given word, quoted as a single lexeme"""
+    return "'{}':*".format(word.replace("\\", "\\\\").replace("'", "''"))
+
+
+def description_contains(word: str, using: str = "default") -> Q:
+    """Returns the condition for a word in the description
+    - Full-text search (any word of the description starting with the word) if the tsvector column is available
+    - Else description__icontains
+    """
+
+    if not word or FULL_TEXT not in get_search_features(using):
+        return Q(description__icontains=word)
+
+    connection = connections[using]
+    return Q(
+        RawSQL(
+            f"{connection.ops.quote_name(ToDoItem._meta.db_table)}.{connection.ops.quote_name(SEARCH_VECTOR_COLUMN)} "
+            "@@ to_tsquery(%s::regconfig, %s)",
+            (SEARCH_CONFIG, to_prefix_tsquery(word)),
+            output_field=BooleanField(),
+        )
+    )
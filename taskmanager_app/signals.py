@@ -0,0 +1,160 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+from taggit.models import Tag
+
+from .models import (
+    ITEM_CREATED,
+    ITEM_DELETED,
+    ITEM_UPDATED,
+    RECURRENCE_NONE,
+    ItemChange,
+    MainCategoryItem,
+    ToDoItem,
+    get_category_slug,
+)
+from .metrics import count_query
+from .profiling import record_query
+from .recurrence import get_series_date
+
+# Bulk writes (bulk_create/bulk_update/raw inserts) send no signals, hence, they record their changes themselves
+
+
+def refresh_item_tags(item_ids) -> dict:
+    """Rewrites the tag names of items whose tags changed and records the change
+    - Also sets their modified date, which invalidates their cached fragments
+    """
+    tag_names = ToDoItem.objects.filter(pk__in=item_ids).refresh_tag_names()
+    ItemChange.objects.record(list(tag_names), ITEM_UPDATED)
+    return tag_names
+
+
+@receiver(pre_save, sender=ToDoItem)
+def set_completed_date(sender, instance, raw=False, **kwargs):
+    """Items completed for ARCHIVE_AFTER_DAYS are archived by their completed date"""
+    if raw:
+        return
+    if not instance.completed:
+        instance.completed_date = None
+    elif instance.completed_date is None:
+        instance.completed_date = timezone.now()
+
+
+@receiver(pre_save, sender=ToDoItem)
+def set_recurrence_start(sender, instance, raw=False, **kwargs):
+    """Fixes the date a series is counted from when its recurrence starts (see get_series_anchor)"""
+    if raw:
+        return
+    if instance.recurrence_rule == RECURRENCE_NONE or instance.recurrence_series_id:
+        instance.recurrence_start = None
+    elif instance.recurrence_start is None:
+        instance.recurrence_start = get_series_date(instance)
+
+
+@receiver(post_save, sender=ToDoItem)
+def record_item_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        ItemChange.objects.record(
+            [instance.pk], ITEM_CREATED if created else ITEM_UPDATED
+        )
+
+
+@receiver(post_delete, sender=ToDoItem)
+def record_item_deleted(sender, instance, **kwargs):
+    ItemChange.objects.record([instance.pk], ITEM_DELETED)
+
+
+@receiver(m2m_changed, sender=ToDoItem.tags.through)
+def record_item_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        # Changed from the tag side: all affected items are changed
+        if pk_set:
+            refresh_item_tags(pk_set)
+    elif isinstance(instance, ToDoItem):
+        # Keeps the instance in sync, as saving it again writes its tag names
+        instance.tag_names = refresh_item_tags([instance.pk]).get(
+            instance.pk, instance.tag_names
+        )
+
+
+@receiver(m2m_changed, sender=MainCategoryItem.main_category.through)
+def refresh_main_category_name(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        if pk_set:
+            MainCategoryItem.objects.filter(pk__in=pk_set).refresh_names()
+    elif isinstance(instance, MainCategoryItem):
+        # Keeps the instance in sync, as saving it again writes its name
+        instance.name = (
+            MainCategoryItem.objects.filter(pk=instance.pk)
+            .refresh_names()
+            .get(instance.pk, "")
+        )
+        instance.slug = get_category_slug(instance.name)
+
+
+@receiver(post_save, sender=Tag)
+def refresh_renamed_tag_items(sender, instance, raw=False, created=False, **kwargs):
+    """A renamed tag changes the tag names of all its items and the name of its main category"""
+    if not raw and not created:
+        refresh_item_tags(
+            ToDoItem.objects.filter(tags=instance).values_list("pk", flat=True)
+        )
+        MainCategoryItem.objects.filter(main_category=instance).refresh_names()
+
+
+@receiver(pre_delete, sender=Tag)
+def collect_deleted_tag_items(sender, instance, **kwargs):
+    """The tag links are deleted with the tag, hence, its items and main categories are collected before"""
+    instance.tagged_item_ids = list(
+        ToDoItem.objects.filter(tags=instance).values_list("pk", flat=True)
+    )
+    instance.main_category_ids = list(
+        MainCategoryItem.objects.filter(main_category=instance).values_list(
+            "pk", flat=True
+        )
+    )
+
+
+@receiver(post_delete, sender=Tag)
+def refresh_deleted_tag_items(sender, instance, **kwargs):
+    if item_ids := getattr(instance, "tagged_item_ids", None):
+        refresh_item_tags(item_ids)
+    if main_category_ids := getattr(instance, "main_category_ids", None):
+        MainCategoryItem.objects.filter(pk__in=main_category_ids).refresh_names()
+
+
+@receiver(connection_created)
+def install_query_profiling(sender, connection, **kwargs):
+    """Times the queries of profiled requests on every connection"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def install_query_metrics(sender, connection, **kwargs):
+    """Counts the queries of every request on every connection (METRICS_ENABLED)"""
+    if settings.METRICS_ENABLED and count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Applies SQLITE_PRAGMAS to every new SQLite connection"""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
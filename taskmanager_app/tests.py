@@ -1,3 +1,1836 @@
-from django.test import TestCase
+import codecs
+import csv
+import json
+import math
+import zipfile
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.forms.models import model_to_dict
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from taggit.models import Tag
+
+from . import rollover
+from .backends.sqlite3.base import DatabaseWrapper
+from .dependency_graph import get_date_dependency_chain, update_all_dependent_dates
+from .forms import DependencyPreviewForm
+from .metrics import PROMETHEUS_CONTENT_TYPE, escape_label_value
+from .middleware import REPLICA_STICKY_COOKIE
+from .models import (
+    DATE_FIELDS,
+    DEPENDENT_ON,
+    ITEM_CREATED,
+    ITEM_DELETED,
+    ITEM_UPDATED,
+    RECURRENCE_DAILY,
+    RECURRENCE_MONTHLY,
+    RECURRENCE_NONE,
+    RECURRENCE_WEEKLY,
+    USE_TODAYS_DATE,
+    ArchivedItem,
+    ItemChange,
+    ItemRevision,
+    MainCategoryItem,
+    ScheduledTaskRun,
+    ToDoItem,
+    TodoItem_tag,
+)
+from .ordering import (
+    PriorityGapExhausted,
+    get_priority_between,
+    move_row,
+    rebalance_priorities,
+)
+from .recurrence import add_months, generate_recurring_items, get_occurrence_dates
+from .routers import (
+    REPLICA_DB_ALIAS,
+    ReplicaRouter,
+    end_request,
+    get_request_state,
+    read_from_primary,
+    start_request,
+)
+from .search_indexes import (
+    FULL_TEXT,
+    TRIGRAM,
+    description_contains,
+    get_search_features,
+    to_prefix_tsquery,
+)
+from .utils import apply_delta, compute_critical_path, encode_delta
+from .views import (
+    find_dependency_cycle,
+    get_category_version,
+    get_free_copy_titles,
+)
+
+
+class DeltaTests(SimpleTestCase):
+    def assertRoundTrip(self, old: str, new: str):
+        self.assertEqual(apply_delta(old, encode_delta(old, new)), new)
+
+    def test_round_trip(self):
+        cases = (
+            ("", ""),
+            ("", "a\nb\n"),
+            ("a\nb\n", ""),
+            ("a\nb\nc\n", "a\nb\nc\n"),
+            ("a\nb\nc\n", "a\nx\nc\n"),
+            ("a\nb\nc\n", "x\na\nb\nc\n"),
+            ("a\nb\nc\n", "a\nb\nc\nx\n"),
+            ("a\nb\nc\n", "c\nb\na\n"),
+        )
+        for old, new in cases:
+            with self.subTest(old=old, new=new):
+                self.assertRoundTrip(old, new)
+
+    def test_missing_trailing_newline(self):
+        cases = (
+            ("a\nb", "a\nb\n"),
+            ("a\nb\n", "a\nb"),
+            ("a\nb", "a\nb\nc"),
+            ("a\nb", "a\nc"),
+            ("a", "b"),
+            ("a\r\nb", "a\r\nb\r\n"),
+        )
+        for old, new in cases:
+            with self.subTest(old=old, new=new):
+                self.assertRoundTrip(old, new)
+
+    def test_prefix_suffix_overlap(self):
+        # Common leading and trailing lines must not be copied twice
+        cases = (
+            ("a\n", "a\na\n"),
+            ("a\na\n", "a\n"),
+            ("a\na\na\n", "a\na\n"),
+            ("a\nb\na\n", "a\na\n"),
+            ("a\na\n", "a\nb\na\n"),
+            ("a\nb\na\nb\n", "a\nb\n"),
+        )
+        for old, new in cases:
+            with self.subTest(old=old, new=new):
+                self.assertRoundTrip(old, new)
+
+    def test_unchanged_lines_are_copied(self):
+        old = "".join(f"line {number}\n" for number in range(100))
+        new = old.replace("line 50\n", "changed\n")
+        self.assertEqual(encode_delta(old, new), [[0, 50], "changed\n", [51, 100]])
+
+
+class ItemRevisionTests(TestCase):
+    def save_descriptions(self, item, descriptions):
+        for description in descriptions:
+            item.description = description
+            item.save()
+
+    def get_revisions(self, item):
+        return list(ItemRevision.objects.filter(item_id=item.pk).order_by("number"))
+
+    def test_revisions_rebuild_descriptions(self):
+        descriptions = ["a\nb\nc", "a\nb\nc\n", "a\nx\nc\n", "x\na\nx\nc\n", "", "a"]
+        item = ToDoItem.objects.create(title="Item", description=descriptions[0])
+        self.save_descriptions(item, descriptions[1:])
+
+        revisions = self.get_revisions(item)
+        self.assertEqual(
+            [revision.get_full_description() for revision in revisions], descriptions
+        )
+        self.assertEqual(
+            [revision.is_snapshot for revision in revisions],
+            [True] + [False] * (len(descriptions) - 1),
+        )
+
+    def test_unchanged_item_records_no_revision(self):
+        item = ToDoItem.objects.create(title="Item", description="a\n")
+        item.save()
+        self.assertEqual(len(self.get_revisions(item)), 1)
+
+    @override_settings(REVISION_SNAPSHOT_INTERVAL=3)
+    def test_snapshot_interval(self):
+        item = ToDoItem.objects.create(title="Item", description="0\n")
+        self.save_descriptions(item, [f"{number}\n" for number in range(1, 7)])
+
+        revisions = self.get_revisions(item)
+        self.assertEqual(
+            [revision.snapshot_number for revision in revisions], [1, 1, 1, 4, 4, 4, 7]
+        )
+        self.assertEqual(
+            [revision.get_full_description() for revision in revisions],
+            [f"{number}\n" for number in range(7)],
+        )
+
+    def test_snapshot_without_base_description(self):
+        ToDoItem.objects.create(title="Item", description="a\n")
+        # Loaded without the description, hence, there is no base for a delta
+        item = ToDoItem.objects.defer("description").get(title="Item")
+        item.description = "b\n"
+        item.save()
+
+        revisions = self.get_revisions(item)
+        self.assertTrue(revisions[-1].is_snapshot)
+        self.assertEqual(revisions[-1].get_full_description(), "b\n")
+
+
+class CriticalPathTests(SimpleTestCase):
+    def get_dates(self, schedule, key):
+        return {node: row[key] for node, row in schedule.items()}
+
+    def test_forward_pass(self):
+        children = {"a": [("b", 2), ("c", 5)], "b": [("d", 1)]}
+        schedule = compute_critical_path(children, {"a": date(2026, 1, 10)})
+
+        self.assertEqual(
+            self.get_dates(schedule, "earliest"),
+            {
+                "a": date(2026, 1, 10),
+                "b": date(2026, 1, 12),
+                "c": date(2026, 1, 15),
+                "d": date(2026, 1, 13),
+            },
+        )
+        self.assertEqual(self.get_dates(schedule, "root"), dict.fromkeys("abcd", "a"))
+
+    def test_backward_pass_and_slack(self):
+        children = {"a": [("b", 2), ("c", 5)], "b": [("d", 1)]}
+        schedule = compute_critical_path(children, {"a": date(2026, 1, 10)})
+
+        self.assertEqual(
+            self.get_dates(schedule, "latest"),
+            {
+                "a": date(2026, 1, 10),
+                "b": date(2026, 1, 14),
+                "c": date(2026, 1, 15),
+                "d": date(2026, 1, 15),
+            },
+        )
+        self.assertEqual(
+            self.get_dates(schedule, "slack"), {"a": 0, "b": 2, "c": 0, "d": 2}
+        )
+        self.assertEqual(
+            self.get_dates(schedule, "critical"),
+            {"a": True, "b": False, "c": True, "d": False},
+        )
+
+    def test_negative_shift(self):
+        children = {"due": [("start", -3)]}
+        schedule = compute_critical_path(children, {"due": date(2026, 1, 10)})
+
+        self.assertEqual(schedule["due"]["latest"], date(2026, 1, 10))
+        self.assertEqual(schedule["due"]["slack"], 0)
+        self.assertTrue(schedule["due"]["critical"])
+        self.assertEqual(schedule["start"]["earliest"], date(2026, 1, 7))
+        self.assertEqual(schedule["start"]["slack"], 3)
+
+    def test_latest_dates_never_pass_the_chain_finish(self):
+        children = {"a": [("b", -3), ("c", 1)], "b": [("d", -2)]}
+        schedule = compute_critical_path(children, {"a": date(2026, 1, 10)})
+
+        for node, row in schedule.items():
+            with self.subTest(node=node):
+                self.assertLessEqual(row["latest"], date(2026, 1, 11))
+                self.assertGreaterEqual(row["slack"], 0)
+        self.assertEqual(
+            self.get_dates(schedule, "slack"), {"a": 0, "b": 4, "c": 0, "d": 6}
+        )
+
+    def test_zero_shift(self):
+        children = {"a": [("b", 0)], "b": [("c", None)]}
+        schedule = compute_critical_path(children, {"a": date(2026, 1, 10)})
+
+        self.assertEqual(
+            self.get_dates(schedule, "earliest"),
+            dict.fromkeys("abc", date(2026, 1, 10)),
+        )
+        self.assertEqual(
+            self.get_dates(schedule, "critical"), dict.fromkeys("abc", True)
+        )
+
+    def test_chains_are_independent(self):
+        children = {"a": [("b", 4)], "x": [("y", 1)]}
+        schedule = compute_critical_path(
+            children, {"a": date(2026, 1, 10), "x": date(2026, 1, 1)}
+        )
+
+        self.assertEqual(
+            self.get_dates(schedule, "slack"), {"a": 0, "b": 0, "x": 0, "y": 0}
+        )
+        self.assertEqual(schedule["y"]["root"], "x")
+
+    def test_root_without_date(self):
+        children = {"a": [("b", 2)]}
+        schedule = compute_critical_path(children, {"a": None})
+
+        self.assertEqual(self.get_dates(schedule, "earliest"), {"a": None, "b": None})
+        self.assertEqual(self.get_dates(schedule, "slack"), {"a": None, "b": None})
+        self.assertEqual(self.get_dates(schedule, "critical"), {"a": False, "b": False})
+
+
+class ApiBatchTests(TestCase):
+    def post_batch(self, body):
+        return self.client.post(
+            reverse("api-batch"), json.dumps(body), content_type="application/json"
+        )
+
+    def test_operations(self):
+        item = ToDoItem.objects.create(title="Item")
+        deleted = ToDoItem.objects.create(title="Deleted")
+
+        response = self.post_batch(
+            {
+                "operations": [
+                    {"op": "create", "resource": "item", "data": {"title": "New"}},
+                    {
+                        "op": "update",
+                        "resource": "item",
+                        "id": item.pk,
+                        "data": {"title": "Renamed", "tags": ["a", "b"]},
+                    },
+                    {"op": "delete", "resource": "item", "id": deleted.pk},
+                ]
+            }
+        )
+
+        self.assertEqual(response.status_code, 200)
+        new = ToDoItem.objects.get(title="New")
+        self.assertEqual(
+            response.json()["results"],
+            [{"id": new.pk}, {"id": item.pk}, {"id": deleted.pk}],
+        )
+        item.refresh_from_db()
+        self.assertEqual(item.title, "Renamed")
+        self.assertEqual(sorted(item.tags.names()), ["a", "b"])
+        self.assertFalse(ToDoItem.objects.filter(pk=deleted.pk).exists())
+
+    def test_failed_operation_rolls_back_the_batch(self):
+        item = ToDoItem.objects.create(title="Item")
+
+        response = self.post_batch(
+            {
+                "operations": [
+                    {"op": "create", "resource": "item", "data": {"title": "New"}},
+                    {"op": "delete", "resource": "item", "id": item.pk},
+                    {"op": "update", "resource": "item", "id": 0, "data": {}},
+                ]
+            }
+        )
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()["errors"]["index"], 2)
+        self.assertEqual(
+            list(ToDoItem.objects.values_list("title", flat=True)), ["Item"]
+        )
+
+    def test_invalid_data_rolls_back_the_batch(self):
+        response = self.post_batch(
+            {
+                "operations": [
+                    {"op": "create", "resource": "item", "data": {"title": "New"}},
+                    {"op": "create", "resource": "item", "data": {"title": "New"}},
+                ]
+            }
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"]["index"], 1)
+        self.assertIn("title", response.json()["errors"]["errors"])
+        self.assertFalse(ToDoItem.objects.exists())
+
+    def test_malformed_bodies(self):
+        cases = (
+            ([{"op": "create"}], None),
+            ({"operations": {"op": "create"}}, None),
+            ({"operations": ["create"]}, 0),
+            ({"operations": [{"op": "create", "resource": "item", "data": []}]}, 0),
+            ({"operations": [{"op": "move", "resource": "item", "id": 1}]}, 0),
+            ({"operations": [{"op": "create", "resource": "user"}]}, 0),
+        )
+        for body, index in cases:
+            with self.subTest(body=body):
+                response = self.post_batch(body)
+                self.assertEqual(response.status_code, 400)
+                if index is not None:
+                    self.assertEqual(response.json()["errors"]["index"], index)
+        self.assertFalse(ToDoItem.objects.exists())
+
+    def test_invalid_ids(self):
+        item = ToDoItem.objects.create(title="Item")
+        for pk in ("abc", [item.pk], str(item.pk), None, True, 1.5):
+            with self.subTest(pk=pk):
+                response = self.post_batch(
+                    {
+                        "operations": [
+                            {
+                                "op": "create",
+                                "resource": "item",
+                                "data": {"title": "New"},
+                            },
+                            {"op": "delete", "resource": "item", "id": pk},
+                        ]
+                    }
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(
+                    response.json()["errors"],
+                    {"index": 1, "errors": {"id": ["Expected an integer"]}},
+                )
+                self.assertEqual(
+                    list(ToDoItem.objects.values_list("title", flat=True)), ["Item"]
+                )
+
+    def test_requires_json(self):
+        response = self.client.post(reverse("api-batch"), {"operations": []})
+        self.assertEqual(response.status_code, 415)
+
+
+class PriorityBetweenTests(SimpleTestCase):
+    def test_priority_between(self):
+        cases = (
+            ((3.0, 1.0), 2.0),
+            ((None, 1.0), 2.0),
+            ((3.0, None), 2.0),
+            ((-1.0, -3.0), -2.0),
+            ((1.0, 1.0), None),
+            ((1.0, math.nextafter(1.0, 0)), None),
+        )
+        for (above, below), priority in cases:
+            with self.subTest(above=above, below=below):
+                self.assertEqual(get_priority_between(above, below), priority)
+
+
+class MoveRowTests(TestCase):
+    def create_items(self, priorities: dict) -> dict:
+        return {
+            title: ToDoItem.objects.create(title=title, sorting_priority=priority).pk
+            for title, priority in priorities.items()
+        }
+
+    def get_order(self):
+        return list(
+            ToDoItem.objects.order_by("-sorting_priority", "title", "id").values_list(
+                "title", flat=True
+            )
+        )
+
+    def test_move_between_neighbours(self):
+        pks = self.create_items({"a": 3.0, "b": 2.0, "c": 1.0})
+
+        self.assertEqual(move_row("item", pks["c"], pks["a"], pks["b"]), (2.5, False))
+        self.assertEqual(self.get_order(), ["a", "c", "b"])
+
+    def test_move_to_the_ends(self):
+        pks = self.create_items({"a": 3.0, "b": 2.0, "c": 1.0})
+
+        self.assertEqual(move_row("item", pks["c"], below_pk=pks["a"]), (4.0, False))
+        self.assertEqual(self.get_order(), ["c", "a", "b"])
+        self.assertEqual(move_row("item", pks["c"], above_pk=pks["b"]), (1.0, False))
+        self.assertEqual(self.get_order(), ["a", "b", "c"])
+
+    def test_equal_neighbours_renumber_the_window(self):
+        pks = self.create_items({"a": 1.0, "b": 1.0, "c": 1.0, "d": 0.0, "e": -1.0})
+
+        priority, renumbered = move_row("item", pks["e"], pks["a"], pks["b"])
+
+        self.assertTrue(renumbered)
+        self.assertEqual(self.get_order(), ["a", "e", "b", "c", "d"])
+        priorities = list(
+            ToDoItem.objects.order_by("-sorting_priority").values_list(
+                "sorting_priority", flat=True
+            )
+        )
+        self.assertEqual(len(set(priorities)), len(priorities))
+        # Rows outside of the window keep their priorities
+        self.assertEqual(ToDoItem.objects.get(pk=pks["d"]).sorting_priority, 0.0)
+        self.assertEqual(ToDoItem.objects.get(pk=pks["e"]).sorting_priority, priority)
+
+    @mock.patch("taskmanager_app.ordering.MAX_WINDOW_ROWS", 3)
+    def test_window_limit(self):
+        pks = self.create_items({"a": 1.0, "b": 1.0, "c": 1.0, "d": 0.0})
+
+        with self.assertRaises(PriorityGapExhausted):
+            move_row("item", pks["d"], pks["a"], pks["b"])
+        self.assertEqual(self.get_order(), ["a", "b", "c", "d"])
+        self.assertEqual(
+            set(ToDoItem.objects.values_list("sorting_priority", flat=True)),
+            {1.0, 0.0},
+        )
+
+    def test_unknown_row(self):
+        with self.assertRaises(ToDoItem.DoesNotExist):
+            move_row("item", 0, below_pk=1)
+
+    def test_reorder_unknown_rows(self):
+        pks = self.create_items({"a": 2.0, "b": 1.0})
+        for data in (
+            {"id": 0, "above_id": pks["a"]},
+            {"id": pks["b"], "above_id": 0},
+            {"id": pks["a"], "above_id": pks["b"], "below_id": 0},
+        ):
+            with self.subTest(data=data):
+                response = self.client.post(
+                    reverse("reorder"), {"resource": "item", **data}
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(
+                    response.json(), {"errors": {"id": ["item 0 does not exist"]}}
+                )
+                self.assertEqual(self.get_order(), ["a", "b"])
+
+    def test_renumbering_updates_modified_dates(self):
+        pks = self.create_items({"a": 1.0, "b": 1.0, "c": 1.0, "d": 0.0})
+        ToDoItem.objects.update(modified_date=timezone.now() - timedelta(days=1))
+
+        move_row("item", pks["d"], pks["a"], pks["b"])
+
+        stale = timezone.now() - timedelta(hours=1)
+        self.assertEqual(
+            set(
+                ToDoItem.objects.filter(modified_date__gt=stale).values_list(
+                    "title", flat=True
+                )
+            ),
+            {"a", "b", "c", "d"},
+        )
+
+        ToDoItem.objects.update(
+            sorting_priority=0.5, modified_date=timezone.now() - timedelta(days=1)
+        )
+        rebalance_priorities("item")
+        self.assertEqual(
+            set(
+                ToDoItem.objects.filter(modified_date__gt=stale).values_list(
+                    "title", flat=True
+                )
+            ),
+            {"a", "b", "c", "d"},
+        )
+
+    def test_rebalance_priorities_command(self):
+        self.create_items({"a": 5.0, "b": 5.0, "c": 0.5, "d": 0.5})
+
+        out = StringIO()
+        call_command("rebalance_priorities", stdout=out)
+
+        self.assertIn("Renumbered the priorities of 4 item rows", out.getvalue())
+        self.assertEqual(
+            list(
+                ToDoItem.objects.order_by("-sorting_priority").values_list(
+                    "title", "sorting_priority"
+                )
+            ),
+            [("a", 4.0), ("b", 3.0), ("c", 2.0), ("d", 1.0)],
+        )
+
+        out = StringIO()
+        call_command("rebalance_priorities", stdout=out)
+        self.assertIn("The priorities of item rows are distinct", out.getvalue())
+
+
+class DependencyCycleTests(TestCase):
+    def depend_on(self, item, field, parent, parent_field):
+        setattr(item, f"{field}_depend", DEPENDENT_ON)
+        setattr(item, f"{field}_depend_id", parent.pk)
+        setattr(item, f"{field}_depend_type", parent_field)
+        item.save()
+
+    def get_draft(self, item, **changes):
+        return {**ToDoItem.objects.filter(pk=item.pk).values().get(), **changes}
+
+    def test_self_dependency(self):
+        item = ToDoItem.objects.create(title="Item")
+        draft = self.get_draft(
+            item,
+            date_due_depend=DEPENDENT_ON,
+            date_due_depend_id=item.pk,
+            date_due_depend_type="date_due",
+        )
+
+        self.assertEqual(
+            find_dependency_cycle(item.pk, draft),
+            [[f"{item.pk}@date_due", f"{item.pk}@date_due"]],
+        )
+
+    def test_cycle_between_dates_of_an_item(self):
+        item = ToDoItem.objects.create(title="Item")
+        self.depend_on(item, "date_start_latest", item, "date_due")
+        draft = self.get_draft(
+            item,
+            date_due_depend=DEPENDENT_ON,
+            date_due_depend_id=item.pk,
+            date_due_depend_type="date_start_latest",
+        )
+
+        self.assertEqual(
+            find_dependency_cycle(item.pk, draft),
+            [
+                [f"{item.pk}@date_due", f"{item.pk}@date_start_latest"],
+                [f"{item.pk}@date_start_latest", f"{item.pk}@date_due"],
+            ],
+        )
+
+    def test_indirect_cycle(self):
+        a, b, c = (ToDoItem.objects.create(title=title) for title in "abc")
+        self.depend_on(a, "date_due", b, "date_due")
+        self.depend_on(b, "date_due", c, "date_start_latest")
+        draft = self.get_draft(
+            c,
+            date_start_latest_depend=DEPENDENT_ON,
+            date_start_latest_depend_id=a.pk,
+            date_start_latest_depend_type="date_due",
+        )
+
+        self.assertEqual(
+            find_dependency_cycle(c.pk, draft),
+            [
+                [f"{b.pk}@date_due", f"{c.pk}@date_start_latest"],
+                [f"{a.pk}@date_due", f"{b.pk}@date_due"],
+                [f"{c.pk}@date_start_latest", f"{a.pk}@date_due"],
+            ],
+        )
+
+    def test_chain_without_cycle(self):
+        a, b, c = (ToDoItem.objects.create(title=title) for title in "abc")
+        self.depend_on(a, "date_due", b, "date_due")
+        self.depend_on(b, "date_due", c, "date_due")
+        # A cycle not through the edited item
+        self.depend_on(b, "date_start_latest", b, "date_start_latest")
+        draft = self.get_draft(
+            c,
+            date_due_depend=DEPENDENT_ON,
+            date_due_depend_id=b.pk,
+            date_due_depend_type="date_start_latest",
+        )
+
+        self.assertIsNone(find_dependency_cycle(c.pk, draft))
+        self.assertIsNone(find_dependency_cycle(a.pk, self.get_draft(a)))
+
+    def test_cycle_errors(self):
+        a, b = (ToDoItem.objects.create(title=title) for title in "ab")
+        self.depend_on(a, "date_due", b, "date_due")
+
+        response = self.client.patch(
+            reverse("api-item", args=[b.pk]),
+            json.dumps(
+                {
+                    "date_due_depend": DEPENDENT_ON,
+                    "date_due_depend_id": a.pk,
+                    "date_due_depend_type": "date_due",
+                }
+            ),
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()["errors"]["date_due_depend_id"],
+            [
+                "*The following date dependencies will cause recursive errors:",
+                f"- Field due in item {a.pk} depends on due in current item",
+                f"- Field due in current item depends on due in item {a.pk}",
+            ],
+        )
+        b.refresh_from_db()
+        self.assertIsNone(b.date_due_depend_id)
+
+
+class DependencyPreviewTests(TestCase):
+    def create_dependent(self, title, field, parent, parent_field, shift):
+        return ToDoItem.objects.create(
+            title=title,
+            **{
+                f"{field}_depend": DEPENDENT_ON,
+                f"{field}_depend_id": parent.pk,
+                f"{field}_depend_type": parent_field,
+                f"{field}_depend_shift": shift,
+            },
+        )
+
+    def get_dates(self):
+        return {
+            (item["id"], field): item[field]
+            for item in ToDoItem.objects.values("id", "date_start_latest", "date_due")
+            for field in ("date_start_latest", "date_due")
+        }
+
+    def test_preview_matches_the_update(self):
+        root = ToDoItem.objects.create(title="Root", date_due=date(2026, 1, 10))
+        child = self.create_dependent("Child", "date_due", root, "date_due", 2)
+        grandchild = self.create_dependent(
+            "Grandchild", "date_start_latest", child, "date_due", -5
+        )
+        self.create_dependent("Sibling", "date_due", root, "date_start_latest", 1)
+        update_all_dependent_dates()
+        old_dates = self.get_dates()
+
+        data = {
+            key: "" if value is None else value
+            for key, value in model_to_dict(
+                root, fields=DependencyPreviewForm.Meta.fields
+            ).items()
+        }
+        data.update(item_id=root.pk, date_due="2026-02-01")
+        response = self.client.post(reverse("dependency-preview"), data)
+        self.assertEqual(response.status_code, 200)
+        preview = response.json()
+
+        # Nothing is written by the preview
+        self.assertEqual(self.get_dates(), old_dates)
+
+        root.date_due = date(2026, 2, 1)
+        root.save()
+        update_all_dependent_dates()
+        new_dates = self.get_dates()
+
+        self.assertEqual(preview["item"]["date_due"], "2026-02-01")
+        self.assertEqual(
+            {
+                (change["id"], change["field"]): (change["old"], change["new"])
+                for change in preview["changes"]
+            },
+            {
+                (node_id, field): (
+                    old_dates[node_id, field].isoformat(),
+                    new_date.isoformat(),
+                )
+                for (node_id, field), new_date in new_dates.items()
+                if node_id != root.pk and new_date != old_dates[node_id, field]
+            },
+        )
+        self.assertEqual(
+            new_dates[grandchild.pk, "date_start_latest"],
+            date(2026, 2, 1) + timedelta(days=2 - 5),
+        )
+        self.assertEqual(new_dates[child.pk, "date_due"], date(2026, 2, 3))
+
+
+class OccurrenceDateTests(SimpleTestCase):
+    def get_series(self, rule, anchor, interval=1, end=None):
+        return SimpleNamespace(
+            recurrence_rule=rule,
+            recurrence_interval=interval,
+            recurrence_end=end,
+            recurrence_start=anchor,
+            date_due=anchor,
+            date_start_earliest=None,
+            date_start_latest=None,
+        )
+
+    def test_add_months(self):
+        cases = (
+            (date(2026, 1, 15), 1, date(2026, 2, 15)),
+            (date(2026, 1, 31), 1, date(2026, 2, 28)),
+            (date(2028, 1, 31), 1, date(2028, 2, 29)),
+            (date(2026, 11, 30), 3, date(2027, 2, 28)),
+            (date(2026, 12, 31), 12, date(2027, 12, 31)),
+        )
+        for d, months, result in cases:
+            with self.subTest(d=d, months=months):
+                self.assertEqual(add_months(d, months), result)
+
+    def test_daily(self):
+        series = self.get_series(RECURRENCE_DAILY, date(2026, 1, 5), interval=3)
+        self.assertEqual(
+            list(get_occurrence_dates(series, date(2026, 1, 1), date(2026, 1, 12))),
+            [date(2026, 1, 8), date(2026, 1, 11)],
+        )
+
+    def test_weekly_from_a_later_window(self):
+        series = self.get_series(RECURRENCE_WEEKLY, date(2026, 1, 5), interval=2)
+        self.assertEqual(
+            list(get_occurrence_dates(series, date(2026, 1, 10), date(2026, 2, 10))),
+            [date(2026, 1, 19), date(2026, 2, 2)],
+        )
+
+    def test_monthly_clamps_to_the_end_of_month(self):
+        series = self.get_series(RECURRENCE_MONTHLY, date(2026, 1, 31))
+        self.assertEqual(
+            list(get_occurrence_dates(series, date(2026, 2, 1), date(2026, 4, 30))),
+            [date(2026, 2, 28), date(2026, 3, 31), date(2026, 4, 30)],
+        )
+
+    def test_monthly_interval_from_a_later_window(self):
+        series = self.get_series(RECURRENCE_MONTHLY, date(2026, 1, 10), interval=5)
+        self.assertEqual(
+            list(get_occurrence_dates(series, date(2026, 7, 1), date(2027, 12, 31))),
+            [date(2026, 11, 10), date(2027, 4, 10), date(2027, 9, 10)],
+        )
+
+    def test_recurrence_end(self):
+        series = self.get_series(
+            RECURRENCE_DAILY, date(2026, 1, 5), end=date(2026, 1, 7)
+        )
+        self.assertEqual(
+            list(get_occurrence_dates(series, date(2026, 1, 1), date(2026, 1, 31))),
+            [date(2026, 1, 6), date(2026, 1, 7)],
+        )
+
+
+class GenerateRecurringItemsTests(TestCase):
+    def get_occurrences(self, series):
+        return list(
+            ToDoItem.objects.filter(recurrence_series=series)
+            .order_by("recurrence_date")
+            .values_list("title", "recurrence_date", "date_start_latest", "date_due")
+        )
+
+    def test_occurrences(self):
+        series = ToDoItem.objects.create(
+            title="Weekly",
+            recurrence_rule=RECURRENCE_WEEKLY,
+            date_start_latest=date(2026, 1, 3),
+            date_due=date(2026, 1, 5),
+        )
+
+        self.assertEqual(
+            generate_recurring_items(horizon_days=14, today=date(2026, 1, 5)), (2, 0)
+        )
+        self.assertEqual(
+            self.get_occurrences(series),
+            [
+                (
+                    "Weekly (2026-01-12)",
+                    date(2026, 1, 12),
+                    date(2026, 1, 10),
+                    date(2026, 1, 12),
+                ),
+                (
+                    "Weekly (2026-01-19)",
+                    date(2026, 1, 19),
+                    date(2026, 1, 17),
+                    date(2026, 1, 19),
+                ),
+            ],
+        )
+        # Existing occurrences are not generated again
+        self.assertEqual(
+            generate_recurring_items(horizon_days=14, today=date(2026, 1, 5)), (0, 0)
+        )
+
+    def test_long_titles_are_cut_to_fit_the_date(self):
+        max_length = ToDoItem._meta.get_field("title").max_length
+        title = "x" * max_length
+        series = ToDoItem.objects.create(
+            title=title, recurrence_rule=RECURRENCE_DAILY, date_due=date(2026, 1, 5)
+        )
+
+        generate_recurring_items(horizon_days=2, today=date(2026, 1, 5))
+
+        titles = [row[0] for row in self.get_occurrences(series)]
+        self.assertEqual(
+            titles,
+            [
+                title[: max_length - 13] + " (2026-01-06)",
+                title[: max_length - 13] + " (2026-01-07)",
+            ],
+        )
+        self.assertTrue(all(len(title) == max_length for title in titles))
+
+    def test_occurrences_keep_their_dates_when_the_series_moves(self):
+        series = ToDoItem.objects.create(
+            title="Weekly",
+            recurrence_rule=RECURRENCE_WEEKLY,
+            date_start_latest=date(2026, 1, 3),
+            date_due=date(2026, 1, 5),
+            date_due_depend=USE_TODAYS_DATE,
+        )
+        self.assertEqual(series.recurrence_start, date(2026, 1, 5))
+        generate_recurring_items(horizon_days=14, today=date(2026, 1, 5))
+
+        # Rolled over to the next day
+        ToDoItem.objects.filter(pk=series.pk).update(
+            date_start_latest=date(2026, 1, 4), date_due=date(2026, 1, 6)
+        )
+        self.assertEqual(
+            generate_recurring_items(horizon_days=14, today=date(2026, 1, 6)), (0, 0)
+        )
+        self.assertEqual(
+            [row[1] for row in self.get_occurrences(series)],
+            [date(2026, 1, 12), date(2026, 1, 19)],
+        )
+
+        self.assertEqual(
+            generate_recurring_items(horizon_days=14, today=date(2026, 1, 13)), (1, 0)
+        )
+        self.assertEqual(
+            self.get_occurrences(series)[-1],
+            (
+                "Weekly (2026-01-26)",
+                date(2026, 1, 26),
+                date(2026, 1, 24),
+                date(2026, 1, 26),
+            ),
+        )
+
+    def test_recurrence_start(self):
+        item = ToDoItem.objects.create(title="Item", date_due=date(2026, 1, 5))
+        self.assertIsNone(item.recurrence_start)
+
+        item.recurrence_rule = RECURRENCE_DAILY
+        item.save()
+        item.date_due = date(2026, 1, 9)
+        item.save()
+        self.assertEqual(item.recurrence_start, date(2026, 1, 5))
+
+        item.recurrence_rule = RECURRENCE_NONE
+        item.save()
+        self.assertIsNone(item.recurrence_start)
+
+    def test_conflicting_occurrences_are_skipped(self):
+        series = ToDoItem.objects.create(
+            title="Daily", recurrence_rule=RECURRENCE_DAILY, date_due=date(2026, 1, 5)
+        )
+        ToDoItem.objects.create(title="Daily (2026-01-07)")
+
+        self.assertEqual(
+            generate_recurring_items(horizon_days=3, today=date(2026, 1, 5)), (2, 1)
+        )
+        self.assertEqual(
+            [row[1] for row in self.get_occurrences(series)],
+            [date(2026, 1, 6), date(2026, 1, 8)],
+        )
+        # The skipped occurrence is tried again
+        self.assertEqual(
+            generate_recurring_items(horizon_days=3, today=date(2026, 1, 5)), (0, 1)
+        )
+
+
+class CalendarFeedTests(TestCase):
+    def test_feed_rolls_over_stale_dates(self):
+        item = ToDoItem.objects.create(
+            title="Today",
+            date_due=date(2000, 1, 1),
+            date_due_depend=USE_TODAYS_DATE,
+        )
+        today = timezone.now().date()
+
+        with mock.patch.object(rollover, "_last_rollover_date", None):
+            response = self.client.get(reverse("calendar_feed"))
+            content = b"".join(response.streaming_content).decode()
+
+        item.refresh_from_db()
+        self.assertEqual(item.date_due, today)
+        self.assertIn(f"DTSTART;VALUE=DATE:{today.strftime('%Y%m%d')}", content)
+        self.assertNotIn("DTSTART;VALUE=DATE:20000101", content)
+
+
+class AgendaFeedTests(TestCase):
+    def get_feed(self, **params):
+        return self.client.get(reverse("agenda_feed"), params)
+
+    def test_window(self):
+        item = ToDoItem.objects.create(
+            title="Item", date_due=date(2026, 1, 5), date_start_latest=date(2026, 2, 1)
+        )
+
+        response = self.get_feed(start="2026-01-01")
+
+        self.assertEqual(response.status_code, 200)
+        feed = response.json()
+        self.assertEqual(feed["end"], "2026-01-31")
+        self.assertEqual(feed["next_start"], "2026-02-01")
+        self.assertEqual(
+            feed["entries"], [["2026-01-05", "dd", item.pk, "Item", False]]
+        )
+
+    def test_window_is_limited(self):
+        feed = self.get_feed(start="2026-01-01", end="2027-01-01").json()
+        self.assertEqual(feed["end"], "2026-04-02")
+
+    def test_end_of_the_calendar(self):
+        for params in (
+            {"start": "9999-12-01"},
+            {"start": "9999-12-01", "end": "9999-12-31"},
+            {"start": "9999-12-31"},
+        ):
+            with self.subTest(params=params):
+                response = self.get_feed(**params)
+                self.assertEqual(response.status_code, 200)
+                feed = response.json()
+                self.assertEqual(feed["end"], "9999-12-31")
+                self.assertIsNone(feed["next_start"])
+
+    def test_invalid_dates(self):
+        self.assertEqual(self.get_feed(start="2026-13-01").status_code, 400)
+        self.assertEqual(
+            self.get_feed(start="2026-01-02", end="2026-01-01").status_code, 400
+        )
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        ToDoItem.objects.create(title="Item", description="Paint the fence")
+        ToDoItem.objects.create(title="Other", description="Repainting")
+
+    def search(self, word):
+        return set(
+            ToDoItem.objects.filter(description_contains(word)).values_list(
+                "title", flat=True
+            )
+        )
+
+    def test_prefix_tsquery(self):
+        self.assertEqual(to_prefix_tsquery("paint"), "'paint':*")
+        self.assertEqual(to_prefix_tsquery("it's\\"), "'it''s\\\\':*")
+
+    @skipIf(connection.vendor == "postgresql", "Without search indexes only")
+    def test_description_contains_without_indexes(self):
+        self.assertEqual(get_search_features(), set())
+        self.assertEqual(self.search("paint"), {"Item", "Other"})
+
+    @skipUnless(connection.vendor == "postgresql", "PostgreSQL only")
+    def test_search_indexes(self):
+        self.assertEqual(get_search_features(), {TRIGRAM, FULL_TEXT})
+        # Full-text search matches the start of words
+        self.assertEqual(self.search("paint"), {"Item"})
+
+
+@skipUnless(connection.vendor == "sqlite", "SQLite only")
+class SqliteTests(TransactionTestCase):
+    def test_health(self):
+        response = self.client.get(reverse("health"))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["status"], "ok")
+        self.assertEqual(data["database"]["vendor"], "sqlite")
+        self.assertEqual(
+            data["database"]["size"],
+            data["database"]["pragmas"]["page_size"]
+            * data["database"]["pragmas"]["page_count"],
+        )
+
+    def test_health_unknown_pragma(self):
+        with override_settings(SQLITE_PRAGMAS={"no_such_pragma": 1}):
+            response = self.client.get(reverse("health"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()["database"]["pragmas"]["no_such_pragma"])
+
+    def test_pragmas_applied(self):
+        pragmas = self.client.get(reverse("health")).json()["database"]["pragmas"]
+        self.assertEqual(pragmas["synchronous"], 1)  # NORMAL
+        self.assertEqual(pragmas["busy_timeout"], 20000)
+        self.assertEqual(pragmas["cache_size"], -20000)
+        self.assertEqual(pragmas["temp_store"], 2)  # MEMORY
+
+    def test_begin_immediate(self):
+        self.assertEqual(connection.transaction_mode, "IMMEDIATE")
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                ToDoItem.objects.create(title="Item")
+        self.assertEqual(queries[0]["sql"], "BEGIN IMMEDIATE")
+
+    def test_invalid_transaction_mode(self):
+        settings_dict = {
+            **connection.settings_dict,
+            "OPTIONS": {"transaction_mode": "LATER"},
+        }
+        wrapper = DatabaseWrapper(settings_dict, alias="invalid")
+        with self.assertRaises(ImproperlyConfigured):
+            wrapper.get_connection_params()
+
+
+@skipUnless(connection.vendor == "sqlite", "SQLite only")
+@override_settings(DATABASE_ROUTERS=["taskmanager_app.routers.ReplicaRouter"])
+class ReplicaRouterTests(TransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # A second connection to the (shared in-memory) test database stands in for the replica
+        connections.settings[REPLICA_DB_ALIAS] = {
+            **connection.settings_dict,
+            "TEST": {"MIRROR": DEFAULT_DB_ALIAS},
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA_DB_ALIAS].close()
+        del connections[REPLICA_DB_ALIAS]
+        del connections.settings[REPLICA_DB_ALIAS]
+        super().tearDownClass()
+
+    def setUp(self):
+        ToDoItem.objects.create(title="Item")
+        patcher = mock.patch.object(
+            rollover, "_last_rollover_date", timezone.now().date()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_list(self):
+        with CaptureQueriesContext(connections[REPLICA_DB_ALIAS]) as queries:
+            response = self.client.get(reverse("todo_list_view"))
+        self.assertContains(response, "Item")
+        return len(queries)
+
+    def test_db_for_read(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(ToDoItem), DEFAULT_DB_ALIAS)
+        token = start_request()
+        try:
+            self.assertEqual(router.db_for_read(ToDoItem), DEFAULT_DB_ALIAS)
+            get_request_state()["replica"] = True
+            self.assertEqual(router.db_for_read(ToDoItem), REPLICA_DB_ALIAS)
+            self.assertEqual(router.db_for_write(ToDoItem), DEFAULT_DB_ALIAS)
+            # Reads within a transaction of the primary see its uncommitted writes
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(ToDoItem), DEFAULT_DB_ALIAS)
+            with read_from_primary():
+                self.assertEqual(router.db_for_read(ToDoItem), DEFAULT_DB_ALIAS)
+            self.assertEqual(router.db_for_read(ToDoItem), REPLICA_DB_ALIAS)
+        finally:
+            end_request(token)
+
+    def test_reads_from_replica(self):
+        self.assertGreater(self.get_list(), 0)
+
+    def test_sticky_after_write(self):
+        response = self.client.post(
+            reverse("api-batch"),
+            json.dumps({"operations": []}),
+            content_type="application/json",
+        )
+        self.assertEqual(
+            response.cookies[REPLICA_STICKY_COOKIE]["max-age"],
+            settings.REPLICA_STICKY_SECONDS,
+        )
+        self.assertEqual(self.get_list(), 0)
+
+        del self.client.cookies[REPLICA_STICKY_COOKIE]
+        self.assertGreater(self.get_list(), 0)
+
+    def test_rollover_reads_from_primary(self):
+        rollover._last_rollover_date = None
+        with CaptureQueriesContext(connections[REPLICA_DB_ALIAS]) as queries:
+            self.get_list()
+        self.assertEqual(
+            [query for query in queries if "scheduledtaskrun" in query["sql"]], []
+        )
+        self.assertTrue(ScheduledTaskRun.objects.exists())
+
+
+class ChangeFeedTests(TestCase):
+    def get_last_id(self):
+        return self.client.get(reverse("item_changes_poll")).json()["last_id"]
+
+    def test_poll(self):
+        last_id = self.get_last_id()
+        item = ToDoItem.objects.create(title="Item")
+        response = self.client.get(reverse("item_changes_poll"), {"since": last_id})
+        self.assertEqual(response.status_code, 200)
+        feed = response.json()
+        self.assertEqual(feed["changes"], {str(item.pk): ITEM_CREATED})
+        self.assertGreater(feed["last_id"], last_id)
+        self.assertFalse(feed["reset"])
+
+    def test_changes_are_merged_per_item(self):
+        existing = ToDoItem.objects.create(title="Existing")
+        deleted = ToDoItem.objects.create(title="Deleted")
+        deleted_pk = deleted.pk
+        last_id = self.get_last_id()
+
+        new = ToDoItem.objects.create(title="New")
+        new.tags.add("work")
+        new.save()
+        existing.save()
+        deleted.save()
+        deleted.delete()
+
+        feed = self.client.get(reverse("item_changes_poll"), {"since": last_id}).json()
+        self.assertEqual(
+            feed["changes"],
+            {
+                str(new.pk): ITEM_CREATED,
+                str(existing.pk): ITEM_UPDATED,
+                str(deleted_pk): ITEM_DELETED,
+            },
+        )
+
+    def test_reset_after_trimmed_changes(self):
+        ToDoItem.objects.create(title="Old")
+        last_id = self.get_last_id()
+        ToDoItem.objects.create(title="Trimmed")
+        ToDoItem.objects.create(title="New")
+        ItemChange.objects.filter(id__lte=last_id + 1).delete()
+
+        feed = self.client.get(reverse("item_changes_poll"), {"since": last_id}).json()
+        self.assertTrue(feed["reset"])
+        self.assertEqual(feed["changes"], {})
+        self.assertEqual(feed["last_id"], self.get_last_id())
+
+    def test_item_row(self):
+        item = ToDoItem.objects.create(title="Item")
+        for layout in ("list", "sorting"):
+            with self.subTest(layout=layout):
+                response = self.client.get(
+                    reverse("item-row", args=[item.pk]), {"layout": layout}
+                )
+                self.assertContains(response, "Item")
+        self.assertEqual(
+            self.client.get(reverse("item-row", args=[0])).status_code, 404
+        )
+
+    @mock.patch("taskmanager_app.views.CHANGE_FEED_POLL_INTERVAL", 0)
+    @mock.patch("taskmanager_app.views.CHANGE_FEED_LONG_POLL_TIMEOUT", 0)
+    def test_poll_timeout(self):
+        last_id = self.get_last_id()
+        response = self.client.get(reverse("item_changes_poll"), {"since": last_id})
+        self.assertEqual(
+            response.json(), {"last_id": last_id, "changes": {}, "reset": False}
+        )
+
+    def test_trim_item_changes_command(self):
+        ToDoItem.objects.create(title="Old")
+        ItemChange.objects.update(created_date=timezone.now() - timedelta(days=8))
+        ToDoItem.objects.create(title="New")
+        new_count = ItemChange.objects.filter(
+            created_date__gt=timezone.now() - timedelta(days=1)
+        ).count()
+
+        out = StringIO()
+        call_command("trim_item_changes", stdout=out)
+
+        self.assertEqual(ItemChange.objects.count(), new_count)
+        self.assertIn("Deleted", out.getvalue())
+
+    def test_poll_invalid_since(self):
+        response = self.client.get(reverse("item_changes_poll"), {"since": "-1"})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_events(self):
+        response = await self.async_client.get(reverse("item_changes_poll"))
+        last_id = response.json()["last_id"]
+        item = await ToDoItem.objects.acreate(title="Item")
+        response = await self.async_client.get(
+            reverse("item_change_events"), {"since": last_id}
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = aiter(response.streaming_content)
+        self.assertEqual(await anext(events), b"retry: 1000\n\n")
+        event = (await anext(events)).decode()
+        self.assertRegex(event, r"^id: \d+\n")
+        self.assertTrue(
+            event.endswith(f"data: {json.dumps({str(item.pk): ITEM_CREATED})}\n\n")
+        )
+        await events.aclose()
+
+
+class DateRolloverTests(TestCase):
+    def setUp(self):
+        self.today = date(2026, 3, 10)
+        self.root = ToDoItem.objects.create(
+            title="Root",
+            date_due_depend=USE_TODAYS_DATE,
+            date_start_earliest_depend=USE_TODAYS_DATE,
+        )
+        self.child = self.create_dependent(
+            "Child", "date_due", self.root, "date_due", 3
+        )
+        self.grandchild = self.create_dependent(
+            "Grandchild", "date_start_latest", self.child, "date_due", -1
+        )
+        # The parent field is not set
+        self.create_dependent("Orphan", "date_due", self.root, "date_start_latest", 2)
+
+    def create_dependent(self, title, field, parent, parent_field, shift):
+        return ToDoItem.objects.create(
+            title=title,
+            **{
+                f"{field}_depend": DEPENDENT_ON,
+                f"{field}_depend_id": parent.pk,
+                f"{field}_depend_type": parent_field,
+                f"{field}_depend_shift": shift,
+            },
+        )
+
+    def get_dates(self):
+        return {
+            item["title"]: item
+            for item in ToDoItem.objects.values("title", *DATE_FIELDS)
+        }
+
+    def update_per_item(self, today):
+        """The update of one item per query replaced by update_all_dependent_dates"""
+
+        dependency_chain, _, _ = get_date_dependency_chain()
+        for item_id, fields in dependency_chain[USE_TODAYS_DATE].items():
+            ToDoItem.objects.filter(pk=item_id).update(
+                **{field: today for field in fields}
+            )
+        for row in dependency_chain[DEPENDENT_ON]:
+            if (ToDoItem.objects.filter(pk=row["from_id"]).exists()) and (
+                from_date := getattr(
+                    ToDoItem.objects.get(pk=row["from_id"]), row["from_field"]
+                )
+            ):
+                new_date = from_date + timedelta(days=row["shift_by"])
+            else:
+                new_date = date(1, 1, 1)
+            ToDoItem.objects.filter(pk=row["id"]).update(**{row["field"]: new_date})
+
+    def test_dates_match_the_update_per_item(self):
+        initial_dates = self.get_dates()
+        self.update_per_item(self.today)
+        expected_dates = self.get_dates()
+        self.assertEqual(
+            expected_dates["Grandchild"]["date_start_latest"], date(2026, 3, 12)
+        )
+
+        for title, dates in initial_dates.items():
+            ToDoItem.objects.filter(title=title).update(**dates)
+        self.assertEqual(update_all_dependent_dates(today=self.today), 4)
+        self.assertEqual(self.get_dates(), expected_dates)
+
+        # Nothing changed on the same day
+        self.assertEqual(update_all_dependent_dates(today=self.today), 0)
+
+    def test_items_deleted_during_the_update(self):
+        def get_chain_and_delete_child(*args, **kwargs):
+            chain = get_date_dependency_chain(*args, **kwargs)
+            ToDoItem.objects.filter(pk=self.child.pk).delete()
+            return chain
+
+        with mock.patch(
+            "taskmanager_app.dependency_graph.get_date_dependency_chain",
+            get_chain_and_delete_child,
+        ):
+            update_all_dependent_dates(today=self.today)
+
+        dates = self.get_dates()
+        self.assertNotIn("Child", dates)
+        self.assertEqual(dates["Root"]["date_due"], self.today)
+        self.assertEqual(dates["Grandchild"]["date_start_latest"], date(1, 1, 1))
+
+    @mock.patch.object(rollover, "_last_rollover_date", None)
+    def test_rollover_once_per_day(self):
+        with mock.patch(
+            "taskmanager_app.rollover.update_all_dependent_dates",
+            wraps=update_all_dependent_dates,
+        ) as update:
+            rollover.roll_over_dates_if_stale()
+            rollover.roll_over_dates_if_stale()
+            self.assertEqual(update.call_count, 1)
+
+            # Another process knows the rollover of today from the database
+            rollover._last_rollover_date = None
+            rollover.roll_over_dates_if_stale()
+            self.assertEqual(update.call_count, 1)
+            out = StringIO()
+            call_command("roll_over_dates", stdout=out)
+            self.assertIn("Dates already rolled over", out.getvalue())
+            self.assertEqual(update.call_count, 1)
+
+            # The next day
+            ScheduledTaskRun.objects.update(
+                last_run_date=timezone.now().date() - timedelta(days=1)
+            )
+            rollover._last_rollover_date = None
+            rollover.roll_over_dates_if_stale()
+            self.assertEqual(update.call_count, 2)
+
+        self.assertEqual(
+            ToDoItem.objects.get(pk=self.root.pk).date_due, timezone.now().date()
+        )
+
+
+class CopyItemTests(TestCase):
+    def get_free_copy_title_per_item(self, title):
+        """The title lookup of one query per candidate replaced by get_free_copy_titles"""
+
+        new_title_base = f"COPY OF: {title}"
+        new_title = new_title_base
+        count = 1
+        while ToDoItem.objects.filter(title=new_title).exists():
+            new_title = f"{new_title_base}{count}"
+            count += 1
+        return new_title
+
+    def copy(self, item, **data):
+        response = self.client.post(reverse("item-copy", args=[item.pk]), data)
+        self.assertEqual(response.status_code, 302)
+        return ToDoItem.objects.get(pk=resolve(response.url).kwargs["pk"])
+
+    def test_copy_titles(self):
+        item = ToDoItem.objects.create(title="Task", description="Text")
+        item.tags.add("tag")
+
+        copies = [self.copy(item) for _ in range(3)]
+
+        self.assertEqual(
+            [copy.title for copy in copies],
+            ["COPY OF: Task", "COPY OF: Task1", "COPY OF: Task2"],
+        )
+        self.assertEqual(copies[0].description, "Text")
+        self.assertEqual(list(copies[0].tags.names()), ["tag"])
+
+    def test_copy_titles_match_the_lookup_per_item(self):
+        for title in ("Task", "COPY OF: Task", "COPY OF: Task2", "Other", "Tas"):
+            ToDoItem.objects.create(title=title)
+
+        for title in ("Task", "Other", "Tas", "New"):
+            with self.subTest(title=title):
+                self.assertEqual(
+                    get_free_copy_titles([title]),
+                    [self.get_free_copy_title_per_item(title)],
+                )
+        self.assertEqual(
+            get_free_copy_titles(["Task", "Task", "Other"]),
+            ["COPY OF: Task1", "COPY OF: Task3", "COPY OF: Other"],
+        )
+
+    def test_copy_dependency_subtree(self):
+        external = ToDoItem.objects.create(title="External")
+        root = ToDoItem.objects.create(title="Root")
+        child = ToDoItem.objects.create(
+            title="Child",
+            date_due_depend=DEPENDENT_ON,
+            date_due_depend_id=root.pk,
+            date_due_depend_type="date_due",
+            date_start_earliest_depend=DEPENDENT_ON,
+            date_start_earliest_depend_id=external.pk,
+            date_start_earliest_depend_type="date_due",
+        )
+        ToDoItem.objects.create(
+            title="Grandchild",
+            date_due_depend=DEPENDENT_ON,
+            date_due_depend_id=child.pk,
+            date_due_depend_type="date_due",
+        )
+
+        new_root = self.copy(root, include_dependents="1")
+
+        self.assertEqual(new_root.title, "COPY OF: Root")
+        copies = {
+            item.title: item
+            for item in ToDoItem.objects.filter(title__startswith="COPY")
+        }
+        self.assertEqual(
+            set(copies), {"COPY OF: Root", "COPY OF: Child", "COPY OF: Grandchild"}
+        )
+        new_child = copies["COPY OF: Child"]
+        self.assertEqual(new_child.date_due_depend_id, new_root.pk)
+        self.assertEqual(new_child.date_start_earliest_depend_id, external.pk)
+        self.assertEqual(copies["COPY OF: Grandchild"].date_due_depend_id, new_child.pk)
+        # The originals keep their dependencies
+        child.refresh_from_db()
+        self.assertEqual(child.date_due_depend_id, root.pk)
+
+
+@override_settings(PROFILING_SERVER_TIMING=True)
+class ProfilingTests(TestCase):
+    @override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_SLOW_REQUEST_MS=0)
+    def test_sampled_request(self):
+        ToDoItem.objects.create(title="Item")
+
+        with self.assertLogs("taskmanager_app.profiling", "WARNING") as logs:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse("todo_list_view"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'desc="{len(queries)} queries"', response["Server-Timing"])
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry["view"], "todo_list_view")
+        self.assertEqual(entry["query_count"], len(queries))
+        counts = [query["count"] for query in entry["top_queries_by_count"]]
+        self.assertEqual(counts, sorted(counts, reverse=True))
+        self.assertLessEqual(sum(counts), len(queries))
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_request_not_sampled(self):
+        response = self.client.get(reverse("todo_list_view"))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Server-Timing", response)
+
+
+class MetricsTests(TestCase):
+    def get_sample(self, name: str) -> float:
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response["Content-Type"], PROMETHEUS_CONTENT_TYPE)
+        for line in response.content.decode().splitlines():
+            if line.startswith(f"{name} "):
+                return float(line.rpartition(" ")[2])
+        return 0
+
+    def test_request_metrics(self):
+        requests = 'taskmanager_requests_total{view="health",method="GET",status="200"}'
+        durations = (
+            'taskmanager_request_duration_seconds_count{view="health",method="GET"}'
+        )
+        queries = 'taskmanager_request_queries_bucket{view="health",le="+Inf"}'
+        before = [self.get_sample(name) for name in (requests, durations, queries)]
+
+        self.client.get(reverse("health"))
+        self.client.get(reverse("health"))
+
+        self.assertEqual(
+            [self.get_sample(name) for name in (requests, durations, queries)],
+            [count + 2 for count in before],
+        )
+        self.assertGreater(
+            self.get_sample('taskmanager_db_queries_total{view="health"}'), 0
+        )
+
+    def test_unmatched_requests(self):
+        name = 'taskmanager_requests_total{view="unmatched",method="GET",status="404"}'
+        before = self.get_sample(name)
+        self.client.get("/no-such-page/")
+        self.assertEqual(self.get_sample(name), before + 1)
+
+    def test_metric_format(self):
+        response = self.client.get(reverse("metrics"))
+        lines = response.content.decode().splitlines()
+        self.assertIn("# TYPE taskmanager_requests_total counter", lines)
+        self.assertIn("# TYPE taskmanager_request_duration_seconds histogram", lines)
+        self.assertIn("# TYPE taskmanager_dependency_chain_length gauge", lines)
+        self.assertEqual(escape_label_value('a"b\\c\n'), 'a\\"b\\\\c\\n')
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 404)
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        caches["fragments"].clear()
+        self.addCleanup(caches["fragments"].clear)
+        self.category = MainCategoryItem.objects.create(color="#ff0000")
+        self.category.main_category.add("work")
+        self.item = ToDoItem.objects.create(title="Item")
+        self.item.tags.add("work")
+
+    def get_list(self):
+        with mock.patch.object(rollover, "_last_rollover_date", timezone.now().date()):
+            return self.client.get(reverse("todo_list_view")).content.decode()
+
+    def test_category_version(self):
+        version = get_category_version({"work": "#ff0000", "home": "#0000ff"})
+        self.assertEqual(
+            get_category_version({"home": "#0000ff", "work": "#ff0000"}), version
+        )
+        self.assertNotEqual(
+            get_category_version({"work": "#00ff00", "home": "#0000ff"}), version
+        )
+
+    def test_fragments_are_cached_by_modified_date(self):
+        self.assertIn("Item", self.get_list())
+
+        # Not saved, hence, the modified date is unchanged
+        ToDoItem.objects.filter(pk=self.item.pk).update(title="Renamed")
+        self.assertNotIn("Renamed", self.get_list())
+
+        self.item.refresh_from_db()
+        self.item.save()
+        self.assertIn("Renamed", self.get_list())
+
+    def test_category_change_invalidates_fragments(self):
+        self.assertIn("background-color: #ff0000", self.get_list())
+
+        MainCategoryItem.objects.filter(pk=self.category.pk).update(color="#00ff00")
+
+        content = self.get_list()
+        self.assertIn("background-color: #00ff00", content)
+        self.assertNotIn("background-color: #ff0000", content)
+
+
+class TableExportTests(TestCase):
+    def setUp(self):
+        self.b = ToDoItem.objects.create(title="B", date_due=date(2026, 1, 2))
+        self.b.tags.add("work", "home")
+        self.a = ToDoItem.objects.create(
+            title="A, quoted", completed=True, date_due=date(2026, 1, 1)
+        )
+
+    def export(self, export_format, **params):
+        with mock.patch.object(rollover, "_last_rollover_date", timezone.now().date()):
+            response = self.client.get(
+                reverse("todo_table_view"), {"export": export_format, **params}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["Content-Disposition"],
+            f'attachment; filename="items.{export_format}"',
+        )
+        return b"".join(response.streaming_content)
+
+    def test_csv(self):
+        content = self.export("csv", sort_by="title")
+        self.assertTrue(content.startswith(codecs.BOM_UTF8))
+        self.assertEqual(
+            list(csv.reader(StringIO(content.decode("utf-8-sig")))),
+            [
+                [
+                    "ID",
+                    "Title",
+                    "Tags",
+                    "Completed",
+                    "Start date",
+                    "Latest date",
+                    "Due date",
+                    "Priority",
+                    "Slack",
+                    "Critical",
+                ],
+                [str(self.a.pk), "A, quoted", "", "True", "", "", "2026-01-01", "0.0"]
+                + ["", ""],
+                [
+                    str(self.b.pk),
+                    "B",
+                    "home, work",
+                    "False",
+                    "",
+                    "",
+                    "2026-01-02",
+                    "0.0",
+                ]
+                + ["", ""],
+            ],
+        )
+
+    def test_csv_filtered_and_sorted(self):
+        content = self.export(
+            "csv", sort_by="date_due", sort_order="desc", completed_state="completed"
+        )
+        rows = list(csv.reader(StringIO(content.decode("utf-8-sig"))))
+        self.assertEqual([row[1] for row in rows[1:]], ["A, quoted"])
+
+        content = self.export("csv", sort_by="date_due", sort_order="desc")
+        rows = list(csv.reader(StringIO(content.decode("utf-8-sig"))))
+        self.assertEqual([row[1] for row in rows[1:]], ["B", "A, quoted"])
+
+    def test_xlsx(self):
+        content = self.export("xlsx", sort_by="title")
+        with zipfile.ZipFile(BytesIO(content)) as workbook:
+            self.assertIn("xl/workbook.xml", workbook.namelist())
+            sheet = workbook.read("xl/worksheets/sheet1.xml").decode()
+        self.assertEqual(sheet.count("<row>"), 3)
+        self.assertIn('<t xml:space="preserve">A, quoted</t>', sheet)
+        # Dates are date serial numbers
+        self.assertIn(
+            f'<c s="1"><v>{(date(2026, 1, 1) - date(1899, 12, 30)).days}</v></c>', sheet
+        )
+        self.assertLess(sheet.index("A, quoted"), sheet.index(">B<"))
+
+
+class TableSortingTests(TestCase):
+    def setUp(self):
+        ToDoItem.objects.create(title="B", description="1", sorting_priority=2)
+        ToDoItem.objects.create(title="A", description="2", sorting_priority=1)
+
+    def get_table(self, **params):
+        with mock.patch.object(rollover, "_last_rollover_date", timezone.now().date()):
+            response = self.client.get(reverse("todo_table_view"), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_sort_columns(self):
+        response = self.get_table(sort_by="title", sort_order="desc")
+        self.assertEqual(response.context["sort_by"], "-title")
+        self.assertEqual([item.title for item in response.context["items"]], ["B", "A"])
+
+        response = self.get_table(sort_by="sorting_priority")
+        self.assertEqual(response.context["sort_by"], "sorting_priority")
+        self.assertEqual([item.title for item in response.context["items"]], ["A", "B"])
+
+    def test_unknown_sort_columns_are_ignored(self):
+        for sort_by in ("description", "-title", "title__length", "id); --"):
+            with self.subTest(sort_by=sort_by):
+                response = self.get_table(sort_by=sort_by)
+                self.assertIsNone(response.context["sort_by"])
+                self.assertEqual(
+                    {item.title for item in response.context["items"]}, {"A", "B"}
+                )
+
+
+class ArchiveTests(TestCase):
+    def create_completed(self, title, **fields):
+        item = ToDoItem.objects.create(title=title, completed=True, **fields)
+        ToDoItem.objects.filter(pk=item.pk).update(
+            completed_date=timezone.now() - timedelta(days=100)
+        )
+        return item
+
+    def depend_on(self, title, parent, **fields):
+        return ToDoItem.objects.create(
+            title=title,
+            date_due_depend=DEPENDENT_ON,
+            date_due_depend_id=parent.pk,
+            date_due_depend_type="date_due",
+            **fields,
+        )
+
+    def test_archive_completed_items(self):
+        done = self.create_completed("Done")
+        done.tags.add("work")
+        self.create_completed("Recent")
+        ToDoItem.objects.filter(title="Recent").update(completed_date=timezone.now())
+        # Parent of an active item and its own parent
+        grandparent = self.create_completed("Grandparent")
+        parent = self.create_completed("Parent")
+        ToDoItem.objects.filter(pk=parent.pk).update(
+            date_due_depend=DEPENDENT_ON,
+            date_due_depend_id=grandparent.pk,
+            date_due_depend_type="date_due",
+        )
+        self.depend_on("Active child", parent)
+        # Parent of an archived item
+        archived_parent = self.create_completed("Archived parent")
+        child = self.depend_on("Archived child", archived_parent, completed=True)
+        ToDoItem.objects.filter(pk=child.pk).update(
+            completed_date=timezone.now() - timedelta(days=100)
+        )
+        series = self.create_completed("Series")
+        ToDoItem.objects.filter(pk=series.pk).update(recurrence_rule=RECURRENCE_DAILY)
+        occurrence = self.create_completed("Upcoming occurrence")
+        ToDoItem.objects.filter(pk=occurrence.pk).update(
+            recurrence_date=timezone.now().date() + timedelta(days=1)
+        )
+
+        tag_names = ToDoItem.objects.get(pk=done.pk).tag_names
+        self.assertIn("work", tag_names)
+
+        out = StringIO()
+        call_command("archive_completed_items", days=90, stdout=out)
+
+        self.assertIn("Archived 3 items", out.getvalue())
+        self.assertEqual(
+            set(ArchivedItem.objects.values_list("title", flat=True)),
+            {"Done", "Archived parent", "Archived child"},
+        )
+        self.assertEqual(
+            set(ToDoItem.objects.values_list("title", flat=True)),
+            {
+                "Recent",
+                "Grandparent",
+                "Parent",
+                "Active child",
+                "Series",
+                "Upcoming occurrence",
+            },
+        )
+        self.assertEqual(ArchivedItem.objects.get(pk=done.pk).tag_names, tag_names)
+
+
+class TagNamesTests(TestCase):
+    def setUp(self):
+        self.item = ToDoItem.objects.create(title="Item")
+
+    def get_tag_names(self):
+        return ToDoItem.objects.get(pk=self.item.pk).tag_name_list
+
+    def test_tag_changes(self):
+        self.item.tags.add("work", "home")
+        self.assertEqual(self.get_tag_names(), ["home", "work"])
+        self.assertEqual(self.item.tag_name_list, ["home", "work"])
+
+        self.item.tags.remove("home")
+        self.assertEqual(self.get_tag_names(), ["work"])
+
+        self.item.tags.clear()
+        self.assertEqual(self.get_tag_names(), [])
+        self.assertEqual(ToDoItem.objects.get(pk=self.item.pk).tag_names, "")
+
+    def test_tag_rename_and_delete(self):
+        self.item.tags.add("work", "home")
+        tag = Tag.objects.get(name="work")
+
+        tag.name = "office"
+        tag.save()
+        self.assertEqual(self.get_tag_names(), ["home", "office"])
+
+        tag.delete()
+        self.assertEqual(self.get_tag_names(), ["home"])
+
+    def test_with_tag_name(self):
+        self.item.tags.add("work")
+        ToDoItem.objects.create(title="Other").tags.add("workshop")
+
+        self.assertEqual(
+            list(
+                ToDoItem.objects.with_tag_name("work").values_list("title", flat=True)
+            ),
+            ["Item"],
+        )
+        self.assertEqual(
+            list(
+                ToDoItem.objects.with_tag_name("WORK", ignore_case=True).values_list(
+                    "title", flat=True
+                )
+            ),
+            ["Item"],
+        )
+
+    def test_refresh_tag_names_command(self):
+        # Tag links written without signals
+        TodoItem_tag.objects.create(
+            content_object=self.item, tag=Tag.objects.create(name="work", slug="work")
+        )
+        self.assertEqual(self.get_tag_names(), [])
+
+        out = StringIO()
+        call_command("refresh_tag_names", stdout=out)
+
+        self.assertIn("Refreshed the tag names of 1 items", out.getvalue())
+        self.assertEqual(self.get_tag_names(), ["work"])
+
+
+class MainCategorySlugTests(TestCase):
+    def create_category(self, name, **fields):
+        category = MainCategoryItem.objects.create(**fields)
+        category.main_category.add(name)
+        return category
+
+    def test_name_and_slug(self):
+        category = self.create_category("Work")
+        self.assertEqual((category.name, category.slug), ("Work", "work"))
+        category.refresh_from_db()
+        self.assertEqual((category.name, category.slug), ("Work", "work"))
+        self.assertEqual(category.get_absolute_url(), "/main_category/work/")
+
+        tag = Tag.objects.get(name="Work")
+        tag.name = "Office"
+        tag.save()
+        category.refresh_from_db()
+        self.assertEqual((category.name, category.slug), ("Office", "office"))
+
+        category.main_category.clear()
+        category.refresh_from_db()
+        self.assertEqual((category.name, category.slug), ("", None))
+
+    def test_show_by_slug(self):
+        self.create_category("Work")
+        ToDoItem.objects.create(title="Item").tags.add("Work")
+
+        with mock.patch.object(rollover, "_last_rollover_date", timezone.now().date()):
+            for key in ("work", "WORK"):
+                with self.subTest(key=key):
+                    response = self.client.get(
+                        reverse("main_category-show", args=[key])
+                    )
+                    self.assertContains(response, "Item")
+            response = self.client.get(reverse("main_category-show", args=["home"]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_list_queries_do_not_grow_with_categories(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse("index"))
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        self.create_category("Work")
+        query_count = count_queries()
+        self.create_category("Home")
+        self.create_category("Hobby")
+        self.assertEqual(count_queries(), query_count)
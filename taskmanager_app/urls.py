@@ -1,5 +1,5 @@
 from django.urls import path, include
-from taskmanager_app import views
+from taskmanager_app import api, views
 
 urlpatterns = [
     path("", views.MainCategoryListView.as_view(), name="index"),
@@ -17,6 +17,11 @@ urlpatterns = [
         views.TodoItemEdit.as_view(),
         name="item-edit",
     ),
+    path(
+        "dependency-preview/",
+        views.dependency_preview,
+        name="dependency-preview",
+    ),
     path("item/<str:title>/", views.edit_item_by_title, name="edit-item-by-title"),
     path(
         "item/<int:pk>/delete/",
@@ -24,6 +29,8 @@ urlpatterns = [
         name="item-delete",
     ),
     path("item/<int:pk>/copy/", views.TodoItemCopy.as_view(), name="item-copy"),
+    path("item/<int:pk>/row/", views.item_row, name="item-row"),
+    path("item/<int:pk>/history/", views.item_history, name="item-history"),
     # CRUD patterns for MainCategoryItem
     path(
         "main_category/add/",
@@ -55,7 +62,34 @@ urlpatterns = [
         views.SortingView.as_view(),
         name="sorting_view",
     ),
+    path("schedule/", views.schedule, name="schedule"),
+    path("reorder/", views.reorder, name="reorder"),
+    path("agenda/", views.AgendaView.as_view(), name="agenda_view"),
+    path("agenda/feed/", views.agenda_feed, name="agenda_feed"),
+    path("calendar.ics", views.calendar_feed, name="calendar_feed"),
+    path("changes/poll/", views.item_changes_poll, name="item_changes_poll"),
+    path("changes/events/", views.item_change_events, name="item_change_events"),
     path("autocomplete_titles/", views.autocomplete_titles, name="autocomplete_titles"),
     path("api/uploader/", views.markdown_db_uploader, name="markdown_uploader_page"),
+    # JSON API
+    path("api/items/", api.ApiListView.as_view(resource="item"), name="api-items"),
+    path(
+        "api/items/<int:pk>/",
+        api.ApiDetailView.as_view(resource="item"),
+        name="api-item",
+    ),
+    path(
+        "api/categories/",
+        api.ApiListView.as_view(resource="category"),
+        name="api-categories",
+    ),
+    path(
+        "api/categories/<int:pk>/",
+        api.ApiDetailView.as_view(resource="category"),
+        name="api-category",
+    ),
+    path("api/batch/", api.ApiBatchView.as_view(), name="api-batch"),
+    path("health/", views.health, name="health"),
+    path("metrics", views.metrics, name="metrics"),
     path("taggit/", include("taggit_selectize.urls")),
 ]
@@ -1,4 +1,8 @@
 from collections import defaultdict, deque
+from datetime import timedelta
+from difflib import SequenceMatcher
+
+from .metrics import DEPENDENCY_CYCLE_REJECTIONS
 
 
 def topological_sort(
@@ -39,6 +43,7 @@ def topological_sort(
 
     # Step 4: Check for a cycle (if any in-degree remains non-zero)
     if len(sorted_order) != len(graph):
+        DEPENDENCY_CYCLE_REJECTIONS.inc()
         cyclic_dependencies = [
             dep
             for dep in dependencies
@@ -50,25 +55,7 @@ def topological_sort(
                 for row in cyclic_dependencies
                 if str(item_id) in (row[0].split("@")[0], row[1].split("@")[0])
             ]
-            form.add_error(
-                "date_due_depend_id",
-                "*The following date dependencies will cause recursive errors:",
-            )
-            for row in reversed(item_cyclic_dependencies):
-                child_id = (
-                    "current item"
-                    if row[0].split("@")[0] == str(item_id)
-                    else f"item {row[0].split('@')[0]}"
-                )
-                parent_id = (
-                    "current item"
-                    if row[1].split("@")[0] == str(item_id)
-                    else f"item {row[1].split('@')[0]}"
-                )
-                form.add_error(
-                    "date_due_depend_id",
-                    f"- Field {row[0].split('@')[1].split('date_')[1]} in {child_id} depends on {row[1].split('@')[1].split('date_')[1]} in {parent_id}",
-                )
+            add_cycle_errors(form, reversed(item_cyclic_dependencies), item_id)
             return None, True, form
 
         raise ValueError(
@@ -76,3 +63,135 @@ def topological_sort(
         )
 
     return sorted_order, False, form
+
+
+def add_cycle_errors(form, cyclic_dependencies, item_id: int):
+    """Adds dependencies causing a cycle to the form errors
+    - Input: cyclic_dependencies = [[child, parent], ...] with "id@field" nodes
+    """
+
+    form.add_error(
+        "date_due_depend_id",
+        "*The following date dependencies will cause recursive errors:",
+    )
+    for row in cyclic_dependencies:
+        child_id = (
+            "current item"
+            if row[0].split("@")[0] == str(item_id)
+            else f"item {row[0].split('@')[0]}"
+        )
+        parent_id = (
+            "current item"
+            if row[1].split("@")[0] == str(item_id)
+            else f"item {row[1].split('@')[0]}"
+        )
+        form.add_error(
+            "date_due_depend_id",
+            f"- Field {row[0].split('@')[1].split('date_')[1]} in {child_id} depends on {row[1].split('@')[1].split('date_')[1]} in {parent_id}",
+        )
+
+
+def compute_critical_path(children: dict, root_dates: dict) -> dict:
+    """Computes earliest and latest dates, slack and the critical dates of a dependency graph in O(V+E)
+    - Input: children = {parent: [(child, shift in days), ...]}, root_dates = {root: date or None}
+    - Earliest dates follow the shifts from the roots; latest dates are the latest dates not delaying the last
+      date of the chain (connected dates of a root)
+    - Returns {node: {"earliest": date, "latest": date, "slack": days, "critical": bool, "root": root}}
+    """
+
+    earliest = dict(root_dates)
+    root_of = {root: root for root in root_dates}
+    order = []
+
+    # Forward pass in breadth-first (topological) order
+    queue = deque(root_dates)
+    while queue:
+        node = queue.popleft()
+        order.append(node)
+        for child, shift in children.get(node, ()):
+            if child in earliest:
+                continue
+            earliest[child] = (
+                earliest[node] + timedelta(days=shift or 0) if earliest[node] else None
+            )
+            root_of[child] = root_of[node]
+            queue.append(child)
+
+    finish = {}
+    for node in order:
+        if earliest[node] and (
+            root_of[node] not in finish or earliest[node] > finish[root_of[node]]
+        ):
+            finish[root_of[node]] = earliest[node]
+
+    # Backward pass in reverse topological order
+    latest = {}
+    for node in reversed(order):
+        child_latest = [
+            latest[child] - timedelta(days=shift or 0)
+            for child, shift in children.get(node, ())
+            if latest.get(child)
+        ]
+        if child_latest:
+            # Capped by the chain finish, as negative shifts move children before their parents
+            latest[node] = min(finish[root_of[node]], *child_latest)
+        else:
+            latest[node] = finish.get(root_of[node]) if earliest[node] else None
+
+    schedule = {}
+    for node in order:
+        slack = (
+            (latest[node] - earliest[node]).days
+            if earliest[node] and latest[node]
+            else None
+        )
+        schedule[node] = {
+            "earliest": earliest[node],
+            "latest": latest[node],
+            "slack": slack,
+            "critical": slack == 0,
+            "root": root_of[node],
+        }
+    return schedule
+
+
+def encode_delta(old: str, new: str) -> list:
+    """Returns the line delta turning old into new
+    - [[start, end], "inserted text", ...]: line ranges copied from old and text inserted in between
+    - Common leading and trailing lines are copied without matching, hence, local edits of long texts are cheap
+    """
+
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    prefix = 0
+    limit = min(len(old_lines), len(new_lines))
+    while prefix < limit and old_lines[prefix] == new_lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old_lines[-1 - suffix] == new_lines[-1 - suffix]:
+        suffix += 1
+
+    delta = [[0, prefix]] if prefix else []
+    matcher = SequenceMatcher(
+        None,
+        old_lines[prefix : len(old_lines) - suffix],
+        new_lines[prefix : len(new_lines) - suffix],
+    )
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == "equal":
+            delta.append([prefix + old_start, prefix + old_end])
+        elif tag in ("replace", "insert"):
+            delta.append("".join(new_lines[prefix + new_start : prefix + new_end]))
+    if suffix:
+        delta.append([len(old_lines) - suffix, len(old_lines)])
+    return delta
+
+
+def apply_delta(old: str, delta: list) -> str:
+    """Returns the text the delta (see encode_delta) was encoded for"""
+
+    old_lines = old.splitlines(keepends=True)
+    return "".join(
+        part if isinstance(part, str) else "".join(old_lines[part[0] : part[1]])
+        for part in delta
+    )
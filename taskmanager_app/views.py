@@ -1,35 +1,145 @@
+import asyncio
+import difflib
+import hashlib
 import json
-import time
+import logging
+import os
 import uuid
-from datetime import date, datetime, timedelta
+from datetime import date, timedelta
+from datetime import timezone as dt_timezone
 
 import dropbox
+from asgiref.sync import sync_to_async
 from dropbox import exceptions
 from django.conf import settings
-from django.db.models import Q
-from django.db.models import Case, When, Value, DateField, FloatField, CharField
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, F, Max, Q
+from django.db.models import Case, When, Value, DateField, FloatField, CharField, Func
 from django.db.models.functions import Lower
-from django.http import HttpResponse, JsonResponse
-from django.shortcuts import get_object_or_404, redirect, render
-from django.urls import reverse_lazy
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect, render
+from django.urls import reverse, reverse_lazy
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from django.views.decorators.http import condition, require_POST
 from django.views.generic import (
     CreateView,
     DeleteView,
-    DetailView,
     ListView,
     UpdateView,
     View,
 )
 from martor.utils import LazyEncoder
 
-from .forms import MainCategoryItemEditForm, MainCategoryItemShowForm, ToDoItemForm
-from .models import DEPENDENT_ON, USE_TODAYS_DATE, MainCategoryItem, ToDoItem
-from .utils import topological_sort
+from .archive import search_archived_items
+from .dependency_graph import (
+    get_critical_paths,
+    get_item_schedule,
+    get_schedule,
+    preview_dependent_dates,
+    update_all_dependent_dates,
+)
+from .export import EXPORT_CONTENT_TYPES, export_response
+from .forms import (
+    DependencyPreviewForm,
+    MainCategoryItemEditForm,
+    MainCategoryItemShowForm,
+    ToDoItemForm,
+)
+from .metrics import (
+    DEPENDENCY_CYCLE_REJECTIONS,
+    PROMETHEUS_CONTENT_TYPE,
+    render_metrics,
+)
+from .models import (
+    DATE_FIELDS,
+    DATE_TYPE_CHOICES,
+    DEPENDENT_ON,
+    ITEM_CREATED,
+    ITEM_UPDATED,
+    ItemChange,
+    ItemRevision,
+    MainCategoryItem,
+    ToDoItem,
+    copy_tag_links,
+    get_category_slug,
+    split_tag_names,
+)
+from .ordering import ORDERABLE_MODELS, PriorityGapExhausted, move_row
+from .rollover import aroll_over_dates_if_stale, roll_over_dates_if_stale
+from .routers import read_from_replica
+from .search_indexes import (
+    TRIGRAM,
+    aget_search_features,
+    description_contains,
+    get_search_features,
+)
+from .utils import add_cycle_errors
+
+logger = logging.getLogger(__name__)
 
 MAX_ATTEMPTS = 60
 
+# Short codes of the date fields in the agenda feed
+AGENDA_DATE_TYPES = {
+    "date_start_earliest": "se",
+    "date_start_latest": "sl",
+    "date_due": "dd",
+}
+AGENDA_DEFAULT_DAYS = 31
+AGENDA_MAX_DAYS = 92
+
+# Columns of the table view computed by the scheduling of the dependency chains
+SCHEDULE_COLUMNS = ("slack", "critical")
+
+# Columns of the table view sorted by the database: {sort_by: ordering}
+# - Backed by the (column, id) indexes of ToDoItem, the id breaks ties deterministically (titles are unique)
+# - Other sort_by values than these and SCHEDULE_COLUMNS are ignored
+TABLE_SORT_COLUMNS = {
+    "title": ("title",),
+    "completed": ("completed", "id"),
+    "date_start_earliest": ("date_start_earliest", "id"),
+    "date_start_latest": ("date_start_latest", "id"),
+    "date_due": ("date_due", "id"),
+    "sorting_priority": ("sorting_priority", "id"),
+}
+
+# Columns of the table view export: (header, field), followed by the schedule columns
+TABLE_EXPORT_COLUMNS = (
+    ("ID", "id"),
+    ("Title", "title"),
+    ("Tags", "tag_names"),
+    ("Completed", "completed"),
+    ("Start date", "date_start_earliest"),
+    ("Latest date", "date_start_latest"),
+    ("Due date", "date_due"),
+    ("Priority", "sorting_priority"),
+)
+# Rows loaded per query by exports
+EXPORT_CHUNK_SIZE = 2000
+
+# Change feed: seconds between checks for new changes, max. wait of a long poll and max. duration of an event stream
+CHANGE_FEED_POLL_INTERVAL = 1
+CHANGE_FEED_LONG_POLL_TIMEOUT = 25
+CHANGE_FEED_STREAM_DURATION = 300
+CHANGE_FEED_MAX_CHANGES = 500
+
+# Number of items loaded per query (and per prefetch of their tags) by the async views
+ITEM_CHUNK_SIZE = 2000
+
+COPY_TITLE_PREFIX = "COPY OF: "
+
+# Fields not transferred from the original item when copying
+COPY_EXCLUDED_FIELDS = (
+    "id",
+    "created_date",
+    "modified_date",
+    "title",
+    "completed_date",
+    "recurrence_series",
+    "recurrence_date",
+)
+
 AT_LEAST_ONE_DATE_FIELD = (
     Q(date_start_earliest__isnull=False)
     | Q(date_start_latest__isnull=False)
@@ -55,137 +165,297 @@ def date_is_within_dates(d: date, start_date: date, end_date: date) -> bool:
     return d is not None and start_date <= d <= end_date
 
 
-def update_all_dependent_dates():
-    """Function updates all dates dependent on other dates"""
+def find_dependency_cycle(item_id: int, draft: dict):
+    """Returns the dependencies ([[child, parent], ...] with "id@field" nodes) of a cycle through an item, else None
+    - draft: (form) data of the item, which replaces its saved dependencies
+    - Listed from the dependency on the date of the item back to the dependency of that date (as the errors of
+      the whole-graph check were listed)
+    - A date depends on at most one other date, hence, the ancestors of a date are a single path, which is
+      followed with one primary key lookup per ancestor item
+    """
+
+    depend_fields = [
+        f"{field}_depend{suffix}"
+        for field in DATE_FIELDS
+        for suffix in ("", "_id", "_type")
+    ]
+    items = {item_id: draft}
+
+    def get_parent(node: tuple):
+        node_id, field = node
+        if node_id is None:
+            return None
+        if node_id not in items:
+            items[node_id] = (
+                ToDoItem.objects.filter(pk=node_id).values(*depend_fields).first()
+            )
+        if (item := items[node_id]) is None or item[f"{field}_depend"] != DEPENDENT_ON:
+            return None
+        return item[f"{field}_depend_id"], item[f"{field}_depend_type"]
+
+    for field in DATE_FIELDS:
+        path = [(item_id, field)]
+        visited = {path[0]}
+        while (parent := get_parent(path[-1])) is not None:
+            path.append(parent)
+            if parent == path[0]:
+                return [
+                    [f"{child_id}@{child_field}", f"{parent_id}@{parent_field}"]
+                    for (child_id, child_field), (parent_id, parent_field) in zip(
+                        path, path[1:]
+                    )
+                ][::-1]
+            # A cycle not through this date (found from another date of the item or not caused by it)
+            if parent in visited:
+                break
+            visited.add(parent)
+
+    return None
+
+
+def has_dependency_cycle(form, item_id: int) -> bool:
+    """Checks whether the dependencies selected in the form of an item cause a cycle and adds it to the form errors
+    - Only the ancestors of the selected dates are looked up, independent of the number of items
+    """
+
+    if cycle := find_dependency_cycle(item_id, form.cleaned_data):
+        DEPENDENCY_CYCLE_REJECTIONS.inc()
+        add_cycle_errors(form, cycle, item_id)
+        return True
+    return False
+
 
-    dependency_chain, _, _ = get_date_dependency_chain()
+@require_POST
+def dependency_preview(request):
+    """Function returning the dates of an item and of all items depending on it for the draft values of the item form
+    - Nothing is written: {"item": {field: date}, "changes": [{"id", "title", "field", "old", "new"}]}
+    - POST data: the date fields of the item form and item_id (empty for a new item)
+    """
+
+    try:
+        item_id = int(request.POST["item_id"]) if request.POST.get("item_id") else None
+    except ValueError:
+        return JsonResponse({"errors": {"item_id": ["Must be an integer"]}}, status=400)
+
+    form = DependencyPreviewForm(data=request.POST)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+
+    if item_id is not None and (
+        cycle := find_dependency_cycle(item_id, form.cleaned_data)
+    ):
+        add_cycle_errors(form, cycle, item_id)
+        return JsonResponse({"errors": form.errors}, status=400)
+
+    return JsonResponse(
+        preview_dependent_dates(item_id, form.cleaned_data, timezone.now().date())
+    )
+
+
+@require_POST
+def reorder(request):
+    """Function moving an item or main category between its new neighbours (drag and drop), see move_row
+    - POST data: resource (item or category), id and above_id/below_id, the rows above and below after the drop
+      (empty at the ends of the list)
+    - Returns {"id", "sorting_priority", "rebalanced"}, 400 for unknown rows, 409 if the move has to wait for
+      rebalance_priorities
+    """
 
-    # Update all date dependencies
-    for item_id, fields in dependency_chain[USE_TODAYS_DATE].items():
-        ToDoItem.objects.filter(pk=item_id).update(
-            **{field: timezone.now().date() for field in fields}
+    if (resource := request.POST.get("resource")) not in ORDERABLE_MODELS:
+        return JsonResponse(
+            {
+                "errors": {
+                    "resource": [f"Must be one of: {', '.join(ORDERABLE_MODELS)}"]
+                }
+            },
+            status=400,
+        )
+    try:
+        pk, above_pk, below_pk = (
+            int(request.POST[field]) if request.POST.get(field) else None
+            for field in ("id", "above_id", "below_id")
+        )
+    except ValueError:
+        return JsonResponse(
+            {"errors": {"id": ["Ids must be integers"]}},
+            status=400,
         )
 
-    # DO NOT use bulk_update, as a chain of dependencies will not work correct, hence, the only way is to update one-by-one
-    # To circumvent this problem, and to use bulk_update, the dependency-chain-updated dates shall be calculated beforehand
-    # which could be done either in get_date_dependency_chain or here.
-    for row in dependency_chain[DEPENDENT_ON]:
-        # Item does not exist OR field in item is not set
-        if (ToDoItem.objects.filter(pk=row["from_id"]).exists()) and (
-            from_date := getattr(
-                ToDoItem.objects.get(pk=row["from_id"]), row["from_field"]
-            )
-        ):
-            date = from_date + timedelta(days=row["shift_by"])
-        else:
-            date = datetime(1, 1, 1)
+    try:
+        priority, rebalanced = move_row(resource, pk, above_pk, below_pk)
+    except ORDERABLE_MODELS[resource][0].DoesNotExist as error:
+        return JsonResponse({"errors": {"id": [str(error)]}}, status=400)
+    except PriorityGapExhausted as error:
+        return JsonResponse({"errors": {"id": [str(error)]}}, status=409)
+    return JsonResponse(
+        {"id": pk, "sorting_priority": priority, "rebalanced": rebalanced}
+    )
 
-        ToDoItem.objects.filter(pk=row["id"]).update(**{row["field"]: date})
 
+def schedule(request):
+    """Function returning the schedule of all dates in dependency chains as JSON
+    - dates: earliest and latest date, slack (days) and criticality of every date in a chain
+    - critical_paths: the critical dates of each chain in order of dependency
+    """
 
-def get_date_dependency_chain(
-    return_error_msg: bool = False, form=None, item_id: int = None
-):
-    """Function to create chain of items with dates dependencies"""
+    dates = get_schedule()
+    titles = dict(
+        ToDoItem.objects.filter(pk__in={item_id for item_id, _ in dates}).values_list(
+            "id", "title"
+        )
+    )
+    return JsonResponse(
+        {
+            "dates": [
+                {
+                    "id": item_id,
+                    "title": titles.get(item_id),
+                    "field": field,
+                    **{key: value for key, value in entry.items() if key != "root"},
+                }
+                for (item_id, field), entry in dates.items()
+            ],
+            "critical_paths": [
+                [{"id": item_id, "field": field} for item_id, field in path]
+                for path in get_critical_paths(dates)
+            ],
+        }
+    )
+
+
+def get_free_copy_titles(titles: list) -> list:
+    """Returns a unique "COPY OF: ..." title for each given title using a single query"""
+
+    title_bases = [f"{COPY_TITLE_PREFIX}{title}" for title in titles]
 
-    dependent_items = ToDoItem.objects.filter(
-        Q(date_start_earliest_depend__in=[USE_TODAYS_DATE, DEPENDENT_ON])
-        | Q(date_start_latest_depend__in=[USE_TODAYS_DATE, DEPENDENT_ON])
-        | Q(date_due_depend__in=[USE_TODAYS_DATE, DEPENDENT_ON])
+    # All candidate titles share the common prefix of the bases, hence, one query finds every taken title
+    taken_titles = set(
+        ToDoItem.objects.filter(
+            title__startswith=os.path.commonprefix(title_bases)
+        ).values_list("title", flat=True)
     )
 
-    # Collect items data
-    dependency_data = {USE_TODAYS_DATE: {}, DEPENDENT_ON: []}
-    for item in dependent_items:
-        for field in (
-            "date_start_earliest_depend",
-            "date_start_latest_depend",
-            "date_due_depend",
-        ):
-            if getattr(item, field) == USE_TODAYS_DATE:
-                if item.id not in dependency_data[USE_TODAYS_DATE]:
-                    dependency_data[USE_TODAYS_DATE].update({item.id: []})
-                dependency_data[USE_TODAYS_DATE][item.id].append(
-                    field.replace("_depend", "")
-                )
-            elif getattr(item, field) == DEPENDENT_ON:
-                dependency_data[DEPENDENT_ON].append(
-                    {
-                        "id": item.id,
-                        "field": field.replace("_depend", ""),
-                        "from_field": getattr(item, f"{field}_type"),
-                        "from_id": getattr(item, f"{field}_id"),
-                        "shift_by": getattr(item, f"{field}_shift"),
-                    }
-                )
+    new_titles = []
+    for title_base in title_bases:
+        new_title = title_base
+        count = 1
+        while new_title in taken_titles:
+            new_title = f"{title_base}{count}"
+            count += 1
+        taken_titles.add(new_title)
+        new_titles.append(new_title)
 
-    # If function called from edit item; add the selected form data instead of the saved
-    if return_error_msg and item_id and form and form.changed_data:
-        # Remove current version of item from dependent_items
-        dependent_items = [item for item in dependent_items if item.id != item_id]
+    return new_titles
 
-        # Add new version of item
-        item = form.cleaned_data
 
-        for field in (
-            "date_start_earliest_depend",
-            "date_start_latest_depend",
-            "date_due_depend",
-        ):
-            if item[field] == USE_TODAYS_DATE:
-                if item_id not in dependency_data[USE_TODAYS_DATE]:
-                    dependency_data[USE_TODAYS_DATE].update({item_id: []})
-                dependency_data[USE_TODAYS_DATE][item_id].append(
-                    field.replace("_depend", "")
-                )
-            elif item[field] == DEPENDENT_ON:
-                dependency_data[DEPENDENT_ON].append(
-                    {
-                        "id": item_id,
-                        "field": field.replace("_depend", ""),
-                        "from_field": item[f"{field}_type"],
-                        "from_id": item[f"{field}_id"],
-                        "shift_by": item[f"{field}_shift"],
-                    }
-                )
+def copy_todo_items(original_items: list) -> dict:
+    """Copies items incl. tags and returns a dict mapping original item ids to new item ids
+    - Dependencies between the copied items are remapped to the new items
+    - Dependencies to items outside the copied items are kept as they are
+    """
+
+    copy_fields = [
+        field.attname
+        for field in ToDoItem._meta.concrete_fields
+        if field.name not in COPY_EXCLUDED_FIELDS
+    ]
 
-    # Create unique id-field strings -> dependency_strings = [[child, parent], ...]:
-    dependency_strings = [
-        (
+    with transaction.atomic():
+        # In the transaction of the inserts, so the titles cannot be taken in between (BEGIN IMMEDIATE on SQLite)
+        new_titles = get_free_copy_titles([item.title for item in original_items])
+        new_items = ToDoItem.objects.bulk_create(
             [
-                str(row["id"]) + "@" + row["field"],
-                str(row["from_id"]) + "@" + row["from_field"],
+                ToDoItem(
+                    title=new_title,
+                    **{field: getattr(item, field) for field in copy_fields},
+                )
+                for item, new_title in zip(original_items, new_titles)
             ]
         )
-        for row in dependency_data[DEPENDENT_ON]
-    ]
 
-    # Make a topological sort of dependencies and check chain for recursive dependencies
-    sorted_strings, error_flag, form = topological_sort(
-        dependencies=dependency_strings,
-        return_error_msg=return_error_msg,
-        form=form,
-        item_id=item_id,
-    )
+        # Backends not returning primary keys from bulk inserts: look up the new items by their unique titles
+        if any(item.pk is None for item in new_items):
+            new_ids = dict(
+                ToDoItem.objects.filter(title__in=new_titles).values_list("title", "id")
+            )
+            for item in new_items:
+                item.pk = new_ids[item.title]
+
+        id_map = {
+            original_item.pk: new_item.pk
+            for original_item, new_item in zip(original_items, new_items)
+        }
 
-    if error_flag:
-        return None, error_flag, form
+        # Point dependencies within the copied items to the new items
+        remapped_items = []
+        for new_item in new_items:
+            remapped = False
+            for field in DATE_FIELDS:
+                depend_id = getattr(new_item, f"{field}_depend_id")
+                if (
+                    getattr(new_item, f"{field}_depend") == DEPENDENT_ON
+                    and depend_id in id_map
+                ):
+                    setattr(new_item, f"{field}_depend_id", id_map[depend_id])
+                    remapped = True
+            if remapped:
+                remapped_items.append(new_item)
+
+        if remapped_items:
+            ToDoItem.objects.bulk_update(
+                remapped_items, [f"{field}_depend_id" for field in DATE_FIELDS]
+            )
+
+        copy_tag_links(id_map)
+        ItemChange.objects.record(id_map.values(), ITEM_CREATED)
+
+    return id_map
 
-    # Sort dependency chain
-    dependency_data[DEPENDENT_ON] = sorted(
-        dependency_data[DEPENDENT_ON],
-        key=lambda d: sorted_strings.index(str(d["id"]) + "@" + d["field"]),
-    )
 
-    return dependency_data, False, form
+def copy_dependency_subtree(root_item) -> dict:
+    """Copies an item together with all items depending (directly or indirectly) on it"""
 
+    subtree_items = [root_item]
+    subtree_ids = {root_item.pk}
+    frontier = [root_item.pk]
 
-def autocomplete_titles(request):
+    # Collect the dependent items one dependency level at a time
+    while frontier:
+        children = ToDoItem.objects.filter(
+            Q(
+                date_start_earliest_depend=DEPENDENT_ON,
+                date_start_earliest_depend_id__in=frontier,
+            )
+            | Q(
+                date_start_latest_depend=DEPENDENT_ON,
+                date_start_latest_depend_id__in=frontier,
+            )
+            | Q(date_due_depend=DEPENDENT_ON, date_due_depend_id__in=frontier)
+        ).exclude(pk__in=subtree_ids)
+
+        frontier = []
+        for child in children:
+            subtree_items.append(child)
+            subtree_ids.add(child.pk)
+            frontier.append(child.pk)
+
+    return copy_todo_items(subtree_items)
+
+
+@read_from_replica
+async def autocomplete_titles(request):
     """Function to return list of autocomplete titles when user typing item title"""
     if "term" in request.GET:
         term = request.GET["term"]
         items = ToDoItem.objects.filter(Q(title__icontains=term))
-        titles = [item.title for item in items]
+
+        # Best matches first if the title is trigram indexed
+        if TRIGRAM in await aget_search_features(items.db):
+            items = items.annotate(
+                similarity=Func(F("title"), Value(term), function="similarity")
+            ).order_by("-similarity", "title")
+
+        titles = [title async for title in items.values_list("title", flat=True)]
         return JsonResponse(titles, safe=False)
     return JsonResponse([], safe=False)
 
@@ -248,7 +518,7 @@ def sort_by_date_state_filter(sort_by_date_state: str, data_set: any):
     return data_set.all()
 
 
-def get_sorted_grouped_todo_items(
+async def aget_sorted_grouped_todo_items(
     filtered_items,
     main_tag: str,
     sub_category_tags: list,
@@ -259,23 +529,28 @@ def get_sorted_grouped_todo_items(
     """Returns a dict containing sub-categories as keys and todo items as values"""
 
     # Organize related ToDoItems by sub_category_tags and excluded_tags
-    related_todo_items = filtered_items.filter(tags__name=main_tag).order_by(
+    related_todo_items = filtered_items.with_tag_name(main_tag).order_by(
         "-sorting_priority", "title"
     )
     related_todo_items = completed_state_filter(completed_state, related_todo_items)
     related_todo_items = dates_state_filter(dates_state, related_todo_items)
+    sub_category_tags = {tag.name: tag for tag in sub_category_tags}
+    excluded_tag_names = {tag.name for tag in excluded_tags}
     grouped_todo_items = {}
     items_without_sub_tags = []
-    for item in related_todo_items:
-        item_tags_all = item.tags.all()
-        if any(tag in excluded_tags for tag in item_tags_all):
+    async for item in related_todo_items.aiterator(chunk_size=ITEM_CHUNK_SIZE):
+        item_tag_names = item.tag_name_list
+        # with_tag_name is case-insensitive on some backends
+        if main_tag not in item_tag_names:
+            continue
+        if any(name in excluded_tag_names for name in item_tag_names):
             continue
 
-        if not any(tag in sub_category_tags for tag in item_tags_all):
+        if not any(name in sub_category_tags for name in item_tag_names):
             items_without_sub_tags.append(item)
         else:
-            for tag in item_tags_all:
-                if tag in sub_category_tags:
+            for name in item_tag_names:
+                if (tag := sub_category_tags.get(name)) is not None:
                     if tag not in grouped_todo_items:
                         grouped_todo_items[tag] = []
                     grouped_todo_items[tag].append(item)
@@ -290,6 +565,96 @@ def get_sorted_grouped_todo_items(
     return sorted_grouped_todo_items
 
 
+def get_main_categories() -> dict:
+    """Returns a dict of main category names and their colors"""
+    return dict(MainCategoryItem.objects.values_list("name", "color"))
+
+
+async def aget_main_categories() -> dict:
+    """Async version of get_main_categories"""
+    return {
+        name: color
+        async for name, color in MainCategoryItem.objects.values_list("name", "color")
+    }
+
+
+def get_category_version(main_categories: dict) -> str:
+    """Returns the version of the main categories and their colors
+    - Part of the cache key of the item fragments, which show main categories as links and colored bars
+    """
+    return hashlib.md5(json.dumps(main_categories, sort_keys=True).encode()).hexdigest()
+
+
+async def aget_items(queryset) -> list:
+    """Loads the items of a queryset without blocking the event loop"""
+    return [item async for item in queryset.aiterator(chunk_size=ITEM_CHUNK_SIZE)]
+
+
+def group_items_by_date(items, today: date) -> dict:
+    """Returns the items grouped by their earliest relevant date"""
+
+    items_grouped_by_date = {
+        "Past": [],
+        "Today": [],
+        "Within 7 days": [],
+        "Within 30 days": [],
+        "Later": [],
+    }
+    for item in items:
+        if (
+            date_is_past(item.date_start_earliest, today)
+            or date_is_past(item.date_start_latest, today)
+            or date_is_past(item.date_due, today)
+        ):
+            items_grouped_by_date["Past"].append(item)
+        elif (
+            date_is_today(item.date_start_earliest, today)
+            or date_is_today(item.date_start_latest, today)
+            or date_is_today(item.date_due, today)
+        ):
+            items_grouped_by_date["Today"].append(item)
+        elif (
+            date_is_within_dates(
+                item.date_start_earliest,
+                start_date=today + timedelta(days=1),
+                end_date=today + timedelta(days=7),
+            )
+            or date_is_within_dates(
+                item.date_start_latest,
+                start_date=today + timedelta(days=1),
+                end_date=today + timedelta(days=7),
+            )
+            or date_is_within_dates(
+                item.date_due,
+                start_date=today + timedelta(days=1),
+                end_date=today + timedelta(days=7),
+            )
+        ):
+            items_grouped_by_date["Within 7 days"].append(item)
+        elif (
+            date_is_within_dates(
+                item.date_start_earliest,
+                start_date=today + timedelta(days=8),
+                end_date=today + timedelta(days=30),
+            )
+            or date_is_within_dates(
+                item.date_start_latest,
+                start_date=today + timedelta(days=8),
+                end_date=today + timedelta(days=30),
+            )
+            or date_is_within_dates(
+                item.date_due,
+                start_date=today + timedelta(days=8),
+                end_date=today + timedelta(days=30),
+            )
+        ):
+            items_grouped_by_date["Within 30 days"].append(item)
+        else:
+            items_grouped_by_date["Later"].append(item)
+
+    return items_grouped_by_date
+
+
 def filter_item_lists_by_query(query: str, todoitems):
     """Filters a todoitems list by a given query"""
 
@@ -297,77 +662,92 @@ def filter_item_lists_by_query(query: str, todoitems):
     query_words = query.split() if query else [""]
 
     # Filter cases that include all the words in title, description, or tags
-    results = todoitems.filter(
-        Q(title__icontains=query_words[0])
-        | Q(description__icontains=query_words[0])
-        | Q(tags__name__icontains=query_words[0])
-    ).distinct()
-
-    for word in query_words[1:]:
+    # (on PostgreSQL backed by trigram and full-text indexes, see search_indexes)
+    # Tags are matched in the denormalized tag names, hence, no join and no duplicate rows
+    results = todoitems
+    for word in query_words:
         results = results.filter(
             Q(title__icontains=word)
-            | Q(description__icontains=word)
-            | Q(tags__name__icontains=word)
-        ).distinct()
+            | description_contains(word, using=todoitems.db)
+            | Q(tag_names__icontains=word)
+        )
 
     return results
 
 
-class SearchResultsView(ListView):
+class AsyncTemplateView(View):
+    """Base view building its context with the async ORM
+    - One worker serves many concurrent requests, as waiting for the database does not block it
+    - The template is rendered in a thread, as template tags may still query the database
+    """
+
+    template_name = None
+
+    async def get(self, request, *args, **kwargs):
+        # Look up the search features outside of the sync query building
+        await aget_search_features(self.model.objects.db)
+
+        context = await self.get_context_data(**kwargs)
+        return await sync_to_async(render)(request, self.template_name, context)
+
+    async def get_context_data(self, **kwargs):
+        return {"view": self, **kwargs}
+
+
+@read_from_replica
+class SearchResultsView(AsyncTemplateView):
     """View class for search results"""
 
     model = ToDoItem
     template_name = "taskmanager_app/search_results.html"
 
-    def get_queryset(self):
-        # Update all dependent dates in items
-        update_all_dependent_dates()
+    async def get_context_data(self, **kwargs):
+        context = await super().get_context_data(**kwargs)
+
+        # Catch up on a missed daily date rollover
+        await aroll_over_dates_if_stale()
 
         query = self.request.GET.get("query")
         completed_state = self.request.GET.get("completed_state")
         dates_state = self.request.GET.get("dates_state")
 
-        results = filter_item_lists_by_query(
-            query, self.model.objects.prefetch_related("tags")
-        )
+        results = filter_item_lists_by_query(query, self.model.objects.all())
 
         results = dates_state_filter(dates_state, results)
-        return completed_state_filter(completed_state, results)
+        context["object_list"] = await aget_items(
+            completed_state_filter(completed_state, results)
+        )
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data()
-        context["main_categories"] = {
-            key: value
-            for key, value in zip(
-                MainCategoryItem.objects.values_list("main_category__name", flat=True),
-                MainCategoryItem.objects.values_list("color", flat=True),
-            )
-        }
+        # Archived items (all completed) are searched on demand only
+        context["include_archive"] = bool(self.request.GET.get("include_archive"))
+        if context["include_archive"] and completed_state != "not_completed":
+            context["archived_items"] = [
+                item async for item in search_archived_items(query)
+            ]
+
+        context["main_categories"] = await aget_main_categories()
+        context["category_version"] = get_category_version(context["main_categories"])
         return context
 
 
-class SortingView(ListView):
+@read_from_replica
+class SortingView(AsyncTemplateView):
     model = ToDoItem
     template_name = "taskmanager_app/sorting_view.html"
 
-    def get_context_data(self, **kwargs):
+    async def get_context_data(self, **kwargs):
         today = timezone.now().date()
 
-        context = super().get_context_data()
+        context = await super().get_context_data(**kwargs)
 
         context["today"] = today
         context["one_week_from_now"] = context["today"] + timedelta(days=7)
 
-        context["main_categories"] = {
-            key: value
-            for key, value in zip(
-                MainCategoryItem.objects.values_list("main_category__name", flat=True),
-                MainCategoryItem.objects.values_list("color", flat=True),
-            )
-        }
+        context["main_categories"] = await aget_main_categories()
+        context["category_version"] = get_category_version(context["main_categories"])
 
-        # Update all dependent dates in items
-        update_all_dependent_dates()
+        # Catch up on a missed daily date rollover
+        await aroll_over_dates_if_stale()
 
         completed_state = self.request.GET.get("completed_state")
         sort_by_date_state = self.request.GET.get("sort_by_date_state")
@@ -375,7 +755,7 @@ class SortingView(ListView):
 
         # Filter all todo items
         filtered_items = filter_item_lists_by_query(
-            filter_item_list, self.model.objects.prefetch_related("tags")
+            filter_item_list, self.model.objects.all()
         )
 
         queryset = filtered_items.filter(AT_LEAST_ONE_DATE_FIELD).order_by(
@@ -416,77 +796,436 @@ class SortingView(ListView):
         queryset = completed_state_filter(completed_state, queryset)
 
         # Group by date
-        items_grouped_by_date = {
-            "Past": [],
-            "Today": [],
-            "Within 7 days": [],
-            "Within 30 days": [],
-            "Later": [],
-        }
-        for item in queryset:
-            if (
-                date_is_past(item.date_start_earliest, today)
-                or date_is_past(item.date_start_latest, today)
-                or date_is_past(item.date_due, today)
-            ):
-                items_grouped_by_date["Past"].append(item)
-            elif (
-                date_is_today(item.date_start_earliest, today)
-                or date_is_today(item.date_start_latest, today)
-                or date_is_today(item.date_due, today)
-            ):
-                items_grouped_by_date["Today"].append(item)
-            elif (
-                date_is_within_dates(
-                    item.date_start_earliest,
-                    start_date=today + timedelta(days=1),
-                    end_date=today + timedelta(days=7),
-                )
-                or date_is_within_dates(
-                    item.date_start_latest,
-                    start_date=today + timedelta(days=1),
-                    end_date=today + timedelta(days=7),
-                )
-                or date_is_within_dates(
-                    item.date_due,
-                    start_date=today + timedelta(days=1),
-                    end_date=today + timedelta(days=7),
-                )
-            ):
-                items_grouped_by_date["Within 7 days"].append(item)
-            elif (
-                date_is_within_dates(
-                    item.date_start_earliest,
-                    start_date=today + timedelta(days=8),
-                    end_date=today + timedelta(days=30),
-                )
-                or date_is_within_dates(
-                    item.date_start_latest,
-                    start_date=today + timedelta(days=8),
-                    end_date=today + timedelta(days=30),
-                )
-                or date_is_within_dates(
-                    item.date_due,
-                    start_date=today + timedelta(days=8),
-                    end_date=today + timedelta(days=30),
-                )
-            ):
-                items_grouped_by_date["Within 30 days"].append(item)
-            else:
-                items_grouped_by_date["Later"].append(item)
+        items_grouped_by_date = group_items_by_date(await aget_items(queryset), today)
 
         context["items_grouped_by_date"] = items_grouped_by_date
 
         return context
 
 
+def get_agenda_entries(start_date: date, end_date: date, items=None):
+    """Returns all item dates within [start_date, end_date] ordered by date
+    - Each date field is queried by its own range query (using the index of the field) and the results are unioned
+    """
+
+    items = ToDoItem.objects.all() if items is None else items
+    date_branches = [
+        items.filter(**{f"{field}__range": (start_date, end_date)})
+        .annotate(
+            entry_date=F(field),
+            date_type=Value(AGENDA_DATE_TYPES[field], output_field=CharField()),
+        )
+        .values_list("entry_date", "date_type", "id", "title", "completed")
+        .order_by()
+        for field in DATE_FIELDS
+    ]
+    return (
+        date_branches[0]
+        .union(*date_branches[1:], all=True)
+        .order_by("entry_date", "id")
+    )
+
+
+def add_days(day: date, days: int) -> date:
+    """Returns the day shifted by the days, clamped to the last representable date"""
+    try:
+        return day + timedelta(days=days)
+    except OverflowError:
+        return date.max
+
+
+def agenda_feed(request):
+    """Function to return the item dates of a window of days as compact JSON
+    - The response contains the start of the next window for fetching incrementally (null after date.max)
+    """
+    try:
+        start_date = (
+            date.fromisoformat(request.GET["start"])
+            if "start" in request.GET
+            else timezone.now().date()
+        )
+        end_date = (
+            date.fromisoformat(request.GET["end"])
+            if "end" in request.GET
+            else add_days(start_date, AGENDA_DEFAULT_DAYS - 1)
+        )
+    except ValueError:
+        return JsonResponse({"error": "Dates must be given as YYYY-MM-DD"}, status=400)
+
+    # Limit the window to keep responses small, the client continues from next_start
+    end_date = min(end_date, add_days(start_date, AGENDA_MAX_DAYS - 1))
+    if end_date < start_date:
+        return JsonResponse({"error": "End date is before start date"}, status=400)
+
+    # Catch up on a missed daily date rollover
+    roll_over_dates_if_stale()
+
+    items = completed_state_filter(
+        request.GET.get("completed_state"), ToDoItem.objects.all()
+    )
+    entries = [
+        [entry_date.isoformat(), date_type, item_id, title, completed]
+        for entry_date, date_type, item_id, title, completed in get_agenda_entries(
+            start_date, end_date, items
+        )
+    ]
+
+    return JsonResponse(
+        {
+            "start": start_date.isoformat(),
+            "end": end_date.isoformat(),
+            "next_start": (
+                add_days(end_date, 1).isoformat() if end_date < date.max else None
+            ),
+            "fields": ["date", "type", "id", "title", "completed"],
+            "entries": entries,
+        },
+        json_dumps_params={"separators": (",", ":")},
+    )
+
+
+class AgendaView(View):
+    template_name = "taskmanager_app/agenda_view.html"
+
+    def get(self, request):
+        return render(
+            request,
+            self.template_name,
+            {"date_types": dict(DATE_TYPE_CHOICES), "today": timezone.now().date()},
+        )
+
+
+def get_calendar_feed_items(request):
+    """Returns the items of the calendar feed filtered by main category and completed state"""
+
+    items = ToDoItem.objects.filter(AT_LEAST_ONE_DATE_FIELD)
+    if main_category := request.GET.get("category"):
+        items = items.with_tag_name(main_category, ignore_case=True)
+    return completed_state_filter(request.GET.get("completed_state"), items)
+
+
+def get_calendar_feed_etag(request):
+    """Returns an ETag changing whenever an item of the feed is added, changed or removed"""
+
+    # Catch up on a missed daily date rollover, the ETag is computed before the feed
+    roll_over_dates_if_stale()
+
+    feed_state = get_calendar_feed_items(request).aggregate(
+        count=Count("id", distinct=True), last_modified=Max("modified_date")
+    )
+    return hashlib.md5(
+        f"{request.GET.urlencode()}|{feed_state['count']}|{feed_state['last_modified']}".encode()
+    ).hexdigest()
+
+
+def escape_ics_text(text: str) -> str:
+    """Escapes a TEXT value (RFC 5545), line breaks become \\n as carriage returns are not allowed"""
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\r", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold_ics_line(line: str) -> str:
+    """Folds a content line into lines of at most 75 octets (RFC 5545)"""
+
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + "\r\n"
+
+    lines = []
+    while encoded:
+        # Do not split multi-byte characters
+        cut = min(len(encoded), 75 if not lines else 74)
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        lines.append(encoded[:cut].decode())
+        encoded = encoded[cut:]
+    return "\r\n ".join(lines) + "\r\n"
+
+
+@condition(etag_func=get_calendar_feed_etag)
+def calendar_feed(request):
+    """Function to stream the item dates as an iCalendar feed
+    - Rows are streamed from the database without creating model instances or rendering descriptions
+    - Clients polling with If-None-Match get a 304 as long as nothing changed
+    """
+
+    date_labels = dict(DATE_TYPE_CHOICES)
+    items = (
+        get_calendar_feed_items(request)
+        .values_list("id", "title", "modified_date", *DATE_FIELDS)
+        .order_by("id")
+        .distinct()
+    )
+
+    def ics_lines():
+        yield "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//taskmanager//EN\r\n"
+        yield "CALSCALE:GREGORIAN\r\nX-WR-CALNAME:Task manager\r\n"
+        for item_id, title, modified_date, *dates in items.iterator(chunk_size=500):
+            dtstamp = modified_date.astimezone(dt_timezone.utc).strftime(
+                "%Y%m%dT%H%M%SZ"
+            )
+            item_url = request.build_absolute_uri(reverse("item-edit", args=[item_id]))
+            for field, item_date in zip(DATE_FIELDS, dates):
+                # Skip unset dates and dates of broken dependencies
+                if item_date is None or item_date.year == 1:
+                    continue
+                yield (
+                    "BEGIN:VEVENT\r\n"
+                    f"UID:{item_id}-{field}@taskmanager\r\n"
+                    f"DTSTAMP:{dtstamp}\r\n"
+                    f"DTSTART;VALUE=DATE:{item_date.strftime('%Y%m%d')}\r\n"
+                    + fold_ics_line(
+                        f"SUMMARY:{escape_ics_text(f'{date_labels[field]}: {title}')}"
+                    )
+                    + fold_ics_line(f"URL:{item_url}")
+                    + "END:VEVENT\r\n"
+                )
+        yield "END:VCALENDAR\r\n"
+
+    response = StreamingHttpResponse(ics_lines(), content_type="text/calendar")
+    response["Content-Disposition"] = 'inline; filename="taskmanager.ics"'
+    return response
+
+
+async def get_item_changes(since_id: int = None) -> dict:
+    """Returns the item changes after since_id, one per item
+    - Without since_id, only the id of the last change is returned (the start of a feed)
+    - reset is set if changes after since_id have already been trimmed
+    """
+
+    if since_id is None:
+        last_id = (await ItemChange.objects.aaggregate(last_id=Max("id")))["last_id"]
+        return {"last_id": last_id or 0, "changes": {}, "reset": False}
+
+    rows = [
+        row
+        async for row in ItemChange.objects.filter(id__gt=since_id)
+        .order_by("id")
+        .values_list("id", "item_id", "action")[:CHANGE_FEED_MAX_CHANGES]
+    ]
+    if not rows:
+        return {"last_id": since_id, "changes": {}, "reset": False}
+
+    # A gap after since_id up to the oldest remaining change means changes have been trimmed
+    if rows[0][0] > since_id + 1:
+        oldest_id = (
+            await ItemChange.objects.order_by("id")
+            .values_list("id", flat=True)
+            .afirst()
+        )
+        if oldest_id == rows[0][0]:
+            return {"last_id": rows[-1][0], "changes": {}, "reset": True}
+
+    # Merge the changes per item: a new item stays new until it is deleted
+    changes = {}
+    for _change_id, item_id, action in rows:
+        if action != ITEM_UPDATED or item_id not in changes:
+            changes[item_id] = action
+    return {"last_id": rows[-1][0], "changes": changes, "reset": False}
+
+
+def get_change_feed_since_id(request):
+    """Returns the id the feed continues after (Last-Event-ID of a reconnecting event stream or ?since=)"""
+
+    since = request.headers.get("Last-Event-ID") or request.GET.get("since")
+    if since in (None, ""):
+        return None
+    since_id = int(since)
+    if since_id < 0:
+        raise ValueError(since)
+    return since_id
+
+
+async def item_changes_poll(request):
+    """Long poll of the change feed: answers as soon as items changed after ?since=, else after a timeout"""
+
+    try:
+        since_id = get_change_feed_since_id(request)
+    except ValueError:
+        return JsonResponse({"error": "since must be a change id"}, status=400)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + CHANGE_FEED_LONG_POLL_TIMEOUT
+    while True:
+        feed = await get_item_changes(since_id)
+        if since_id is None or feed["changes"] or feed["reset"]:
+            break
+        if loop.time() >= deadline:
+            break
+        await asyncio.sleep(CHANGE_FEED_POLL_INTERVAL)
+
+    return JsonResponse(feed)
+
+
+async def item_change_events(request):
+    """Server-sent events of the change feed
+    - One event per check with changes, the event id is the last change id (resumed by EventSource via Last-Event-ID)
+    - Streams are closed after a while and reopened by the client, so no connection is held forever
+    - Requires an ASGI server, as WSGI buffers async streaming responses
+    """
+
+    try:
+        since_id = get_change_feed_since_id(request)
+    except ValueError:
+        return JsonResponse({"error": "since must be a change id"}, status=400)
+
+    async def events():
+        nonlocal since_id
+        loop = asyncio.get_running_loop()
+        end_time = loop.time() + CHANGE_FEED_STREAM_DURATION
+        last_sent = loop.time()
+        yield f"retry: {CHANGE_FEED_POLL_INTERVAL * 1000}\n\n"
+
+        while loop.time() < end_time:
+            feed = await get_item_changes(since_id)
+            if feed["reset"]:
+                yield f"id: {feed['last_id']}\nevent: reset\ndata: {{}}\n\n"
+                return
+            if since_id is None or feed["changes"]:
+                yield f"id: {feed['last_id']}\ndata: {json.dumps(feed['changes'])}\n\n"
+                last_sent = loop.time()
+            elif loop.time() - last_sent >= CHANGE_FEED_LONG_POLL_TIMEOUT:
+                # Comment line keeping proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                last_sent = loop.time()
+            since_id = feed["last_id"]
+            await asyncio.sleep(CHANGE_FEED_POLL_INTERVAL)
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def item_row(request, pk):
+    """Function to render the row of a single item, used to patch changed rows of a page in place
+    - ?layout=sorting renders the row of the sorting view, else the row of the item lists
+    """
+
+    item = get_object_or_404(ToDoItem.objects.all(), pk=pk)
+    today = timezone.now().date()
+    main_categories = get_main_categories()
+    context = {
+        "item": item,
+        "today": today,
+        "one_week_from_now": today + timedelta(days=7),
+        "main_categories": main_categories,
+        "category_version": get_category_version(main_categories),
+    }
+    if request.GET.get("layout") == "sorting":
+        template_name = "taskmanager_app/html_snippets/sorting_item.html"
+    else:
+        template_name = "taskmanager_app/html_snippets/list_item_loop.html"
+    return render(request, template_name, context)
+
+
+def item_history(request, pk):
+    """Function to list the revisions of an item (also of archived and deleted items) and show one version
+    - ?revision=n selects the version, default the last one, and shows its changes to the previous version
+    - POST restores the description of the selected version (a new revision)
+    """
+
+    revisions = list(
+        ItemRevision.objects.filter(item_id=pk)
+        .only("item_id", "number", "snapshot_number", "created_date", "title")
+        .order_by("-number")
+    )
+    if not revisions:
+        raise Http404("No revisions of this item")
+
+    number = request.GET.get("revision", request.POST.get("revision"))
+    selected = next(
+        (revision for revision in revisions if str(revision.number) == number),
+        revisions[0],
+    )
+    description = selected.get_full_description()
+
+    if request.method == "POST":
+        item = get_object_or_404(ToDoItem, pk=pk)
+        item.description = description
+        item.save()
+        return redirect("item-history", pk=pk)
+
+    previous = next(
+        (revision for revision in revisions if revision.number < selected.number),
+        None,
+    )
+    previous_description = previous.get_full_description() if previous else ""
+    context = {
+        "item_id": pk,
+        "item_exists": ToDoItem.objects.filter(pk=pk).exists(),
+        "revisions": revisions,
+        "selected": selected,
+        "description": description,
+        "diff": "".join(
+            difflib.unified_diff(
+                previous_description.splitlines(keepends=True),
+                description.splitlines(keepends=True),
+                fromfile=f"Revision {previous.number}" if previous else "Empty",
+                tofile=f"Revision {selected.number}",
+            )
+        ),
+    }
+    return render(request, "taskmanager_app/item_history.html", context)
+
+
+def health(request):
+    """Function returning the health of the app and the effective database settings as JSON"""
+
+    db_settings = connection.settings_dict
+    data = {
+        "status": "ok",
+        "database": {
+            "vendor": connection.vendor,
+            "conn_max_age": db_settings["CONN_MAX_AGE"],
+            "conn_health_checks": db_settings["CONN_HEALTH_CHECKS"],
+        },
+    }
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                pragmas = {}
+                for name in [*settings.SQLITE_PRAGMAS, "page_size", "page_count"]:
+                    cursor.execute(f"PRAGMA {name}")
+                    # Unknown pragmas return no row
+                    row = cursor.fetchone()
+                    pragmas[name] = row[0] if row else None
+                data["database"]["pragmas"] = pragmas
+                data["database"]["size"] = pragmas["page_size"] * pragmas["page_count"]
+            else:
+                cursor.execute("SELECT 1")
+                data["database"]["search_features"] = sorted(get_search_features())
+    except DatabaseError as error:
+        # Only the type of the error, its message may contain internals of the database
+        data["status"] = "error"
+        data["database"]["error"] = type(error).__name__
+        return JsonResponse(data, status=503)
+
+    return JsonResponse(data)
+
+
+def metrics(request):
+    """Function returning the in-process metrics in the Prometheus text format (METRICS_ENABLED)"""
+
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    return HttpResponse(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@read_from_replica
 class TodoItemListView(ListView):
     model = ToDoItem
     template_name = "taskmanager_app/todo_list_view.html"
 
     def get_queryset(self):
-        # Update all dependent dates in items
-        update_all_dependent_dates()
+        # Catch up on a missed daily date rollover
+        roll_over_dates_if_stale()
 
         completed_state = self.request.GET.get("completed_state")
         dates_state = self.request.GET.get("dates_state")
@@ -494,7 +1233,7 @@ class TodoItemListView(ListView):
 
         # Filter all todo items
         filtered_items = filter_item_lists_by_query(
-            filter_item_list, self.model.objects.prefetch_related("tags")
+            filter_item_list, self.model.objects.all()
         )
 
         filtered_items = dates_state_filter(dates_state, filtered_items)
@@ -502,23 +1241,26 @@ class TodoItemListView(ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data()
-        context["main_categories"] = {
-            key: value
-            for key, value in zip(
-                MainCategoryItem.objects.values_list("main_category__name", flat=True),
-                MainCategoryItem.objects.values_list("color", flat=True),
-            )
-        }
+        context["main_categories"] = get_main_categories()
+        context["category_version"] = get_category_version(context["main_categories"])
         return context
 
 
+def get_table_ordering(sort_by: str, descending: bool = False) -> tuple:
+    """Returns the ordering of a column of TABLE_SORT_COLUMNS, descending incl. the tiebreaker (backward index scan)"""
+    return tuple(
+        f"-{field}" if descending else field for field in TABLE_SORT_COLUMNS[sort_by]
+    )
+
+
+@read_from_replica
 class TodoItemTableView(View):
     model = ToDoItem
     template_name = "taskmanager_app/todo_table_view.html"
 
     def get(self, request):
-        # Update all dependent dates in items
-        update_all_dependent_dates()
+        # Catch up on a missed daily date rollover
+        roll_over_dates_if_stale()
 
         items = self.model.objects.all()
         sort_by = request.GET.get("sort_by")
@@ -527,6 +1269,8 @@ class TodoItemTableView(View):
         filter_tags = request.GET.get("filter_tags")
         completed_state = request.GET.get("completed_state")
         dates_state = request.GET.get("dates_state")
+        if sort_by not in TABLE_SORT_COLUMNS and sort_by not in SCHEDULE_COLUMNS:
+            sort_by = None
 
         items = completed_state_filter(completed_state, items)
         items = dates_state_filter(dates_state, items)
@@ -547,23 +1291,36 @@ class TodoItemTableView(View):
             query_words = filter_tags.split() if filter_tags else [""]
 
             # Filter cases that include all the words in tags
-            items = items.filter(Q(tags__name__icontains=query_words[0])).distinct()
+            items = items.filter(Q(tag_names__icontains=query_words[0]))
             for word in query_words[1:]:
-                items = items.filter(Q(tags__name__icontains=word)).distinct()
+                items = items.filter(Q(tag_names__icontains=word))
 
-        # Handle sorting
+        # Export of the filtered and sorted items (?export=csv or xlsx)
+        if (export_format := request.GET.get("export")) in EXPORT_CONTENT_TYPES:
+            return self.export(items, sort_by, sort_order, export_format)
+
+        # Handle sorting (schedule columns are sorted in Python)
         if sort_by:
+            if sort_by in TABLE_SORT_COLUMNS:
+                items = items.order_by(
+                    *get_table_ordering(sort_by, descending=sort_order == "desc")
+                )
             if sort_order == "desc":
                 sort_by = f"-{sort_by}"
                 sort_order = "asc"
             else:
                 sort_order = "desc"
-            items = items.order_by(sort_by)
         else:
             sort_order = "asc"
 
-        # Replace None values with empty strings
-        items = self.replace_none_with_empty_strings(items)
+        items = self.add_schedule(list(items))
+        if sort_by and (column := sort_by.lstrip("-")) in SCHEDULE_COLUMNS:
+            # Items outside of dependency chains are always last
+            items = sorted(
+                (item for item in items if getattr(item, column) is not None),
+                key=lambda item: getattr(item, column),
+                reverse=sort_by.startswith("-"),
+            ) + [item for item in items if getattr(item, column) is None]
 
         context = {
             "items": items,
@@ -577,13 +1334,64 @@ class TodoItemTableView(View):
         return render(request, self.template_name, context)
 
     @staticmethod
-    def replace_none_with_empty_strings(items):
+    def add_schedule(items: list) -> list:
+        """Adds the least slack (days) of the dates of each item in dependency chains and whether one is critical"""
+
+        item_schedule = get_item_schedule(get_schedule())
         for item in items:
-            for field in item._meta.fields:
-                if getattr(item, field.name) is None:
-                    setattr(item, field.name, "-")
+            item.slack, item.critical = item_schedule.get(item.id, (None, None))
         return items
 
+    @staticmethod
+    def export(items, sort_by: str, sort_order: str, export_format: str):
+        """Streams the items in the order of the table as CSV or XLSX
+        - Rows are read as tuples in chunks, tags are taken from the denormalized tag names of the same rows
+        - Sorted by a schedule column, the items of dependency chains are sorted in Python and followed by all others
+        """
+
+        item_schedule = get_item_schedule(get_schedule())
+        fields = [field for _, field in TABLE_EXPORT_COLUMNS]
+        tags_index = fields.index("tag_names")
+        descending = sort_order == "desc"
+        sorted_by_schedule = sort_by in SCHEDULE_COLUMNS
+        if sort_by in TABLE_SORT_COLUMNS:
+            items = items.order_by(*get_table_ordering(sort_by, descending))
+
+        def item_rows():
+            if sorted_by_schedule:
+                column = SCHEDULE_COLUMNS.index(sort_by)
+                scheduled_ids = sorted(
+                    item_schedule,
+                    key=lambda item_id: item_schedule[item_id][column],
+                    reverse=descending,
+                )
+                for start in range(0, len(scheduled_ids), EXPORT_CHUNK_SIZE):
+                    chunk = scheduled_ids[start : start + EXPORT_CHUNK_SIZE]
+                    rows = {
+                        row[0]: row
+                        for row in items.filter(pk__in=chunk).values_list(*fields)
+                    }
+                    yield from (rows[item_id] for item_id in chunk if item_id in rows)
+
+            for row in items.values_list(*fields).iterator(
+                chunk_size=EXPORT_CHUNK_SIZE
+            ):
+                if not sorted_by_schedule or row[0] not in item_schedule:
+                    yield row
+
+        def export_rows():
+            for row in item_rows():
+                row = list(row)
+                row[tags_index] = ", ".join(split_tag_names(row[tags_index]))
+                yield (*row, *item_schedule.get(row[0], (None, None)))
+
+        return export_response(
+            export_format,
+            [header for header, _ in TABLE_EXPORT_COLUMNS] + ["Slack", "Critical"],
+            export_rows(),
+            "items",
+        )
+
 
 class TodoItemCreate(CreateView):
     model = ToDoItem
@@ -658,10 +1466,7 @@ class TodoItemEdit(UpdateView):
             return self.form_invalid(form)
 
         # Check dependency chain
-        _, error_flag, form = get_date_dependency_chain(
-            return_error_msg=True, form=form, item_id=self.kwargs["pk"]
-        )
-        if error_flag:
+        if has_dependency_cycle(form, self.kwargs["pk"]):
             return self.form_invalid(form)
 
         return super().form_valid(form)
@@ -693,6 +1498,14 @@ class TodoItemDelete(DeleteView):
         context = super().get_context_data(**kwargs)
         return context
 
+    def form_valid(self, form):
+        response = super().form_valid(form)
+
+        # Update all dates dependent on the deleted item
+        update_all_dependent_dates()
+
+        return response
+
     def get_success_url(self):
         return reverse_lazy("index")
 
@@ -703,56 +1516,61 @@ class TodoItemCopy(View):
 
     def post(self, request, *args, **kwargs):
         item_id = self.kwargs["pk"]
-        original_item = self.model.objects.get(pk=item_id)
+        original_item = get_object_or_404(self.model, pk=item_id)
 
-        # Creates new temporary unique title
-        new_title_base = f"COPY OF: {original_item.title}"
-        new_title = new_title_base
-        count = 1
+        if request.POST.get("include_dependents"):
+            id_map = copy_dependency_subtree(original_item)
+        else:
+            id_map = copy_todo_items([original_item])
+
+        # Update all dependent dates in items
+        update_all_dependent_dates()
+
+        return redirect(
+            "item-edit", pk=id_map[original_item.pk]
+        )  # Redirect to the edit page of the new item
 
-        while ToDoItem.objects.filter(title=new_title).exists():
-            new_title = f"{new_title_base}{count}"
-            count += 1
 
-        # Creates new item based on original
-        new_item = ToDoItem.objects.create(
-            title=new_title,
-            description=original_item.description,
-            # tags=original_item.tags.all(),
-            completed=original_item.completed,
-            date_start_earliest=original_item.date_start_earliest,
-            date_start_latest=original_item.date_start_latest,
-            date_due=original_item.date_due,
-            date_start_earliest_depend=original_item.date_start_earliest_depend,
-            date_start_latest_depend=original_item.date_start_latest_depend,
-            date_due_depend=original_item.date_due_depend,
-            date_start_earliest_depend_id=original_item.date_start_earliest_depend_id,
-            date_start_latest_depend_id=original_item.date_start_latest_depend_id,
-            date_due_depend_id=original_item.date_due_depend_id,
-            date_start_earliest_depend_type=original_item.date_start_earliest_depend_type,
-            date_start_latest_depend_type=original_item.date_start_latest_depend_type,
-            date_due_depend_type=original_item.date_due_depend_type,
-            date_start_earliest_depend_shift=original_item.date_start_earliest_depend_shift,
-            date_start_latest_depend_shift=original_item.date_start_latest_depend_shift,
-            date_due_depend_shift=original_item.date_due_depend_shift,
-            sorting_priority=original_item.sorting_priority,
+def main_category_is_valid(form, instance_pk: int = None) -> bool:
+    """Validates the main category of a main category item form, adding errors to the form"""
+
+    main_category = form.cleaned_data["main_category"][0]
+    if len(form.cleaned_data["main_category"]) > 1:
+        form.add_error(
+            "main_category",
+            "*Main category can maximum contain one tag.",
         )
+        return False
 
-        # Copy the tags from the original item to the new item
-        for tag in original_item.tags.all():
-            new_item.tags.add(tag)
+    if main_category.lower() == "other":
+        form.add_error(
+            "main_category",
+            "*Main category is not allowed to be 'Other'. Please select another category.",
+        )
+        return False
 
-        return redirect(
-            "item-edit", pk=new_item.pk
-        )  # Redirect to the edit page of the new item
+    # Case-insensitive, as the lowercased name is the URL of the category
+    if (
+        MainCategoryItem.objects.exclude(pk=instance_pk)
+        .filter(slug=get_category_slug(main_category))
+        .exists()
+    ):
+        form.add_error(
+            "main_category",
+            "*Main category already exists. Please select another category.",
+        )
+        return False
 
+    return True
 
+
+@read_from_replica
 class MainCategoryListView(ListView):
     model = MainCategoryItem
     template_name = "taskmanager_app/maincategory_list_view.html"
 
     def get_queryset(self):
-        return self.model.objects.prefetch_related("main_category").all()
+        return self.model.objects.all()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -771,26 +1589,7 @@ class MainCategoryItemCreate(CreateView):
 
     def form_valid(self, form):
         # Custom validation for unique main_category
-        main_category = form.cleaned_data["main_category"][0]
-        if len(form.cleaned_data["main_category"]) > 1:
-            form.add_error(
-                "main_category",
-                "*Main category can maximum contain one tag.",
-            )
-            return self.form_invalid(form)
-
-        if main_category.lower() == "other":
-            form.add_error(
-                "main_category",
-                "*Main category is not allowed to be 'Other'. Please select another category.",
-            )
-            return self.form_invalid(form)
-
-        if MainCategoryItem.objects.filter(main_category__name=main_category).exists():
-            form.add_error(
-                "main_category",
-                "*Main category already exists. Please select another category.",
-            )
+        if not main_category_is_valid(form):
             return self.form_invalid(form)
         return super().form_valid(form)
 
@@ -804,43 +1603,19 @@ class MainCategoryItemEdit(UpdateView):
     template_name = "taskmanager_app/maincategoryitem_form.html"
 
     def get_object(self):
-        main_category_name = self.kwargs.get("pk", None)
         return get_object_or_404(
-            MainCategoryItem, main_category__name__iexact=main_category_name
+            MainCategoryItem, slug=get_category_slug(self.kwargs.get("pk"))
         )
 
     def get_context_data(self, **kwargs):
         context = super(MainCategoryItemEdit, self).get_context_data(**kwargs)
         context["title"] = "Edit main category item"
-        context["url_id"] = self.object.main_category.first().name
+        context["url_id"] = self.object.name
         return context
 
     def form_valid(self, form):
         # Custom validation for unique main_category
-        main_category = form.cleaned_data["main_category"][0]
-        if len(form.cleaned_data["main_category"]) > 1:
-            form.add_error(
-                "main_category",
-                "*Main category can maximum contain one tag.",
-            )
-            return self.form_invalid(form)
-
-        if main_category.lower() == "other":
-            form.add_error(
-                "main_category",
-                "*Main category is not allowed to be 'Other'. Please select another category.",
-            )
-            return self.form_invalid(form)
-
-        if (
-            MainCategoryItem.objects.exclude(pk=self.object.pk)
-            .filter(main_category__name=main_category)
-            .exists()
-        ):
-            form.add_error(
-                "main_category",
-                "*Main category already exists. Please select another category.",
-            )
+        if not main_category_is_valid(form, instance_pk=self.object.pk):
             return self.form_invalid(form)
         return super().form_valid(form)
 
@@ -861,20 +1636,25 @@ class MainCategoryItemEdit(UpdateView):
         return super().get(request, *args, **kwargs)
 
 
-class MainCategoryItemShow(DetailView):
+@read_from_replica
+class MainCategoryItemShow(AsyncTemplateView):
     model = MainCategoryItem
     form_class = MainCategoryItemShowForm
     template_name = "taskmanager_app/maincategoryitem_show.html"
 
-    def get_object(self):
-        main_category_name = self.kwargs.get("pk", None)
-        return get_object_or_404(
-            MainCategoryItem, main_category__name__iexact=main_category_name
+    async def get_object(self):
+        return await aget_object_or_404(
+            MainCategoryItem.objects.prefetch_related(
+                "sub_categories", "excluded_tags"
+            ),
+            slug=get_category_slug(self.kwargs.get("pk")),
         )
 
-    def get_context_data(self, **kwargs):
-        context = super(MainCategoryItemShow, self).get_context_data(**kwargs)
-        main_tag = self.object.main_category.first().name
+    async def get_context_data(self, **kwargs):
+        context = await super().get_context_data(**kwargs)
+        self.object = await self.get_object()
+        context["object"] = context["maincategoryitem"] = self.object
+        main_tag = self.object.name
         sub_category_tags = sorted(
             self.object.sub_categories.all(), key=lambda x: x.name
         )
@@ -891,19 +1671,22 @@ class MainCategoryItemShow(DetailView):
 
         # Get main category text field from text_field_from_item
         if item_id := self.object.text_field_from_item:
-            if ToDoItem.objects.filter(id=item_id).exists():
-                todo_item = ToDoItem.objects.get(id=item_id)
+            if (
+                todo_item := await ToDoItem.objects.filter(id=item_id)
+                .only("description")
+                .afirst()
+            ) is not None:
                 context["description_field"] = todo_item.description
 
-        # Update all dependent dates in items
-        update_all_dependent_dates()
+        # Catch up on a missed daily date rollover
+        await aroll_over_dates_if_stale()
 
         # Filter all todo items
         filtered_items = filter_item_lists_by_query(
-            filter_item_list, ToDoItem.objects.prefetch_related("tags")
+            filter_item_list, ToDoItem.objects.all()
         )
 
-        sorted_grouped_todo_items = get_sorted_grouped_todo_items(
+        sorted_grouped_todo_items = await aget_sorted_grouped_todo_items(
             filtered_items=filtered_items,
             main_tag=main_tag,
             sub_category_tags=sub_category_tags,
@@ -914,16 +1697,10 @@ class MainCategoryItemShow(DetailView):
 
         context["grouped_todo_items"] = sorted_grouped_todo_items
 
-        main_categories = self.model.objects.values_list(
-            "main_category__name", flat=True
-        )
-        context["main_category_links"] = {item: True for item in main_categories}
-        context["main_categories"] = {
-            key: value
-            for key, value in zip(
-                MainCategoryItem.objects.values_list("main_category__name", flat=True),
-                MainCategoryItem.objects.values_list("color", flat=True),
-            )
+        context["main_categories"] = await aget_main_categories()
+        context["category_version"] = get_category_version(context["main_categories"])
+        context["main_category_links"] = {
+            item: True for item in context["main_categories"]
         }
         return context
 
@@ -935,43 +1712,44 @@ class MainCategoryItemDelete(DeleteView):
     model = MainCategoryItem
 
     def get_object(self):
-        main_category_name = self.kwargs.get("pk", None)
         return get_object_or_404(
-            MainCategoryItem, main_category__name__iexact=main_category_name
+            MainCategoryItem, slug=get_category_slug(self.kwargs.get("pk"))
         )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["title"] = self.object.main_category.first().name
+        context["title"] = self.object.name
         return context
 
     def get_success_url(self):
         return reverse_lazy("index")
 
 
-class MainCategoryItemShowAll(ListView):
+@read_from_replica
+class MainCategoryItemShowAll(AsyncTemplateView):
     model = MainCategoryItem
     form_class = MainCategoryItemShowForm
     template_name = "taskmanager_app/maincategoryitem_show_all.html"
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data()
-        main_categories = self.model.objects.prefetch_related(
-            "main_category", "sub_categories", "excluded_tags"
-        ).all()
-        main_category_names = list(
-            main_categories.values_list("main_category__name", flat=True)
-        )
+    async def get_context_data(self, **kwargs):
+        context = await super().get_context_data(**kwargs)
+        main_categories = [
+            main_category
+            async for main_category in self.model.objects.prefetch_related(
+                "sub_categories", "excluded_tags"
+            ).aiterator(chunk_size=ITEM_CHUNK_SIZE)
+        ]
+        main_category_names = [main_category.name for main_category in main_categories]
         completed_state = self.request.GET.get("completed_state")
         dates_state = self.request.GET.get("dates_state")
         filter_item_list = self.request.GET.get("filter_item_list")
 
-        # Update all dependent dates in items
-        update_all_dependent_dates()
+        # Catch up on a missed daily date rollover
+        await aroll_over_dates_if_stale()
 
         # Filter all todo items
         filtered_items = filter_item_lists_by_query(
-            filter_item_list, ToDoItem.objects.prefetch_related("tags")
+            filter_item_list, ToDoItem.objects.all()
         )
         state_filtered_todo_items = completed_state_filter(
             completed_state,
@@ -997,7 +1775,7 @@ class MainCategoryItemShowAll(ListView):
             )
 
             main_category_links[main_category_name] = True
-            sorted_grouped_todo_items = get_sorted_grouped_todo_items(
+            sorted_grouped_todo_items = await aget_sorted_grouped_todo_items(
                 filtered_items=state_filtered_todo_items,
                 main_tag=main_category_name,
                 sub_category_tags=sub_category_tags,
@@ -1013,8 +1791,8 @@ class MainCategoryItemShowAll(ListView):
 
         # Identify todo items without any main category
         items_without_main_tags = []
-        for item in state_filtered_todo_items:
-            item_tags = [tag.name for tag in item.tags.all()]
+        for item in await aget_items(state_filtered_todo_items):
+            item_tags = item.tag_name_list
             if all(tag not in item_tags for tag in main_category_names):
                 items_without_main_tags.append(item)
         if items_without_main_tags:
@@ -1027,9 +1805,10 @@ class MainCategoryItemShowAll(ListView):
             key: value
             for key, value in zip(
                 main_category_names,
-                MainCategoryItem.objects.values_list("color", flat=True),
+                [main_category.color for main_category in main_categories],
             )
         }
+        context["category_version"] = get_category_version(context["main_categories"])
 
         return context
 
@@ -1037,7 +1816,7 @@ class MainCategoryItemShowAll(ListView):
         return reverse_lazy("index")
 
 
-def markdown_db_uploader(request):
+async def markdown_db_uploader(request):
     """
     Makdown image upload for dropbox storage
     and represent as json to markdown editor.
@@ -1083,16 +1862,20 @@ def markdown_db_uploader(request):
                 app_secret=settings.DROPBOX_APP_SECRET,
                 oauth2_refresh_token=settings.DROPBOX_OAUTH2_REFRESH_TOKEN,
             )
+
+            # Blocking Dropbox calls run in the thread pool, so other requests are served while waiting
             with image.open() as f:
-                dbx.files_upload(f.read(), f"/{img_uuid}")
+                await sync_to_async(dbx.files_upload, thread_sensitive=False)(
+                    f.read(), f"/{img_uuid}"
+                )
 
             # Attemptin to fetch shared_link while waiting for dropbox server image upload
             attempts = 0
             while attempts < MAX_ATTEMPTS:
                 try:
-                    dbx_link = dbx.sharing_create_shared_link(
-                        f"/{img_uuid}", short_url=True
-                    )
+                    dbx_link = await sync_to_async(
+                        dbx.sharing_create_shared_link, thread_sensitive=False
+                    )(f"/{img_uuid}", short_url=True)
                     img_url = (
                         dbx_link.url.replace("?dl=0", "").replace("&dl=0", "") + "&dl=1"
                     )
@@ -1100,8 +1883,8 @@ def markdown_db_uploader(request):
                 except exceptions.ApiError:
                     attempts += 1
                     img_url = "failed_to_fetch_shared_link_to_dropbox"
-                    print("Attempt " + str(attempts) + " to fetch shared link")
-                    time.sleep(1)
+                    logger.info("Attempt %s to fetch shared link", attempts)
+                    await asyncio.sleep(1)
 
             data = json.dumps({"status": 200, "link": img_url, "name": image.name})
             return HttpResponse(data, content_type="application/json")
@@ -13,8 +13,6 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-import queryhunter
-from queryhunter import LoggingOptions
 from django.core.management.utils import get_random_secret_key
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -40,30 +38,39 @@ if not DEBUG:
     SESSION_COOKIE_SECURE = True
     CSRF_COOKIE_SECURE = True
 
-# Queryhunter for profiling query calls
-QUERYHUNTER_BASE_DIR = queryhunter.default_base_dir(__file__)
-QUERYHUNTER_REPORTING_OPTIONS = LoggingOptions(
-    logger_name="queryhunter", sort_by="-count"
+# Request profiling: share of profiled requests, slow request log and Server-Timing header
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0.1"))
+PROFILING_SLOW_REQUEST_MS = int(os.getenv("PROFILING_SLOW_REQUEST_MS", "500"))
+# Log file of slow requests, created on the first slow request
+PROFILING_SLOW_REQUEST_LOG = os.getenv(
+    "PROFILING_SLOW_REQUEST_LOG", str(BASE_DIR / "slow_requests.log")
 )
+PROFILING_TOP_QUERIES = 5
+PROFILING_SERVER_TIMING = os.getenv("PROFILING_SERVER_TIMING", "1") == "1"
+
+# In-process metrics served at /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
     "formatters": {
-        "standard": {"format": "%(asctime)s - %(message)s"},
+        "message": {"format": "%(message)s"},
     },
     "handlers": {
-        "queryhunter_file": {
-            "level": "DEBUG",
+        "slow_requests_file": {
+            "level": "WARNING",
             "class": "logging.FileHandler",
-            "filename": "queryhunter.log",
-            "formatter": "standard",
+            "filename": PROFILING_SLOW_REQUEST_LOG,
+            "delay": True,
+            "formatter": "message",
         },
     },
     "loggers": {
-        QUERYHUNTER_REPORTING_OPTIONS.logger_name: {
-            "handlers": ["queryhunter_file"],
-            "level": "DEBUG",
-            "propagate": True,
+        "taskmanager_app.profiling": {
+            "handlers": ["slow_requests_file"],
+            "level": "WARNING",
+            "propagate": False,
         },
     },
 }
@@ -85,6 +92,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "taskmanager_app.middleware.MetricsMiddleware",
+    "taskmanager_app.middleware.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -92,17 +101,29 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "queryhunter.middleware.QueryHunterMiddleware",
+    "taskmanager_app.middleware.ReplicaRoutingMiddleware",
 ]
 
 ROOT_URLCONF = "taskmanager_project.urls"
 
+# Templates are parsed once per process (cached loader, reset by the autoreloader on changes), see the
+# benchmark_templates command
+TEMPLATE_CACHE = os.getenv("TEMPLATE_CACHE", "1") == "1"
+TEMPLATE_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [],
-        "APP_DIRS": True,
         "OPTIONS": {
+            "loaders": (
+                [("django.template.loaders.cached.Loader", TEMPLATE_LOADERS)]
+                if TEMPLATE_CACHE
+                else TEMPLATE_LOADERS
+            ),
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
@@ -123,11 +144,99 @@ WSGI_APPLICATION = "taskmanager_project.wsgi.application"
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# Database profile from the environment (e.g. .env): "sqlite" (default) or "postgresql"
+DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "sqlite")
+
+if DATABASE_PROFILE == "postgresql":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.getenv("POSTGRES_DB", "taskmanager"),
+            "USER": os.getenv("POSTGRES_USER", "taskmanager"),
+            "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
+            "HOST": os.getenv("POSTGRES_HOST", "localhost"),
+            "PORT": os.getenv("POSTGRES_PORT", "5432"),
+            "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "600")),
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {},
+        }
     }
+
+    # Connection pooling: Django 5.0 has no built-in pool, connections are pooled by PgBouncer in transaction mode
+    # (POSTGRES_PGBOUNCER=1, POSTGRES_HOST/POSTGRES_PORT of PgBouncer), where server-side cursors do not survive
+    # the end of a transaction
+    if os.getenv("POSTGRES_PGBOUNCER", "0") == "1":
+        DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = True
+else:
+    DATABASES = {
+        "default": {
+            # Django's SQLite backend with the transaction_mode option of Django 5.1
+            "ENGINE": "taskmanager_app.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+            # Persistent connections (seconds), default 600; serving with ASGI, set DB_CONN_MAX_AGE=0, as every
+            # async request runs in its own thread and would keep its own connection open
+            "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "600")),
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                # Seconds to wait for a lock before failing with "database is locked"
+                "timeout": 20,
+                # Transactions take the write lock when they start (BEGIN IMMEDIATE), as upgrading a read
+                # transaction fails immediately when the database is locked; empty for a plain BEGIN
+                "transaction_mode": os.getenv("SQLITE_TRANSACTION_MODE", "IMMEDIATE"),
+            },
+        }
+    }
+
+# Optional read replica: POSTGRES_REPLICA_HOST (PostgreSQL) or SQLITE_REPLICA_NAME (SQLite file)
+if DATABASE_PROFILE == "postgresql":
+    REPLICA_OVERRIDES = {"HOST": os.getenv("POSTGRES_REPLICA_HOST")}
+else:
+    REPLICA_OVERRIDES = {"NAME": os.getenv("SQLITE_REPLICA_NAME")}
+
+if all(REPLICA_OVERRIDES.values()):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        **REPLICA_OVERRIDES,
+        "OPTIONS": dict(DATABASES["default"]["OPTIONS"]),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_ROUTERS = ["taskmanager_app.routers.ReplicaRouter"]
+
+# Seconds a client reads from the primary after a write, so the replica can catch up
+REPLICA_STICKY_SECONDS = 10
+
+# SQLite tuning, applied to every new connection; single pragmas are overridden from the environment with
+# SQLITE_PRAGMAS="name=value,name=value" (e.g. SQLITE_PRAGMAS="mmap_size=0")
+SQLITE_PRAGMAS = {
+    "journal_mode": "wal",  # Readers and the writer do not block each other
+    "synchronous": "normal",  # Safe with WAL, syncs at checkpoints only
+    "busy_timeout": 20000,  # Milliseconds to wait for a lock
+    "mmap_size": 268435456,  # 256MB memory-mapped I/O
+    "cache_size": -20000,  # 20MB page cache (negative values are in KiB)
+    "temp_store": "memory",
+}
+SQLITE_PRAGMAS.update(
+    (name.strip(), value.strip())
+    for name, _, value in (
+        pragma.partition("=")
+        for pragma in os.getenv("SQLITE_PRAGMAS", "").split(",")
+        if pragma.strip()
+    )
+)
+
+# Caches: rendered item fragments are kept per process and evicted least recently used
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "fragments": {
+        "BACKEND": "taskmanager_app.cache.MeteredLocMemCache",
+        "LOCATION": "fragments",
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("FRAGMENT_CACHE_MAX_ENTRIES", "30000")),
+            "CULL_FREQUENCY": 10,
+        },
+    },
 }
 
 
@@ -253,6 +362,19 @@ DEFAULT_FILE_STORAGE = "storages.backends.dropbox.DropBoxStorage"
 # 500MB - 429916160
 MAX_IMAGE_UPLOAD_SIZE = 10485760  # 10MB
 
+# Number of days ahead to materialize occurrences of recurring items
+RECURRENCE_HORIZON_DAYS = 365
+
+# Number of days item changes are kept for the change feed
+CHANGE_LOG_MAX_AGE_DAYS = 7
+
+# Number of days after their completion items are moved to the archive (archive_completed_items)
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+
+# Every n-th revision of an item stores its full description, the others a delta to the previous revision,
+# hence, a version is rebuilt from at most n revisions
+REVISION_SNAPSHOT_INTERVAL = 20
+
 # Media Path
 MEDIA_URL = "/media/"
 MEDIA_ROOT = "/path/to/yourenv/yourproject/media"